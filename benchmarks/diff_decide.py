@@ -0,0 +1,85 @@
+"""
+差分校验：decide_batch（每个后端）与逐条 decide / _infer_entity / _infer_action 的结果必须完全一致。
+
+    python benchmarks/diff_decide.py                 # 默认 40 组随机配置 × 2000 事件
+    python benchmarks/diff_decide.py --trials 200 --events 5000 --seed 7
+
+每组随机改写 rules（q1 阈值 / tier C 策略 / impact_radius / explicit_tags / action_map）与 bets（数量 / force 组），
+事件额外混入大小写不一的行动 / force 标签与非法 tier。不一致 => 打印首个差异并退出码 1。
+NumPy 未安装时只校验纯 Python 后端。
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import synth  # noqa: E402
+from signalgate.core import _infer_action, _infer_entity  # noqa: E402
+from signalgate.decision import _numpy, decide, decide_batch  # noqa: E402
+
+EXTRA_TAGS = ["SELL", "Reduce", "buy", "risk_on", "Tax", "Regulation", "exit", "Action_Required"]
+
+
+def _rules(rng: random.Random) -> dict:
+    rules = synth.make_rules(promotion=rng.random() < 0.5)
+    d = rules["decision"]
+    d["q1_min_evidence"] = rng.choice(["A", "B", "C", "x"])
+    d["tier_c_policy"]["q1_always_no"] = rng.random() < 0.5
+    d["impact_radius"]["direct"] = rng.random() < 0.8
+    d["q3_policy"]["explicit_tags"] = rng.choice([["action_required"], ["Action_Required", "sell"], []])
+    if rng.random() < 0.5:
+        rules["action_map"] = {
+            "allowed_actions": rng.choice([["SELL", "BUY"], ["reduce", "DO_NOTHING"], []]),
+            "sell_tags": rng.choice([[], ["SELL", "exit"]]),
+            "buy_tags": ["buy", "Risk_On"],
+        }
+    return rules
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--trials", type=int, default=40)
+    ap.add_argument("--events", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=0)
+    a = ap.parse_args()
+
+    backends = ["python", "auto"] + (["numpy"] if _numpy() is not None else [])
+    rng = random.Random(a.seed)
+    checked = 0
+    for trial in range(a.trials):
+        bets = synth.make_bets(rng.choice([0, 3, 50]), seed=trial, force=rng.random() < 0.7)
+        rules = _rules(rng)
+        events = [
+            replace(
+                ev,
+                source_tier=rng.choice(["A", "b", "C", "z", "", None]),
+                tags=(ev.tags or []) + rng.sample(EXTRA_TAGS, rng.randint(0, 2)),
+            )
+            for ev in synth.iter_events(a.events, seed=a.seed * 1000 + trial, n_bets=50)
+        ]
+        want = [(decide(ev, bets, rules), _infer_entity(ev, bets), _infer_action(ev, rules)) for ev in events]
+        for backend in backends:
+            got = list(decide_batch(events, bets, rules, backend=backend))
+            if len(got) != len(want):
+                print(f"MISMATCH trial={trial} backend={backend}: {len(got)} results for {len(want)} events")
+                return 1
+            for i, (g, w) in enumerate(zip(got, want)):
+                if g != w:
+                    print(f"MISMATCH trial={trial} backend={backend} event={events[i].event_id}")
+                    print(f"  batch:  {g}")
+                    print(f"  scalar: {w}")
+                    return 1
+        checked += len(events)
+
+    print(f"OK: {checked} events over {a.trials} configs, backends={','.join(backends)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,128 @@
+"""
+差分校验：impact（倒排索引求候选）与“全量逐条判定新旧配置”列出的受影响事件必须完全一致。
+
+    python benchmarks/diff_impact.py                 # 默认 60 组随机配置变更 × 3000 事件
+    python benchmarks/diff_impact.py --trials 200 --events 10000 --seed 7
+
+临时目录中建冷存（经 write_cold_event 增量建索引），部分事件压实进归档；
+每组随机改写 bets（增删 / 改名 / 调换顺序，名字含多词与词内片段）与 rules（阈值 / 标签集 / action_map）。
+不一致 => 打印差异并退出码 1。
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import random
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import synth  # noqa: E402
+from signalgate.coldstore import bulk_writes, iter_events  # noqa: E402
+from signalgate.decision import decide_batch  # noqa: E402
+from signalgate.impact import impact  # noqa: E402
+from signalgate.ingress import write_cold_event  # noqa: E402
+from signalgate.retention import RetentionPolicy, compact_dir  # noqa: E402
+
+# 子串模式：多词 / 词内片段（首词后缀 + 尾词前缀）/ 中文整段 / 无 \w 字符（退化全扫）
+NAMES = ["court ruling", "ling exch", "Supply Chain", "erger rev", "ASSET0003", "dividend", "审查", " - "]
+TAGS = ["sell", "exit", "buy", "risk_on", "trim", "action_required", "kyc", "topic_7", "Regulation"]
+
+
+def _mutate(rng: random.Random, bets: dict, rules: dict) -> tuple:
+    bets, rules = copy.deepcopy(bets), copy.deepcopy(rules)
+    direct = bets["bets"]["direct"]
+    d = rules["decision"]
+    for _ in range(rng.randint(1, 2)):
+        op = rng.randrange(10)
+        if op == 0 and direct:
+            direct.pop(rng.randrange(len(direct)))
+        elif op == 1:
+            direct.insert(rng.randint(0, len(direct)), {"id": f"x{rng.randrange(99)}", "name": rng.choice(NAMES), "tags": rng.sample(TAGS, 1)})
+        elif op == 2 and direct:
+            direct[rng.randrange(len(direct))]["name"] = rng.choice(NAMES)
+        elif op == 3 and len(direct) > 1:
+            i, j = rng.sample(range(len(direct)), 2)
+            direct[i], direct[j] = direct[j], direct[i]
+        elif op == 4:
+            d["q1_min_evidence"] = rng.choice(["A", "B", "C"])
+            d["tier_c_policy"]["q1_always_no"] = rng.random() < 0.5
+        elif op == 5:
+            d["impact_radius"]["direct"] = not d["impact_radius"]["direct"]
+        elif op == 6:
+            d["q3_policy"]["explicit_tags"] = rng.sample(TAGS, rng.randint(0, 2))
+        elif op == 7:
+            d["q3_policy"]["force_tags"] = rng.sample(synth.FORCE_TAGS + TAGS, rng.randint(1, 4))
+        elif op == 8:
+            rules["action_map"] = {
+                "allowed_actions": rng.choice([["SELL", "BUY"], ["REDUCE", "DO_NOTHING"], []]),
+                "sell_tags": rng.sample(TAGS, rng.randint(0, 2)),
+                "buy_tags": rng.sample(TAGS, rng.randint(0, 2)),
+            }
+        elif op == 9:
+            if bets["bets"].get("force"):
+                bets["bets"]["force"] = []
+            else:
+                bets["bets"]["force"] = [{"id": "compliance", "tags": synth.FORCE_TAGS}]
+    return bets, rules
+
+
+def _brute(events, ob, orules, nb, nrules) -> set:
+    old, new = decide_batch(events, ob, orules), decide_batch(events, nb, nrules)
+    return {ev.event_id for ev, a, b in zip(events, old, new) if a != b}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--trials", type=int, default=60)
+    ap.add_argument("--events", type=int, default=3000)
+    ap.add_argument("--seed", type=int, default=0)
+    a = ap.parse_args()
+
+    rng = random.Random(a.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "cold"
+        with bulk_writes():
+            for ev in synth.iter_events(a.events, seed=a.seed, n_bets=20, body_words=(5, 40)):
+                write_cold_event(root, ev)
+        # 较早的一部分进入归档：候选须能从归档读回
+        compact_dir(root, RetentionPolicy(hot_days=15), now=synth.EPOCH + timedelta(days=25))
+        events = list(iter_events(root))
+
+        base_bets = synth.make_bets(20, seed=a.seed)
+        for b in base_bets["bets"]["direct"][:4]:
+            b["name"] = rng.choice(NAMES)
+        base_rules = synth.make_rules()
+
+        full = idx_ms = 0.0
+        n_aff = 0
+        for trial in range(a.trials):
+            ob, orules = _mutate(rng, base_bets, base_rules)
+            nb, nrules = _mutate(rng, ob, orules)
+            t0 = time.perf_counter()
+            want = _brute(events, ob, orules, nb, nrules)
+            full += time.perf_counter() - t0
+            rep = impact([root], ob, orules, nb, nrules)
+            idx_ms += rep.elapsed_s
+            got = {x["event_id"] for x in rep.affected}
+            if got != want:
+                print(f"MISMATCH trial={trial}: reasons={rep.reasons}")
+                print(f"  missing: {sorted(want - got)[:10]} ({len(want - got)})")
+                print(f"  extra:   {sorted(got - want)[:10]} ({len(got - want)})")
+                return 1
+            n_aff += len(want)
+
+    print(
+        f"OK: {a.trials} config changes over {len(events)} events, {n_aff} affected in total; "
+        f"mean impact {idx_ms / a.trials * 1000:.1f}ms vs full decide {full / a.trials * 1000:.1f}ms"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,203 @@
+"""
+notify outbox 的正确性与排空速度：本地 HTTP 假 PushDeer（keep-alive），不访问外网。
+
+    python benchmarks/notify_drain.py                     # 默认 2000 条积压，5% 请求失败
+    python benchmarks/notify_drain.py --events 10000 --fail 0.2 --seed 3
+
+依次检查：
+- 重复入队（同一 event_id）被跳过
+- 服务端整段不可用：drain 停在第一条，积压全部保留；恢复后再 drain 全部送达
+- 随机失败（5xx / 429 / 断连）下每条打断恰好送达一次（按正文逐条核对），且不会重试 4xx
+计时：逐条推送（不合并）与按 coalesce_max_chars 合并两种排空方式；以及每条新建连接（旧 send_push 方式）的对照。
+退避等待只累计不真睡（--real-sleep 时真睡）。不一致 => 退出码 1。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from signalgate import outbox  # noqa: E402
+from signalgate.notify import Pusher  # noqa: E402
+
+
+class _StandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fail: float, seed: int):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.fail = fail
+        self.down = False
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.received = []   # 回了 200 的 (text, desp)
+        self.requests = 0
+        self.connections = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+    wbufsize = -1  # 响应头与正文一次写出：分两次写会撞上 Nagle + 延迟 ACK（每条 +40ms，测的就不是客户端了）
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *a) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        form = urllib.parse.parse_qs(body.decode("utf-8"))
+        srv = self.server
+        with srv.lock:
+            srv.requests += 1
+            r = srv.rng.random()
+        if form.get("pushkey") != ["k"]:
+            return self._reply(200, {"code": 80403, "error": "bad pushkey"})
+        if srv.down:
+            return self._reply(503, {"code": 503})
+        if r < srv.fail / 3:
+            return self._reply(500, {"code": 500})
+        if r < srv.fail * 2 / 3:
+            return self._reply(429, {"code": 429})
+        if r < srv.fail:
+            self.close_connection = True  # 读完请求直接断开，不回响应
+            return
+        with srv.lock:
+            srv.received.append((form.get("text", [""])[0], form.get("desp", [""])[0]))
+        self._reply(200, {"code": 0, "content": {"result": ["ok"]}})
+
+    def _reply(self, status: int, obj: dict) -> None:
+        data = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _message(i: int) -> str:
+    # 与 interrupt.format_interrupt 同形：每条正文唯一（Source 带序号）
+    return (
+        f"[INTERRUPT] ASSET{i % 50:04d} STRUCT_CHANGE\nRule: rule_v0_1\nEvidence: q1=A q2=B q3=B\n"
+        f"Action: SELL | Deadline: None\nSource: https://example.org/{i}\n"
+    )
+
+
+def _fill(state: Path, n: int, t0: float) -> None:
+    for i in range(n):
+        outbox.enqueue(state, f"evt{i:06d}", text=_message(i).split("\n", 1)[0], desp=_message(i), now=t0 + i * 0.01)
+
+
+def _delivered(srv: _StandIn) -> list:
+    # 合并的消息按条拆开（每条以 [INTERRUPT] 开头）
+    out = []
+    for _, desp in srv.received:
+        out += ["[INTERRUPT]" + x.rstrip("\n") + "\n" for x in desp.split("[INTERRUPT]")[1:]]
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=2000)
+    ap.add_argument("--fail", type=float, default=0.05, help="随机失败比例（500 / 429 / 断连各三分之一）")
+    ap.add_argument("--max-chars", type=int, default=2000, help="合并排空时的 coalesce_max_chars")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--real-sleep", action="store_true")
+    a = ap.parse_args()
+
+    srv = _StandIn(a.fail, a.seed)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{srv.server_address[1]}/message/push"
+    slept = [0.0]
+
+    def sleep(s: float) -> None:
+        slept[0] += s
+        if a.real_sleep:
+            time.sleep(s)
+
+    def pusher(key: str = "k") -> Pusher:
+        return Pusher(pushkey=key, url=url, sleep=sleep)
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        # 去重 + 不可用时保留积压
+        state = Path(tmp) / "dedupe"
+        assert outbox.enqueue(state, "e1", "t", _message(1)) and not outbox.enqueue(state, "e1", "t", _message(1))
+        srv.down = True
+        with pusher() as p:
+            res = outbox.drain(state, p, window_s=0)
+        srv.down = False
+        if res.sent or res.pending != 1 or not res.error:
+            print(f"FAIL: endpoint down should keep the backlog: {res}")
+            ok = False
+        with pusher("wrong") as p:
+            res = outbox.drain(state, p, window_s=0)
+        if res.sent or res.retries or "80403" not in res.error:
+            print(f"FAIL: business error must not be retried: {res}")
+            ok = False
+        with pusher() as p:
+            res = outbox.drain(state, p, window_s=0)
+        if res.sent != 1 or res.pending or outbox.pending(state):
+            print(f"FAIL: backlog not delivered after recovery: {res}")
+            ok = False
+        srv.received.clear()
+
+        rows = []
+        for name, window, max_chars in (("one per message", 0.0, 0), (f"coalesced <= {a.max_chars} chars", 30.0, a.max_chars)):
+            state = Path(tmp) / f"w{window}"
+            _fill(state, a.events, time.time() - 60)
+            srv.received.clear()
+            req0, conn0, slept[0] = srv.requests, srv.connections, 0.0
+            msgs = retries = 0
+            t0 = time.perf_counter()
+            while outbox.pending(state):  # 失败即停；像定时任务那样再跑一轮
+                with pusher() as p:
+                    res = outbox.drain(state, p, window_s=window, max_chars=max_chars)
+                msgs += res.messages
+                retries += res.retries
+            sec = time.perf_counter() - t0
+            got = _delivered(srv)
+            want = [_message(i) for i in range(a.events)]
+            if sorted(got) != sorted(want):
+                print(f"FAIL [{name}]: delivered {len(got)} (unique {len(set(got))}) of {a.events}")
+                ok = False
+            rows.append(
+                f"  {name:<28} {a.events / sec:>9.0f} interrupts/s  {msgs:>6} messages  {srv.requests - req0:>6} requests  "
+                f"{srv.connections - conn0:>4} connections  {retries:>4} retries ({slept[0]:.1f}s backoff)  "
+                f"{sec / max(msgs, 1) * 1000:.2f} ms/message"
+            )
+
+        # 对照：每条新建连接（urllib，旧 send_push 的做法），不注入失败
+        srv.fail, n = 0.0, min(a.events, 500)
+        body = urllib.parse.urlencode({"pushkey": "k", "text": "t", "desp": _message(0), "type": "text"}).encode()
+        t0 = time.perf_counter()
+        for _ in range(n):
+            with urllib.request.urlopen(urllib.request.Request(url, data=body, method="POST"), timeout=5) as r:
+                r.read()
+        sec = time.perf_counter() - t0
+        rows.append(f"  {'new connection per message':<28} {n / sec:>9.0f} interrupts/s  (no failures injected, {n} messages)")
+
+    srv.shutdown()
+    if not ok:
+        return 1
+    print(f"OK: {a.events} interrupts delivered exactly once under {a.fail:.0%} failures")
+    print("\n".join(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,413 @@
+"""
+基准场景（合成数据见 benchmarks/synth.py），结果输出为 JSON，便于版本间对比。
+
+    python benchmarks/run.py                          # scale=small，JSON 打到 stdout
+    python benchmarks/run.py --scale medium --out bench-main.json
+    python benchmarks/run.py --only decide,feed
+    python benchmarks/run.py --compare bench-main.json bench-branch.json [--threshold 1.15]
+
+每条结果：{"scenario", "case", "params", "n", "seconds", "per_sec", "us_per_op"}
+- seconds：重复 --repeat 次取最小值（有状态场景只跑一次）
+- compare：按 (scenario, case) 对齐，打印 new/old 耗时比；任一比值超过阈值 => 退出码 1
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import synth  # noqa: E402
+from signalgate import __version__  # noqa: E402
+from signalgate.audit import summarize_interrupts  # noqa: E402
+from signalgate.core import _infer_entity, _maybe_promote_by_multisource, run_watch  # noqa: E402
+from signalgate.decision import decide, decide_batch  # noqa: E402
+from signalgate.fetch import _parse_rss_or_atom  # noqa: E402
+from signalgate.impact import impact  # noqa: E402
+from signalgate.ingest_cli import ingest  # noqa: E402
+from signalgate.coldstore import bulk_writes, iter_events  # noqa: E402
+from signalgate.ingress import write_cold_event  # noqa: E402
+from signalgate.models import CompactEvent, Event  # noqa: E402
+from signalgate.observation import parse_ts  # noqa: E402
+from signalgate.search import search  # noqa: E402
+from signalgate.terms import open_terms  # noqa: E402
+
+SCALES: Dict[str, Dict] = {
+    "small": {"events": 5_000, "bets": [10, 200], "tentative": [1_000, 5_000], "probes": 500,
+              "ingest": 2_000, "feed": [1_000, 10_000], "audit": [10_000, 100_000], "watch": 40},
+    "medium": {"events": 50_000, "bets": [10, 200, 2_000], "tentative": [1_000, 10_000, 50_000], "probes": 2_000,
+               "ingest": 20_000, "feed": [10_000, 100_000], "audit": [100_000, 1_000_000], "watch": 100},
+    "large": {"events": 200_000, "bets": [10, 200, 2_000], "tentative": [10_000, 100_000, 300_000], "probes": 5_000,
+              "ingest": 100_000, "feed": [100_000, 500_000], "audit": [1_000_000, 5_000_000], "watch": 200},
+}
+
+
+def _best(fn: Callable[[], None], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _row(scenario: str, case: str, n: int, seconds: float, **params) -> Dict:
+    return {
+        "scenario": scenario,
+        "case": case,
+        "params": params,
+        "n": n,
+        "seconds": round(seconds, 6),
+        "per_sec": round(n / seconds, 1) if seconds > 0 else None,
+        "us_per_op": round(seconds / n * 1e6, 3) if n else None,
+    }
+
+
+# ---- 场景
+
+def bench_decide(cfg: Dict, tmp: Path, repeat: int) -> List[Dict]:
+    rules = synth.make_rules()
+    out = []
+    for nb in cfg["bets"]:
+        bets = synth.make_bets(nb)
+        events = synth.make_events(cfg["events"], n_bets=nb)
+        decide(events[0], bets, rules)  # 编译匹配器 / 规则（一次性，不计时）
+        s = _best(lambda: [decide(ev, bets, rules) for ev in events], repeat)
+        out.append(_row("decide", f"bets={nb}", len(events), s, bets=nb))
+        # decide_batch 同时给出 entity / action（逐条路径需要额外的 _infer_entity + _infer_action）
+        s = _best(lambda: decide_batch(events, bets, rules, backend="python"), repeat)
+        out.append(_row("decide", f"batch bets={nb}", len(events), s, bets=nb))
+    return out
+
+
+def bench_infer_entity(cfg: Dict, tmp: Path, repeat: int) -> List[Dict]:
+    out = []
+    for nb in cfg["bets"]:
+        bets = synth.make_bets(nb)
+        events = synth.make_events(cfg["events"], n_bets=nb)
+        _infer_entity(events[0], bets)
+        s = _best(lambda: [_infer_entity(ev, bets) for ev in events], repeat)
+        out.append(_row("infer_entity", f"bets={nb}", len(events), s, bets=nb))
+    return out
+
+
+def bench_promote(cfg: Dict, tmp: Path, repeat: int) -> List[Dict]:
+    """
+    tentative 观察区增长时的多源确认开销：
+    - rebuild：索引缺失时首次查询（全量重建）
+    - query：索引就绪后的单次查询（probe 事件来自另一个 seed）
+    """
+    bets = synth.make_bets(100)
+    out = []
+    for size in cfg["tentative"]:
+        d = tmp / f"tentative-{size}"
+        for ev in synth.iter_events(size, seed=11, n_bets=100, hit_rate=1.0, body_words=(5, 20), span_hours=24 * 7):
+            write_cold_event(d, ev, entity=_infer_entity(ev, bets))
+        probes = synth.make_events(cfg["probes"], seed=12, n_bets=100, hit_rate=1.0, body_words=(5, 20), span_hours=24 * 7)
+        entities = [_infer_entity(ev, bets) for ev in probes]
+
+        t0 = time.perf_counter()
+        _maybe_promote_by_multisource(probes[0], d, entities[0], 24, bets)
+        out.append(_row("promote", f"rebuild tentative={size}", size, time.perf_counter() - t0, tentative=size))
+
+        s = _best(lambda: [_maybe_promote_by_multisource(ev, d, e, 24, bets) for ev, e in zip(probes, entities)], repeat)
+        out.append(_row("promote", f"query tentative={size}", len(probes), s, tentative=size))
+    return out
+
+
+def bench_ingest(cfg: Dict, tmp: Path, repeat: int, workers: int = 0) -> List[Dict]:
+    n = cfg["ingest"]
+    inbox = tmp / "inbox"
+    synth.write_event_files(inbox, synth.iter_events(n, seed=21))
+    out = []
+    for w in sorted({0, workers}):
+        cold = tmp / f"cold-w{w}"
+        t0 = time.perf_counter()
+        res = ingest(inbox, cold, workers=w)
+        out.append(_row("ingest", f"new workers={w}", res.new, time.perf_counter() - t0, files=n, workers=w))
+        t0 = time.perf_counter()
+        res = ingest(inbox, cold, workers=w)
+        out.append(_row("ingest", f"dedupe workers={w}", res.skipped, time.perf_counter() - t0, files=n, workers=w))
+    return out
+
+
+def bench_search(cfg: Dict, tmp: Path, repeat: int) -> List[Dict]:
+    # 冷存写入（含倒排索引增量维护）一次；查询：罕见词 / bet 名 / 常见词 / 多个常见词 / 等级 + 时间过滤
+    n = cfg["events"]
+    cold = tmp / "cold"
+    t0 = time.perf_counter()
+    with bulk_writes():
+        for ev in synth.iter_events(n, seed=31, n_bets=200, body_words=(10, 60)):
+            write_cold_event(cold, ev)
+    out = [_row("search", "write+index", n, time.perf_counter() - t0, events=n)]
+    window = {"since": parse_ts("2026-01-08"), "until": parse_ts("2026-01-15")}
+    for case, q, kw in (
+        ("rare tag", "topic_7", {}),
+        ("bet name", "asset0042", {}),
+        ("common word", "merger", {}),
+        ("3 common words", "court ruling merger", {}),
+        ("tier A + 1 week", "listing", {"tiers": {"A"}, **window}),
+    ):
+        search([cold], q, **kw)  # 首次打开索引 / 合并 stats 不计入
+        sec = _best(lambda: search([cold], q, **kw), repeat)
+        out.append(_row("search", case, 1, sec, events=n, query=q))
+    return out
+
+
+def bench_impact(cfg: Dict, tmp: Path, repeat: int) -> List[Dict]:
+    """
+    impact（配置变更影响面）：冷存带真实规模的词表（稀有词），各类改动与全量判定对照。
+    - first call：进程内首次（词表载入内存）
+    - 其余：词表已常驻；params.candidates = 实际判定的候选事件数
+    - full scan：不用索引的做法（读出全部事件，新旧配置各判定一次），作对照
+    """
+    import copy
+
+    n = cfg["events"]
+    cold = tmp / "cold"
+    bets, rules = synth.make_bets(200), synth.make_rules()
+    with bulk_writes():
+        for ev in synth.iter_events(n, seed=41, n_bets=200, body_words=(10, 60), rare_words=200_000):
+            write_cold_event(cold, ev)
+
+    def variant(fn) -> tuple:
+        b, r = copy.deepcopy(bets), copy.deepcopy(rules)
+        fn(b["bets"]["direct"], r["decision"])
+        return b, r
+
+    cases = [
+        ("rename bet", variant(lambda d, r: d[42].update(name=synth._token(12345)))),
+        ("add 2-word bet", variant(lambda d, r: d.append({"id": "x1", "name": "ling exch", "tags": ["kyc"]}))),
+        ("explicit_tags", variant(lambda d, r: r["q3_policy"].update(explicit_tags=["action_required", "trim"]))),
+        ("q1 threshold", variant(lambda d, r: r.update(q1_min_evidence="A"))),
+    ]
+    out = []
+    t0 = time.perf_counter()
+    rep = impact([cold], bets, rules, *cases[0][1])
+    out.append(_row("impact", "first call", 1, time.perf_counter() - t0, events=n, vocab=len(open_terms(cold).word_vocab())))
+    for case, (nb, nr) in cases:
+        rep = impact([cold], bets, rules, nb, nr)
+        s = _best(lambda: impact([cold], bets, rules, nb, nr), repeat)
+        out.append(_row("impact", case, 1, s, events=n, candidates=rep.candidates, affected=len(rep.affected)))
+    nb, nr = cases[-1][1]
+
+    def full_scan() -> None:
+        events = list(iter_events(cold))
+        decide_batch(events, bets, rules)
+        decide_batch(events, nb, nr)
+
+    s = _best(full_scan, repeat)
+    out.append(_row("impact", "full scan (reference)", 1, s, events=n))
+    return out
+
+
+def bench_watch(cfg: Dict, tmp: Path, repeat: int) -> List[Dict]:
+    # run --watch：文件落盘（mtime）-> 判定完成的延迟 p50 / p95；文件逐个写入（间隔 20ms），inotify 与轮询各一轮
+    import threading
+
+    n = cfg["watch"]
+    conf = tmp / "config"
+    conf.mkdir()
+    (conf / "bets.yaml").write_text(json.dumps(synth.make_bets(200, seed=5)), encoding="utf-8")  # JSON 即 YAML
+    (conf / "rules.yaml").write_text(json.dumps(synth.make_rules()), encoding="utf-8")
+    out = []
+    for mode, poll in (("inotify", False), ("poll", True)):
+        d = tmp / mode
+        inbox = d / "inbox"
+        lat: List[float] = []
+        done = threading.Event()
+
+        def consume() -> None:
+            for it in run_watch(conf, d / "cold", d / "audit", d / "state", inbox, poll=poll, stop=done.is_set):
+                lat.append(it.latency_s)
+
+        th = threading.Thread(target=consume)
+        th.start()
+        time.sleep(0.3)
+        for i, ev in enumerate(synth.iter_events(n, seed=17)):
+            (inbox / f"{i:06d}.json").write_text(json.dumps(ev.to_dict()), encoding="utf-8")
+            time.sleep(0.02)
+        deadline = time.time() + 5
+        while len(lat) < n and time.time() < deadline:
+            time.sleep(0.02)
+        done.set()
+        th.join()
+        lat.sort()
+        for q in (0.5, 0.95):
+            out.append(_row("watch", f"{mode} latency p{int(q * 100)}", 1, lat[min(len(lat) - 1, int(q * len(lat)))], files=n, seen=len(lat)))
+    return out
+
+
+def bench_feed(cfg: Dict, tmp: Path, repeat: int) -> List[Dict]:
+    out = []
+    for items in cfg["feed"]:
+        for kind in ("rss", "atom"):
+            raw = synth.make_feed(items, kind=kind)
+            s = _best(lambda: _parse_rss_or_atom(raw, "https://feed.example.com/rss"), repeat)
+            row = _row("feed", f"{kind} items={items}", items, s, kind=kind, items=items, bytes=len(raw))
+            row["mb_per_sec"] = round(len(raw) / s / 1e6, 2) if s > 0 else None
+            out.append(row)
+    return out
+
+
+def bench_audit(cfg: Dict, tmp: Path, repeat: int) -> List[Dict]:
+    """
+    - cold：无 rollup（首次汇总 = 全量扫描）
+    - warm：rollup 已是最新
+    - incremental：日志追加 1% 后再汇总
+    """
+    out = []
+    for n in cfg["audit"]:
+        d = tmp / f"audit-{n}"
+        log = synth.write_audit_log(d, n)
+        t0 = time.perf_counter()
+        summarize_interrupts(d, by="entity")
+        out.append(_row("audit", f"cold records={n}", n, time.perf_counter() - t0, records=n))
+
+        s = _best(lambda: summarize_interrupts(d, by="entity"), repeat)
+        out.append(_row("audit", f"warm records={n}", 1, s, records=n))
+
+        extra = max(1, n // 100)
+        tail = log.read_bytes().splitlines(keepends=True)[:extra]
+        with log.open("ab") as f:
+            f.writelines(tail)
+        t0 = time.perf_counter()
+        summarize_interrupts(d, by="entity")
+        out.append(_row("audit", f"incremental records={n}", extra, time.perf_counter() - t0, records=n, appended=extra))
+    return out
+
+
+def bench_memory(cfg: Dict, tmp: Path, repeat: int) -> List[Dict]:
+    """
+    常驻内存：把 N 条事件 JSON 解码为 Event / CompactEvent 后的 tracemalloc 净增量（含字符串本体）。
+    - body=0：只有标题等短字段（对象本身的开销占主导）
+    - body=20-120：常见正文长度
+    seconds = 解码 + 构造耗时（单次）。
+    """
+    n = cfg["events"]
+    out = []
+    for words in ((0, 0), (20, 120)):
+        lines = [json.dumps(ev.to_dict(), ensure_ascii=False) for ev in synth.iter_events(n, seed=31, body_words=words)]
+        label = f"body={words[0]}" if words[0] == words[1] else f"body={words[0]}-{words[1]}"
+        for cls in (Event, CompactEvent):
+            gc.collect()
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            events = [cls.from_dict(json.loads(x)) for x in lines]
+            s = time.perf_counter() - t0
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            row = _row("memory", f"{cls.__name__} {label}", len(events), s, events=n, body_words=list(words))
+            row["bytes_per_event"] = round(size / n, 1)
+            out.append(row)
+            del events
+    return out
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "decide": bench_decide,
+    "infer_entity": bench_infer_entity,
+    "promote": bench_promote,
+    "ingest": bench_ingest,
+    "feed": bench_feed,
+    "audit": bench_audit,
+    "search": bench_search,
+    "impact": bench_impact,
+    "watch": bench_watch,
+    "memory": bench_memory,
+}
+
+
+def _meta(scale: str, repeat: int) -> Dict:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        rev = ""
+    return {
+        "signalgate": __version__,
+        "git": rev,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "scale": scale,
+        "repeat": repeat,
+        "ts": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+
+def compare(old_path: Path, new_path: Path, threshold: float) -> int:
+    old = json.loads(old_path.read_text(encoding="utf-8"))
+    new = json.loads(new_path.read_text(encoding="utf-8"))
+    base = {(r["scenario"], r["case"]): r for r in old["results"]}
+    worse = 0
+    print(f"{'scenario':<14}{'case':<32}{'old s':>12}{'new s':>12}{'new/old':>10}")
+    for r in new["results"]:
+        o = base.get((r["scenario"], r["case"]))
+        if o is None or not o["seconds"]:
+            continue
+        ratio = r["seconds"] / o["seconds"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        worse += bool(flag)
+        print(f"{r['scenario']:<14}{r['case']:<32}{o['seconds']:>12.4f}{r['seconds']:>12.4f}{ratio:>10.2f}{flag}")
+    return 1 if worse else 0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scale", choices=sorted(SCALES), default="small")
+    ap.add_argument("--only", default="", help="逗号分隔的场景名：" + ",".join(SCENARIOS))
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--workers", type=int, default=0, help="ingest 额外跑一组并行（0 = 只跑串行）")
+    ap.add_argument("--out", default="", help="写入 JSON 文件（默认 stdout）")
+    ap.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    ap.add_argument("--threshold", type=float, default=1.15)
+    a = ap.parse_args()
+
+    if a.compare:
+        return compare(Path(a.compare[0]), Path(a.compare[1]), a.threshold)
+
+    names = [x for x in a.only.split(",") if x] or list(SCENARIOS)
+    unknown = [x for x in names if x not in SCENARIOS]
+    if unknown:
+        ap.error(f"unknown scenario: {','.join(unknown)}")
+
+    cfg = SCALES[a.scale]
+    tmp = Path(tempfile.mkdtemp(prefix="sg-bench-"))
+    results: List[Dict] = []
+    try:
+        for name in names:
+            d = tmp / name
+            d.mkdir()
+            kw = {"workers": a.workers} if name == "ingest" else {}
+            rows = SCENARIOS[name](cfg, d, a.repeat, **kw)
+            results += rows
+            for r in rows:
+                extra = f"  {r['bytes_per_event']:>10.1f} B/event" if "bytes_per_event" in r else ""
+                print(f"{r['scenario']:<14}{r['case']:<32}{r['seconds']:>10.4f}s  {r['per_sec'] or 0:>12.1f}/s{extra}", file=sys.stderr)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    doc = json.dumps({"meta": _meta(a.scale, a.repeat), "results": results}, ensure_ascii=False, indent=2)
+    if a.out:
+        Path(a.out).write_text(doc + "\n", encoding="utf-8")
+    else:
+        print(doc)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,121 @@
+"""
+CLI 启动预算：用 `python -X importtime` 度量每个子命令的导入开销（相对裸解释器），超出预算 => 退出码 1。
+
+    python benchmarks/startup.py            # 默认每个命令跑 5 次取中位数
+    python benchmarks/startup.py --runs 9 --json
+
+在临时根目录中运行（复制仓库的 config/），不读写真实数据。
+先热身一次：配置快照（data/state/config.cache.json）已生成，度量的是稳态的短命进程。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+FIXTURE = REPO / "fixtures" / "event_sell.json"
+
+# 导入开销预算（ms，相对 `python -c pass`；基准机器 1 vCPU / CPython 3.11）；调整前先在 PR 里说明原因
+BUDGET_MS = {
+    "--help": 60,
+    "reset-gate": 65,
+    "audit": 75,
+    "run --dry-run": 90,
+    "run": 90,
+    "ingest": 90,
+}
+
+# 毫秒预算留了噪声余量；与机器无关的硬约束：这些命令在稳态下不得加载的模块（出现即超预算）
+FORBIDDEN = (
+    "yaml",                        # 配置快照命中时不解析 YAML
+    "urllib.request", "http.client", "xml.etree.ElementTree",   # 只有 fetch 需要
+    "multiprocessing", "concurrent.futures.process",            # 只有 ingest --workers 需要
+    "gzip",                        # 只有读取归档 / compact 需要（lzma 不列：argparse -> shutil 会无条件导入）
+)
+
+
+def _commands(root: Path) -> dict:
+    return {
+        "--help": ["--help"],
+        "reset-gate": ["reset-gate"],
+        "audit": ["audit"],
+        "run --dry-run": ["run", "--input", str(FIXTURE), "--dry-run"],
+        "run": ["run", "--input", str(FIXTURE)],
+        "ingest": ["ingest", "--input", str(FIXTURE)],
+    }
+
+
+def _import_us(argv: list, env: dict) -> tuple[int, float, set]:
+    """
+    返回 (顶层导入累计微秒, 墙钟秒, 已加载模块名)。顶层 = importtime 输出中未缩进的条目，累计值互不重叠。
+    """
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *argv],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    wall = time.perf_counter() - t0
+    total = 0
+    mods = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2]
+        mods.add(name.strip())
+        if name.startswith(" ") and not name.startswith("  "):  # 顶层（一个空格）
+            total += int(parts[1])
+    return total, wall, mods
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--json", action="store_true", help="输出 JSON（便于 CI 存档对比）")
+    a = ap.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="sg-startup-"))
+    try:
+        shutil.copytree(REPO / "config", root / "config")
+        env = dict(os.environ, PYTHONPATH=str(REPO), SIGNALGATE_HOME=str(root), PYTHONDONTWRITEBYTECODE="")
+
+        base = statistics.median(_import_us(["-c", "pass"], env)[0] for _ in range(a.runs))
+        results = {}
+        for name, args in _commands(root).items():
+            argv = ["-m", "signalgate", *args]
+            _import_us(argv, env)  # 热身：.pyc / 配置快照
+            samples = [_import_us(argv, env) for _ in range(a.runs)]
+            imp = (statistics.median(s[0] for s in samples) - base) / 1000
+            wall = statistics.median(s[1] for s in samples) * 1000
+            results[name] = {
+                "import_ms": round(imp, 1),
+                "wall_ms": round(wall, 1),
+                "budget_ms": BUDGET_MS[name],
+                "forbidden": sorted(m for m in FORBIDDEN if m in samples[-1][2]),
+            }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    over = [k for k, v in results.items() if v["import_ms"] > v["budget_ms"] or v["forbidden"]]
+    if a.json:
+        print(json.dumps({"python": sys.version.split()[0], "runs": a.runs, "results": results, "over": over}, indent=2))
+    else:
+        for k, v in results.items():
+            flag = "OVER" if k in over else "ok"
+            extra = f"  loaded: {','.join(v['forbidden'])}" if v["forbidden"] else ""
+            print(f"{k:<16} import={v['import_ms']:>6.1f}ms  wall={v['wall_ms']:>6.1f}ms  budget={v['budget_ms']}ms  {flag}{extra}")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
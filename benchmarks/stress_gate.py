@@ -0,0 +1,139 @@
+"""
+多进程压测：多个 runner 共享同一个根目录时，gate / audit / 冷存写入是否仍然正确。
+
+    python benchmarks/stress_gate.py --procs 16 --attempts 50
+    python benchmarks/stress_gate.py --unsafe   # 对照：can_interrupt + on_interrupt 分开调用（会超额放行）
+
+检查项（任一失败 => 退出码 1）：
+- 放行总数 == min(burst_limit, monthly_budget)，gate.json 可解析且计数一致
+- interrupts.jsonl 行数 == 放行总数，每行都是完整 JSON
+- 分段冷存：所有进程写入的事件都能从索引读回，且索引指向的内容与 event_id 一致
+- 所有进程同时写同一批事件（shared-*）：每个 event_id 只被写入一次（段里只有一行，恰好一个进程报告“新写入”）
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from signalgate.audit import append_interrupt  # noqa: E402
+from signalgate.coldstore import SegmentStore, migrate_to_segments  # noqa: E402
+from signalgate.gate import can_interrupt, load_state, on_interrupt, try_interrupt  # noqa: E402
+from signalgate.ingress import write_cold_event  # noqa: E402
+from signalgate.models import Event, InterruptRecord  # noqa: E402
+
+
+def _worker(args) -> int:
+    root, rules, wid, attempts, events, unsafe, barrier = args
+    root = Path(root)
+    state, audit, cold, files = root / "state", root / "audit", root / "cold", root / "files"
+    barrier.wait()
+
+    admitted = new_shared = 0
+    for i in range(attempts):
+        if unsafe:
+            ok = can_interrupt(root, state, rules_cfg=rules)
+            if ok:
+                on_interrupt(root, state, rules_cfg=rules)
+        else:
+            ok = try_interrupt(root, state, rules_cfg=rules) is not None
+        if ok:
+            admitted += 1
+            append_interrupt(audit, InterruptRecord(
+                ts="2026-01-01T00:00:00Z", event_id=f"w{wid}-{i}", entity="X", signal_type="STRUCT_CHANGE",
+                rule_id="stress", evidence="", action="DO_NOTHING", deadline="", source_ref="",
+            ))
+
+    for i in range(events):
+        ev = Event(event_id=f"w{wid:03d}-e{i:05d}", ts="2026-01-01T00:00:00Z", source="stress",
+                   title=f"event {wid}/{i}", body="x" * (i % 97), url="", tags=[])
+        write_cold_event(cold, ev)
+        write_cold_event(files, ev)
+        shared = Event(event_id=f"shared-e{i:05d}", ts="2026-01-01T00:00:00Z", source="stress",
+                       title=f"shared {i}", body="", url="", tags=[])
+        new_shared += write_cold_event(cold, shared) is not None
+        new_shared += write_cold_event(files, shared) is not None
+    return admitted, new_shared
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", default="", help="工作目录（默认临时目录）")
+    ap.add_argument("--procs", type=int, default=12)
+    ap.add_argument("--attempts", type=int, default=40, help="每个进程尝试打断次数")
+    ap.add_argument("--events", type=int, default=300, help="每个进程写入冷存的事件数")
+    ap.add_argument("--burst-limit", type=int, default=5)
+    ap.add_argument("--budget", type=int, default=50)
+    ap.add_argument("--segment-kb", type=int, default=64, help="小段：强制频繁滚动")
+    ap.add_argument("--unsafe", action="store_true")
+    a = ap.parse_args()
+
+    root = Path(a.root) if a.root else Path(tempfile.mkdtemp(prefix="sg-stress-"))
+    for d in ("state", "audit", "cold", "files"):
+        (root / d).mkdir(parents=True, exist_ok=True)
+    migrate_to_segments(root / "cold", a.segment_kb * 1024)
+
+    rules = {
+        "gate": {"burst_window_minutes": 60 * 24 * 365, "burst_limit": a.burst_limit},
+        "interrupt": {"monthly_budget": a.budget},
+    }
+    barrier = mp.Manager().Barrier(a.procs)
+    jobs = [(str(root), rules, w, a.attempts, a.events, a.unsafe, barrier) for w in range(a.procs)]
+    with mp.Pool(a.procs) as pool:
+        results = pool.map(_worker, jobs)
+    admitted = sum(r[0] for r in results)
+    new_shared = sum(r[1] for r in results)
+
+    errors = []
+    expected = min(a.burst_limit, a.budget)
+    if admitted != expected:
+        errors.append(f"admitted={admitted} expected={expected}")
+
+    st = load_state(root / "state")
+    if st.burst_count != admitted or st.month_count != admitted:
+        errors.append(f"gate.json burst_count={st.burst_count} month_count={st.month_count} admitted={admitted}")
+
+    lines = (root / "audit" / "interrupts.jsonl").read_bytes().splitlines() if admitted else []
+    bad = 0
+    for raw in lines:
+        try:
+            json.loads(raw)
+        except Exception:
+            bad += 1
+    if len(lines) != admitted or bad:
+        errors.append(f"audit lines={len(lines)} bad={bad} admitted={admitted}")
+
+    shared = {f"shared-e{i:05d}" for i in range(a.events)}
+    want = {f"w{w:03d}-e{i:05d}" for w in range(a.procs) for i in range(a.events)} | shared
+    rows = 0
+    for seg in (root / "cold" / "segments").glob("seg-*.ndjson"):
+        rows += sum(1 for raw in seg.open("rb") if raw.startswith(b'{"event_id":"shared-'))
+    if rows != len(shared) or new_shared != 2 * len(shared):
+        errors.append(f"shared events: segment rows={rows} reported new={new_shared} want {len(shared)} / {2 * len(shared)}")
+    store = SegmentStore(root / "cold")
+    got = set(store.iter_ids())
+    mismatched = sum(1 for eid in want & got if getattr(store.get(eid), "event_id", None) != eid)
+    if got != want or mismatched:
+        errors.append(f"segments missing={len(want - got)} extra={len(got - want)} mismatched={mismatched} "
+                      f"segs={len(store.segment_numbers())}")
+    store.close()
+
+    files = {p.stem for p in (root / "files").glob("*.json")}
+    if files != want:
+        errors.append(f"files missing={len(want - files)}")
+
+    mode = "unsafe" if a.unsafe else "locked"
+    print(f"[{mode}] procs={a.procs} admitted={admitted}/{expected} audit={len(lines)} "
+          f"events={len(got)}/{len(want)} root={root}")
+    for e in errors:
+        print("FAIL:", e)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
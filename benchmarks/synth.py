@@ -0,0 +1,241 @@
+"""
+确定性合成数据（同一 seed => 字节级相同的输出），供 benchmarks/run.py 与主机容量评估使用。
+
+    python benchmarks/synth.py events --n 10000 --out /tmp/inbox
+    python benchmarks/synth.py feed --items 50000 --kind atom --out /tmp/big.xml
+    python benchmarks/synth.py bets --n 200 --out /tmp/config/bets.yaml
+
+不依赖 signalgate 以外的第三方包；bets 输出为 YAML 时用 PyYAML（signalgate 本身的依赖）。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from signalgate.models import Event, InterruptRecord  # noqa: E402
+
+EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+# 标签池：结构类 / force 类 / 行动类 / 噪声；权重决定三问法各分支的比例
+STRUCT_TAGS = ["structural", "rule_change", "regulation"]
+FORCE_TAGS = ["tax", "account", "kyc", "transfer", "identity", "legal"]
+ACTION_TAGS = ["action_required", "sell", "reduce", "buy", "trim", "risk_off"]
+NOISE_TAGS = [f"topic_{i}" for i in range(200)]
+TIERS = ["A", "B", "B", "C", "C", "C"]
+SOURCES = [f"src{i}.example.com" for i in range(40)]
+WORDS = ("market rate policy filing guidance earnings supply chain launch delay audit "
+         "court ruling exchange listing dividend split merger review update notice").split()
+
+
+def make_bets(n: int, seed: int = 0, force: bool = True) -> Dict:
+    """
+    n 个 direct bets（name 形如 ASSET0042，带 2~4 个 tags）+ 可选 force 组；结构与 config/bets.yaml 一致。
+    """
+    rng = random.Random(seed)
+    direct = []
+    for i in range(n):
+        direct.append({
+            "id": f"asset{i:04d}",
+            "type": "asset",
+            "name": f"ASSET{i:04d}",
+            "tags": [f"sector_{rng.randrange(50)}" for _ in range(rng.randint(2, 4))] + [f"asset{i:04d}"],
+        })
+    bets: Dict = {"version": 1, "bets": {"direct": direct}}
+    if force:
+        bets["bets"]["force"] = [{"id": "compliance", "type": "force", "name": "compliance", "tags": FORCE_TAGS}]
+    return bets
+
+
+def make_rules(promotion: bool = True) -> Dict:
+    """
+    与 config/rules.yaml 同构的最小规则（基准不依赖仓库里的真实配置）。
+    """
+    return {
+        "decision": {
+            "q1_min_evidence": "B",
+            "observation_window_hours": 24,
+            "tier_c_policy": {"q1_always_no": True, "allow_promotion_by_multisource": promotion},
+            "q3_policy": {"require_explicit_tag": True, "explicit_tags": ["action_required"], "force_tags": FORCE_TAGS},
+            "impact_radius": {"direct": True, "indirect": False, "macro": False},
+        },
+        "gate": {"burst_window_minutes": 60, "burst_limit": 2},
+        "interrupt": {"monthly_budget": 3},
+        "evidence": {"rank": {"A": 2, "B": 1, "C": 0}},
+    }
+
+
+def _token(i: int) -> str:
+    # 第 i 个稀有词：双射 26 进制（a..z, aa..zz, ...），加前缀避免与 WORDS 重合
+    s = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        s = chr(97 + r) + s
+    return "q" + s
+
+
+def _text(rng: random.Random, words: int, rare: int = 0) -> str:
+    if not rare:
+        return " ".join(rng.choice(WORDS) for _ in range(words))
+    # 约 30% 的词取自 rare 个稀有词（对数均匀：少数常见、大量只出现几次），词表规模接近真实语料
+    return " ".join(_token(int(rare ** rng.random()) - 1) if rng.random() < 0.3 else rng.choice(WORDS) for _ in range(words))
+
+
+def iter_events(
+    n: int,
+    seed: int = 0,
+    n_bets: int = 50,
+    hit_rate: float = 0.3,
+    body_words: tuple = (20, 400),
+    span_hours: int = 24 * 30,
+    prefix: str = "evt_syn",
+    rare_words: int = 0,
+) -> Iterator[Event]:
+    """
+    - hit_rate：标题中提到某个 bet 的比例（其余事件与 bets 无关）
+    - rare_words > 0：正文 / 标题混入稀有词（默认 0 => 词表只有 WORDS，输出与旧版本相同）
+    - 标签：~15% 结构类、~5% force、~20% 行动类，外加 0~3 个噪声标签
+    - ts 在 [EPOCH, EPOCH + span_hours) 内均匀分布；source / tier 随机
+    """
+    rng = random.Random(seed)
+    for i in range(n):
+        tags: List[str] = []
+        if rng.random() < 0.15:
+            tags.append(rng.choice(STRUCT_TAGS))
+        if rng.random() < 0.05:
+            tags.append(rng.choice(FORCE_TAGS))
+        if rng.random() < 0.20:
+            tags.append(rng.choice(ACTION_TAGS))
+        tags += rng.sample(NOISE_TAGS, rng.randint(0, 3))
+
+        title = _text(rng, 6, rare_words)
+        if n_bets and rng.random() < hit_rate:
+            title = f"ASSET{rng.randrange(n_bets):04d}: {title}"
+        ts = EPOCH + timedelta(seconds=rng.randrange(span_hours * 3600))
+        src = rng.choice(SOURCES)
+        yield Event(
+            event_id=f"{prefix}_{seed}_{i:08d}",
+            ts=ts.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            title=title,
+            body=_text(rng, rng.randint(*body_words), rare_words),
+            url=f"https://{src}/a/{i}",
+            source=src,
+            source_tier=rng.choice(TIERS),
+            tags=tags,
+        )
+
+
+def make_events(n: int, seed: int = 0, **kw) -> List[Event]:
+    return list(iter_events(n, seed=seed, **kw))
+
+
+def write_event_files(out_dir: Path, events) -> int:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    n = 0
+    for ev in events:
+        (out_dir / f"{ev.event_id}.json").write_text(json.dumps(ev.to_dict(), ensure_ascii=False), encoding="utf-8")
+        n += 1
+    return n
+
+
+def make_feed(items: int, kind: str = "rss", seed: int = 0, body_words: int = 60) -> bytes:
+    """
+    RSS 2.0 或 Atom；items 个条目，每条 summary 约 body_words 个词（带少量 HTML，走 _strip_html 路径）。
+    """
+    rng = random.Random(seed)
+    out: List[str] = []
+    if kind == "atom":
+        out.append('<?xml version="1.0" encoding="utf-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom"><title>synthetic</title>')
+    else:
+        out.append('<?xml version="1.0" encoding="utf-8"?>\n<rss version="2.0"><channel><title>synthetic</title>')
+    for i in range(items):
+        title = escape(f"ASSET{rng.randrange(100):04d} {_text(rng, 8)}")
+        body = escape(f"<p>{_text(rng, body_words)}</p>")
+        ts = EPOCH + timedelta(minutes=i)
+        if kind == "atom":
+            out.append(
+                f"<entry><title>{title}</title><link rel=\"alternate\" href=\"https://feed.example.com/e/{i}\"/>"
+                f"<id>urn:syn:{i}</id><updated>{ts.isoformat()}</updated><summary type=\"html\">{body}</summary></entry>"
+            )
+        else:
+            out.append(
+                f"<item><title>{title}</title><link>https://feed.example.com/i/{i}</link>"
+                f"<guid>syn-{i}</guid><pubDate>{ts.strftime('%a, %d %b %Y %H:%M:%S +0000')}</pubDate>"
+                f"<description>{body}</description></item>"
+            )
+    out.append("</feed>" if kind == "atom" else "</channel></rss>")
+    return "\n".join(out).encode("utf-8")
+
+
+def write_audit_log(audit_dir: Path, n: int, seed: int = 0, months: int = 12) -> Path:
+    """
+    n 条 interrupts.jsonl 记录（分布在 months 个月内），格式与 audit.append_interrupt 一致。
+    """
+    rng = random.Random(seed)
+    audit_dir.mkdir(parents=True, exist_ok=True)
+    p = audit_dir / "interrupts.jsonl"
+    with p.open("w", encoding="utf-8") as f:
+        for i in range(n):
+            ts = EPOCH + timedelta(days=rng.randrange(months * 30), seconds=rng.randrange(86400))
+            rec = InterruptRecord(
+                ts=ts.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                event_id=f"evt_syn_audit_{i:08d}",
+                entity=f"ASSET{rng.randrange(100):04d}",
+                signal_type="STRUCT_CHANGE",
+                rule_id=rng.choice(["rule_v0_1", "rule_v0_2"]),
+                evidence="q1=A q2=B q3=B",
+                action=rng.choice(["SELL", "REDUCE", "BUY", "DO_NOTHING"]),
+                deadline="",
+                source_ref=rng.choice(SOURCES),
+            )
+            f.write(json.dumps(rec.__dict__, ensure_ascii=False) + "\n")
+    return p
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Deterministic synthetic data for SignalGate benchmarks.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    e = sub.add_parser("events", help="Write N event JSON files.")
+    e.add_argument("--n", type=int, required=True)
+    e.add_argument("--bets", type=int, default=50, help="Number of bets that titles may mention.")
+    e.add_argument("--out", required=True)
+    f = sub.add_parser("feed", help="Write one RSS/Atom feed.")
+    f.add_argument("--items", type=int, required=True)
+    f.add_argument("--kind", choices=["rss", "atom"], default="rss")
+    f.add_argument("--out", required=True)
+    b = sub.add_parser("bets", help="Write a bets.yaml with N direct bets.")
+    b.add_argument("--n", type=int, required=True)
+    b.add_argument("--out", required=True)
+    a = sub.add_parser("audit", help="Write an interrupts.jsonl with N records into a directory.")
+    a.add_argument("--n", type=int, required=True)
+    a.add_argument("--out", required=True)
+    for p in (e, f, b, a):
+        p.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    out = Path(args.out).expanduser()
+    if args.cmd == "events":
+        write_event_files(out, iter_events(args.n, seed=args.seed, n_bets=args.bets))
+    elif args.cmd == "feed":
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_bytes(make_feed(args.items, kind=args.kind, seed=args.seed))
+    elif args.cmd == "bets":
+        import yaml
+
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(yaml.safe_dump(make_bets(args.n, seed=args.seed), allow_unicode=True, sort_keys=False), encoding="utf-8")
+    else:
+        write_audit_log(out, args.n, seed=args.seed)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,71 +1,259 @@
 from __future__ import annotations
 
 import argparse
+import os
+import sys
 from pathlib import Path
 
 from .paths import get_paths
-from .core import run_once
-from .gate import reset_gate
-from .audit import summarize_interrupts
-from .ingest_cli import ingest
-from .notify import send_push
-from .fetch import fetch_rss_to_inbox
+
+# 子命令模块只在分发时导入：短命 CLI 进程的启动时间不为用不到的模块买单
+# （benchmarks/startup.py 检查启动预算）
 
 
 def main() -> None:
     p = argparse.ArgumentParser(prog="signalgate", add_help=True)
     p.add_argument("--root", default=None, help="Project root path (or env SIGNALGATE_HOME).")
+    p.add_argument(
+        "--metrics",
+        action="store_true",
+        help="Append per-stage timings of this call to data/state/metrics.jsonl (or env SIGNALGATE_METRICS=1).",
+    )
 
     sub = p.add_subparsers(dest="cmd", required=True)
 
     fx = sub.add_parser("fetch", help="Fetch RSS/Atom into data/inbox (silent by default).")
-    fx.add_argument("--url", required=True, help="RSS/Atom feed URL.")
-    fx.add_argument("--limit", type=int, default=20, help="Max items to write (default 20).")
-    fx.add_argument("--print-count", action="store_true", help="Print fetched count (opt-in).")
+    fx_src = fx.add_mutually_exclusive_group(required=True)
+    fx_src.add_argument("--url", help="RSS/Atom feed URL.")
+    fx_src.add_argument("--sources", help="sources.yaml with a feeds: list (concurrent fetch).")
+    fx.add_argument("--limit", type=int, default=20, help="Max items to write per feed (default 20).")
+    fx.add_argument("--timeout", type=int, default=20, help="Per-feed time limit in seconds, connect + download (default 20).")
+    fx.add_argument("--workers", type=int, default=8, help="With --sources: worker threads (default 8).")
+    fx.add_argument("--per-host", type=int, default=2, help="With --sources: max concurrent requests per host (default 2).")
+    fx.add_argument("--full", action="store_true", help="Ignore per-feed state (no conditional GET / cursor).")
+    fx.add_argument("--print-count", action="store_true", help="Print fetched count / per-feed summary (opt-in).")
 
     ig = sub.add_parser("ingest", help="Ingress layer: write events into cold store (silent by default).")
     ig.add_argument("--input", required=True, help="Path to an event.json file OR a directory of event jsons.")
     ig.add_argument("--glob", default="*.json", help="When --input is a directory, glob pattern to match files.")
+    ig.add_argument("--workers", type=int, default=0, help="Parallel decode processes for a directory input (0 = serial).")
+    ig.add_argument("--progress", action="store_true", help="With --workers: print progress to stderr (opt-in).")
     ig.add_argument("--print-count", action="store_true", help="Print ingested count (opt-in).")
 
-    r = sub.add_parser("run", help="Decision core: run once with an input event JSON file.")
-    r.add_argument("--input", required=True, help="Path to event.json")
+    r = sub.add_parser("run", help="Decision core: run once with an input event JSON file (or a batch).")
+    r_src = r.add_mutually_exclusive_group(required=True)
+    r_src.add_argument("--input", help="Path to event.json, OR a directory / glob of event jsons (batch).")
+    r_src.add_argument(
+        "--watch",
+        metavar="DIR",
+        help="Foreground: decide each new file in DIR (e.g. data/inbox) as it lands, until Ctrl-C; hot-reloads config.",
+    )
+    r.add_argument("--glob", default="*.json", help="When --input / --watch is a directory, glob pattern to match files.")
+    r.add_argument("--poll", action="store_true", help="With --watch: poll the directory even where inotify is available.")
     r.add_argument("--dry-run", action="store_true", help="Evaluate only; do NOT write cold/audit/state (opt-in).")
+    r.add_argument("--outbox", action="store_true", help="Also queue emitted interrupts in data/state/outbox for notify --drain.")
+    r.add_argument("--print-stats", action="store_true", help="Print batch throughput (or watch latency on exit) to stderr (opt-in).")
+
+    pl = sub.add_parser("pipeline", help="fetch -> ingest -> decide -> notify in one process (no data/inbox round trip).")
+    pl_src = pl.add_mutually_exclusive_group()
+    pl_src.add_argument("--url", help="RSS/Atom feed URL.")
+    pl_src.add_argument("--sources", help="sources.yaml with a feeds: list (concurrent fetch).")
+    pl.add_argument("--limit", type=int, default=20, help="Max new items per feed (default 20).")
+    pl.add_argument("--timeout", type=int, default=20, help="Per-feed time limit in seconds, connect + download (default 20).")
+    pl.add_argument("--workers", type=int, default=8, help="With --sources: worker threads (default 8).")
+    pl.add_argument("--per-host", type=int, default=2, help="With --sources: max concurrent requests per host (default 2).")
+    pl.add_argument("--full", action="store_true", help="Ignore per-feed state (no conditional GET / cursor).")
+    pl.add_argument("--dry-run", action="store_true", help="Decide and print like run --dry-run; writes nothing, pushes nothing (opt-in).")
+    pl.add_argument("--notify", action="store_true", help="Push emitted interrupts through the outbox (needs PUSHDEER_KEY).")
+    pl.add_argument("--window", type=float, default=30.0, help="With --notify: coalescing window in seconds (default 30).")
+    pl.add_argument("--print-stats", action="store_true", help="Print counts and per-stage timings to stderr (opt-in).")
 
     n = sub.add_parser("notify", help="Send PushDeer notification (explicit only).")
-    n.add_argument("--text", required=True, help="Title / short text.")
+    n_src = n.add_mutually_exclusive_group(required=True)
+    n_src.add_argument("--text", help="Title / short text.")
+    n_src.add_argument("--drain", action="store_true", help="Push everything queued by run --outbox (retries, coalescing).")
     n.add_argument("--desp", default="", help="Body / description.")
+    n.add_argument(
+        "--window",
+        type=float,
+        default=30.0,
+        help="With --drain: coalesce interrupts queued within N seconds of each other, up to interrupt.coalesce_max_chars (default 30).",
+    )
+    n.add_argument("--print-stats", action="store_true", help="With --drain: print drain throughput / latency to stderr (opt-in).")
     n.add_argument("--pushkey", default=None, help="Override env PUSHDEER_KEY.")
     n.add_argument("--url", default=None, help="Override env PUSHDEER_URL (default api2.pushdeer.com).")
 
     a = sub.add_parser("audit", help="Show audit summary (only on explicit request).")
+    a.add_argument("--by", choices=["entity", "action", "rule_id", "month"], default=None, help="Breakdown dimension.")
+    a.add_argument("--month", default=None, help="Only this month (YYYY-MM).")
+
+    mc = sub.add_parser("migrate-cold", help="Convert per-file cold store into append-only NDJSON segments (one-shot).")
+    mc.add_argument("--segment-mb", type=int, default=64, help="Segment rollover size in MB (default 64).")
+    mc.add_argument("--tentative", action="store_true", help="Also migrate data/tentative.")
+    mc.add_argument("--print-count", action="store_true", help="Print migrated count (opt-in).")
+
+    cp = sub.add_parser("compact", help="Compress/expire old cold + tentative data per retention tiers (explicit only).")
+    cp.add_argument("--hot-days", type=int, default=None, help="Keep uncompressed for N days (default rules.yaml retention.hot_days).")
+    cp.add_argument("--codec", choices=["gzip", "lzma"], default=None, help="Archive codec (default rules.yaml retention.codec).")
+    cp.add_argument("--drop-after-days", type=int, default=None, help="Drop data older than N days; 0 = never.")
+    cp.add_argument("--print-count", action="store_true", help="Print compaction counts (opt-in).")
+
+    rp = sub.add_parser("replay", help="Backtest a candidate rules/bets config over cold + tentative (read-only).")
+    rp.add_argument("--rules", default=None, help="Candidate rules.yaml (default: current config/rules.yaml).")
+    rp.add_argument("--bets", default=None, help="Candidate bets.yaml (default: current config/bets.yaml).")
+    rp.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Decision processes (default: CPU count; 1 = in-process).")
+    rp.add_argument("--samples", type=int, default=20, help="List the first N events whose outcome changes (default 20).")
+    rp.add_argument(
+        "--reset-after",
+        type=float,
+        default=0.0,
+        help="Simulate a manual reset-gate N hours after each trip (default 0 = never, like production).",
+    )
+    rp.add_argument("--json", action="store_true", help="Print the report as JSON.")
+
+    im = sub.add_parser("impact", help="List stored events whose outcome a rules/bets change would flip (index lookup).")
+    im.add_argument("--rules", default=None, help="New rules.yaml (default: current config/rules.yaml).")
+    im.add_argument("--bets", default=None, help="New bets.yaml (default: current config/bets.yaml).")
+    im.add_argument("--limit", type=int, default=50, help="List at most N affected events (default 50).")
+    im.add_argument("--json", action="store_true", help="Print the full report as JSON.")
+
+    se = sub.add_parser("search", help="Full-text search over cold + tentative (title/body/tags/source, BM25).")
+    se.add_argument("query", nargs="+", help="Search terms.")
+    se.add_argument("--since", default=None, help="Only events at or after this time (ISO date or datetime, UTC).")
+    se.add_argument("--until", default=None, help="Only events before this time (ISO date or datetime, UTC).")
+    se.add_argument("--tier", default=None, help="Only these source tiers, comma-separated (e.g. A,B).")
+    se.add_argument("--limit", type=int, default=20, help="Top N hits (default 20).")
+    se.add_argument("--json", action="store_true", help="Print hits as JSON.")
+
+    mt = sub.add_parser("metrics", help="Show p50/p95 per stage from data/state/metrics.jsonl (explicit only).")
+    mt.add_argument("--cmd", dest="only_cmd", default=None, help="Only records of this subcommand (e.g. run).")
+    mt.add_argument("--last", type=int, default=0, help="Only the last N records (0 = all).")
 
     g = sub.add_parser("reset-gate", help="Reset circuit breaker gate state (manual only).")
 
     args = p.parse_args()
     paths = get_paths(args.root)
 
+    if args.cmd == "metrics":
+        from .metrics import summarize_metrics
+
+        print(summarize_metrics(paths.state_dir, cmd=args.only_cmd, last=int(args.last)))
+        return
+
+    from . import metrics
+
+    if not (args.metrics or metrics.env_enabled()):
+        _dispatch(args, paths)
+        return
+
+    # opt-in：计时只写文件，不输出
+    metrics.start(args.cmd)
+    ok = False
+    try:
+        _dispatch(args, paths)
+        ok = True
+    finally:
+        metrics.finish(paths.state_dir, ok=ok)
+
+
+def _dispatch(args, paths) -> None:
     if args.cmd == "fetch":
+        from .config import load_yaml
+        from .fetch import fetch_feeds_to_inbox, fetch_rss_to_inbox, load_feed_specs
+        from .seen import open_seen
+
+        feed_state_dir = None if args.full else paths.state_dir
+        if args.sources:
+            feeds = load_feed_specs(
+                load_yaml(Path(args.sources).expanduser().resolve()),
+                limit=int(args.limit),
+                timeout=int(args.timeout),
+            )
+            results = fetch_feeds_to_inbox(
+                feeds,
+                inbox_dir=paths.data_dir / "inbox",
+                workers=int(args.workers),
+                per_host=int(args.per_host),
+                state_dir=feed_state_dir,
+                seen=open_seen(paths.cold_dir),
+            )
+            if args.print_count:
+                for r in results:
+                    status = ("304" if r.not_modified else "ok") if r.ok else f"ERR {r.error}"
+                    print(f"{r.url}\titems={r.items}\tseen={r.skipped}\tlatency={r.latency_s * 1000:.0f}ms\t{status}")
+                failed = sum(1 for r in results if not r.ok)
+                print(f"Fetched: {sum(r.items for r in results)} feeds={len(results)} failed={failed}")
+            return
+
         n_fx = fetch_rss_to_inbox(
             url=str(args.url),
             inbox_dir=paths.data_dir / "inbox",
             limit=int(args.limit),
+            timeout=int(args.timeout),
+            state_dir=feed_state_dir,
+            seen=open_seen(paths.cold_dir),
         )
         if args.print_count:
             print(f"Fetched: {n_fx}")
         return
 
     if args.cmd == "ingest":
-        n_ing = ingest(
-            input_path=Path(args.input).expanduser().resolve(),
+        from .ingest_cli import default_checkpoint, ingest
+
+        input_path = Path(args.input).expanduser().resolve()
+
+        def _progress(res, elapsed: float) -> None:
+            rate = res.files / elapsed if elapsed > 0 else 0.0
+            print(
+                f"ingest: files={res.files} new={res.new} skipped={res.skipped} "
+                f"failed={res.failed} resumed={res.resumed} {rate:.0f} files/s",
+                file=sys.stderr,
+            )
+
+        res_ing = ingest(
+            input_path=input_path,
             cold_dir=paths.cold_dir,
             glob_pattern=str(args.glob),
+            workers=int(args.workers),
+            checkpoint=default_checkpoint(paths.state_dir, input_path, str(args.glob)),
+            progress=_progress if args.progress else None,
         )
         if args.print_count:
-            print(f"Ingested: {n_ing}")
+            extra = f" failed: {res_ing.failed} resumed: {res_ing.resumed}" if args.workers > 1 else ""
+            print(f"Ingested: {res_ing.new} skipped: {res_ing.skipped}{extra}")
+        return
+
+    if args.cmd == "run" and args.watch:
+        _run_watch(args, paths)
         return
 
     if args.cmd == "run":
+        from .core import iter_batch_inputs, run_batch, run_once
+
+        single = Path(args.input).expanduser()
+        if not single.is_file():
+            inputs = iter_batch_inputs(str(args.input), str(args.glob))
+            # 目录为空是正常的空跑；既不是文件 / 目录、glob 也没有匹配 => 多半是路径写错
+            if not inputs and not single.is_dir():
+                raise SystemExit(f"ERR: input not found: {args.input}")
+            res = run_batch(
+                config_dir=paths.config_dir,
+                cold_dir=paths.cold_dir,
+                audit_dir=paths.audit_dir,
+                state_dir=paths.state_dir,
+                inputs=inputs,
+                dry_run=bool(args.dry_run),
+                outbox=bool(args.outbox),
+                on_output=lambda msg: print(msg, flush=True),
+            )
+            if args.print_stats:
+                print(
+                    f"Processed: {res.processed} failed: {res.failed} "
+                    f"elapsed: {res.elapsed_s:.3f}s throughput: {res.events_per_sec:.1f} events/sec",
+                    file=sys.stderr,
+                )
+            return
+
         msg = run_once(
             config_dir=paths.config_dir,
             cold_dir=paths.cold_dir,
@@ -73,6 +261,7 @@ def main() -> None:
             state_dir=paths.state_dir,
             input_json=Path(args.input).expanduser().resolve(),
             dry_run=bool(args.dry_run),
+            outbox=bool(args.outbox),
         )
         if args.dry_run:
             print(msg)
@@ -81,7 +270,17 @@ def main() -> None:
                 print(msg)
         return
 
+    if args.cmd == "pipeline":
+        _pipeline(args, paths)
+        return
+
+    if args.cmd == "notify" and args.drain:
+        _notify_drain(args, paths)
+        return
+
     if args.cmd == "notify":
+        from .notify import send_push
+
         ok = send_push(text=str(args.text), desp=str(args.desp), pushkey=args.pushkey, url=args.url)
         if ok:
             print("OK: pushed.")
@@ -90,14 +289,272 @@ def main() -> None:
         return
 
     if args.cmd == "audit":
-        print(summarize_interrupts(paths.audit_dir))
+        from .audit import summarize_interrupts
+
+        print(summarize_interrupts(paths.audit_dir, by=args.by, month=args.month))
+        return
+
+    if args.cmd == "migrate-cold":
+        from .coldstore import migrate_to_segments
+
+        dirs = [paths.cold_dir] + ([paths.data_dir / "tentative"] if args.tentative else [])
+        for d in dirs:
+            if not d.exists():
+                continue
+            moved, skipped = migrate_to_segments(d, max_segment_bytes=int(args.segment_mb) * 1024 * 1024)
+            if args.print_count:
+                print(f"Migrated: {moved} skipped: {skipped} ({d.name})")
+        return
+
+    if args.cmd == "compact":
+        from .config import ConfigError
+        from .decision import load_rules
+        from .retention import compact_dir, load_policy
+
+        try:
+            policy = load_policy(load_rules(paths.config_dir, paths.state_dir))
+        except ConfigError as e:
+            raise SystemExit(f"ERR: {e}")
+        if args.hot_days is not None:
+            policy.hot_days = int(args.hot_days)
+        if args.codec is not None:
+            policy.codec = str(args.codec)
+        if args.drop_after_days is not None:
+            policy.drop_after_days = int(args.drop_after_days)
+        for d in (paths.cold_dir, paths.data_dir / "tentative"):
+            st = compact_dir(d, policy)
+            if args.print_count:
+                print(f"Compacted {d.name}: kept={st.kept} archived={st.archived} dropped={st.dropped} deduped={st.deduped}")
+        return
+
+    if args.cmd == "replay":
+        import json
+
+        from .config import ConfigError, compile_rules, load_config, load_yaml
+        from .replay import format_report, replay
+
+        # 只读：不传 state_dir（不写配置快照）；候选配置缺省 = 当前配置
+        cur = load_config(paths.config_dir)
+        try:
+            alt_rules = load_yaml(Path(args.rules).expanduser()) if args.rules else cur.rules
+            alt_bets = load_yaml(Path(args.bets).expanduser()) if args.bets else cur.bets
+            if not isinstance(alt_bets, dict):
+                raise ConfigError(f"{args.bets}: top level must be a mapping")
+            compile_rules(alt_rules)
+        except Exception as e:  # 文件缺失 / YAML 语法错误 / ConfigError（yaml 延迟导入，不能直接引用异常类）
+            raise SystemExit(f"ERR: {e}")
+        rep = replay(
+            roots=[paths.cold_dir, paths.data_dir / "tentative"],
+            cur_bets=cur.bets,
+            cur_rules=cur.rules,
+            alt_bets=alt_bets,
+            alt_rules=alt_rules,
+            workers=int(args.workers),
+            samples=int(args.samples),
+            reset_after_hours=float(args.reset_after),
+        )
+        print(json.dumps(rep.to_dict(), ensure_ascii=False, indent=2) if args.json else format_report(rep))
+        return
+
+    if args.cmd == "impact":
+        import json
+
+        from .config import ConfigError, compile_rules, load_config, load_yaml
+        from .impact import format_report, impact
+        from .matcher import compile_bets
+
+        cur = load_config(paths.config_dir)
+        try:
+            new_rules = load_yaml(Path(args.rules).expanduser()) if args.rules else cur.rules
+            new_bets = load_yaml(Path(args.bets).expanduser()) if args.bets else cur.bets
+            if not isinstance(new_bets, dict):
+                raise ConfigError(f"{args.bets}: top level must be a mapping")
+            compile_rules(new_rules)
+            compile_bets(new_bets)
+        except Exception as e:  # 同 replay
+            raise SystemExit(f"ERR: {e}")
+        rep = impact(
+            roots=[paths.cold_dir, paths.data_dir / "tentative"],
+            old_bets=cur.bets,
+            old_rules=cur.rules,
+            new_bets=new_bets,
+            new_rules=new_rules,
+        )
+        print(json.dumps(rep.to_dict(), ensure_ascii=False, indent=2) if args.json else format_report(rep, limit=int(args.limit)))
+        return
+
+    if args.cmd == "search":
+        import json
+
+        from .observation import parse_ts
+        from .search import format_hits, search
+
+        bounds = {}
+        for name in ("since", "until"):
+            v = getattr(args, name)
+            bounds[name] = parse_ts(v) if v else None
+            if v and bounds[name] is None:
+                raise SystemExit(f"ERR: --{name}: not an ISO date/datetime: {v}")
+        tiers = {t.strip().upper() for t in args.tier.split(",") if t.strip()} if args.tier else None
+        hits = search(
+            roots=[paths.cold_dir, paths.data_dir / "tentative"],
+            query=" ".join(args.query),
+            limit=int(args.limit),
+            since=bounds["since"],
+            until=bounds["until"],
+            tiers=tiers,
+        )
+        if args.json:
+            print(json.dumps([h.to_dict() for h in hits], ensure_ascii=False, indent=2))
+        else:
+            print(format_hits(hits))
         return
 
     if args.cmd == "reset-gate":
+        from .gate import reset_gate
+
         reset_gate(paths.state_dir)
         print("OK: gate reset.")
         return
 
 
+def _run_watch(args, paths) -> None:
+    import time
+
+    from .core import run_watch
+
+    def config_error(e: Exception) -> None:
+        print(f"ERR: config: {e} (keeping the previous config)", file=sys.stderr)
+
+    processed = failed = 0
+    lat = []
+    t0 = time.perf_counter()
+    items = run_watch(
+        config_dir=paths.config_dir,
+        cold_dir=paths.cold_dir,
+        audit_dir=paths.audit_dir,
+        state_dir=paths.state_dir,
+        inbox=Path(args.watch).expanduser().resolve(),
+        glob_pattern=str(args.glob),
+        dry_run=bool(args.dry_run),
+        outbox=bool(args.outbox),
+        poll=bool(args.poll),
+        on_config_error=config_error,
+    )
+    try:
+        for it in items:
+            if it.failed:
+                failed += 1
+                continue
+            processed += 1
+            lat.append(it.latency_s)
+            if it.output:
+                print(it.output, flush=True)
+    except RuntimeError as e:  # 同一 inbox 已有别的 watch 进程
+        raise SystemExit(f"ERR: {e}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        items.close()
+    if args.print_stats:
+        lat.sort()
+        pct = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] * 1000 if lat else 0.0  # noqa: E731
+        print(
+            f"Processed: {processed} failed: {failed} elapsed: {time.perf_counter() - t0:.1f}s "
+            f"latency p50: {pct(0.5):.0f}ms p95: {pct(0.95):.0f}ms",
+            file=sys.stderr,
+        )
+
+
+def _pipeline(args, paths) -> None:
+    from .fetch import load_feed_specs
+    from .pipeline import run_pipeline
+
+    if args.sources:
+        from .config import load_yaml
+
+        feeds = load_feed_specs(
+            load_yaml(Path(args.sources).expanduser().resolve()),
+            limit=int(args.limit),
+            timeout=int(args.timeout),
+        )
+    elif args.url:
+        feeds = load_feed_specs({"feeds": [{"url": str(args.url), "tier": "B"}]}, limit=int(args.limit), timeout=int(args.timeout))
+    else:
+        feeds = []  # 只处理 data/inbox 中已有的文件
+    pusher = None
+    if args.notify and not args.dry_run:
+        from .notify import Pusher
+
+        try:
+            pusher = Pusher()
+        except RuntimeError as e:
+            raise SystemExit(f"ERR: {e}")
+
+    try:
+        res = run_pipeline(
+            config_dir=paths.config_dir,
+            cold_dir=paths.cold_dir,
+            audit_dir=paths.audit_dir,
+            state_dir=paths.state_dir,
+            inbox_dir=paths.data_dir / "inbox",
+            feeds=feeds,
+            workers=int(args.workers),
+            per_host=int(args.per_host),
+            full=bool(args.full),
+            dry_run=bool(args.dry_run),
+            pusher=pusher,
+            window_s=float(args.window),
+            on_output=lambda msg: print(msg, flush=True),
+        )
+    finally:
+        if pusher is not None:
+            pusher.close()
+    if args.print_stats:
+        failed = [f for f in res.feeds if not f.ok]
+        lines = [
+            f"Fetched: {res.fetched} feeds={len(res.feeds)} failed={len(failed)} inbox: {res.inbox} (unreadable {res.failed}) "
+            f"new: {res.new} decided: {res.decided} output: {res.emitted} archived: {res.archived} "
+            f"elapsed: {res.elapsed_s:.3f}s"
+        ]
+        lines += [f"  {f.url}\tERR {f.error}" for f in failed]
+        if res.drain is not None:
+            d = res.drain
+            lines.append(f"Notify: sent {d.sent} in {d.messages} message(s) retries: {d.retries} pending: {d.pending}")
+        lines += [f"  {k:<14}{v * 1000:>10.1f}ms" for k, v in res.stages.items()]
+        print("\n".join(lines), file=sys.stderr)
+    if res.drain is not None and res.drain.error:
+        raise SystemExit(f"ERR: push failed ({res.drain.error}); {res.drain.pending} interrupt(s) left in outbox.")
+
+
+def _notify_drain(args, paths) -> None:
+    from .config import compile_rules, load_config
+    from .notify import Pusher
+    from .outbox import drain, pending
+
+    if not pending(paths.state_dir):  # 没有积压就不需要 PUSHDEER_KEY
+        print("OK: outbox empty.")
+        return
+    max_chars = compile_rules(load_config(paths.config_dir, paths.state_dir).rules).coalesce_max_chars
+    try:
+        with Pusher(pushkey=args.pushkey, url=args.url) as p:
+            res = drain(paths.state_dir, p, window_s=float(args.window), max_chars=max_chars)
+    except RuntimeError as e:  # 缺 PUSHDEER_KEY / 另一个 drain 正在运行
+        raise SystemExit(f"ERR: {e}")
+    if args.print_stats:
+        lat = sorted(res.latencies)
+        pct = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] if lat else 0.0  # noqa: E731
+        rate = res.sent / res.elapsed_s if res.elapsed_s > 0 else 0.0
+        print(
+            f"Sent: {res.sent} messages: {res.messages} retries: {res.retries} pending: {res.pending} "
+            f"elapsed: {res.elapsed_s:.3f}s throughput: {rate:.1f} interrupts/sec "
+            f"queued->sent p50: {pct(0.5):.1f}s p95: {pct(0.95):.1f}s",
+            file=sys.stderr,
+        )
+    if res.error:
+        raise SystemExit(f"ERR: push failed ({res.error}); {res.pending} interrupt(s) left in outbox.")
+    print(f"OK: pushed {res.sent} interrupt(s) in {res.messages} message(s)." if res.sent else "OK: outbox empty.")
+
+
 if __name__ == "__main__":
     main()
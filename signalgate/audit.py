@@ -1,33 +1,140 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import os
 from pathlib import Path
-from typing import Iterable, List
+from typing import Dict, List, Optional
 
+from .locks import file_lock, lock_fd, tmp_path
 from .models import InterruptRecord
 
+ROLLUP_NAME = "interrupts.rollup.json"
+ROLLUP_VERSION = 1
+DIMENSIONS = ("entity", "action", "rule_id")
+_HEAD_BYTES = 256  # 用文件头部摘要识别轮转/重写
+
 
 def append_interrupt(audit_dir: Path, rec: InterruptRecord) -> Path:
     """
     审计写入：只记录事实（默认不输出）。
+    - 整行一次 write（O_APPEND）+ flock：多进程并发追加不会交错出半行
     """
+    audit_dir.mkdir(parents=True, exist_ok=True)
     p = audit_dir / "interrupts.jsonl"
-    line = json.dumps(rec.__dict__, ensure_ascii=False)
-    with p.open("a", encoding="utf-8") as f:
-        f.write(line + "\n")
+    line = (json.dumps(rec.__dict__, ensure_ascii=False) + "\n").encode("utf-8")
+    fd = os.open(p, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        lock_fd(fd)
+        os.write(fd, line)
+    finally:
+        os.close(fd)
     return p
 
 
-def summarize_interrupts(audit_dir: Path) -> str:
+def _head_digest(p: Path, n: int) -> str:
+    with p.open("rb") as f:
+        return hashlib.sha1(f.read(n)).hexdigest()
+
+
+def _empty_rollup() -> Dict:
+    return {"version": ROLLUP_VERSION, "offset": 0, "head_len": 0, "head": "", "total": 0, "months": {}}
+
+
+def _bump(rollup: Dict, rec: Dict) -> None:
+    month = str(rec.get("ts") or "")[:7] or "unknown"
+    m = rollup["months"].setdefault(month, {"total": 0, **{d: {} for d in DIMENSIONS}})
+    m["total"] += 1
+    for d in DIMENSIONS:
+        k = str(rec.get(d) or "") or "-"
+        m[d][k] = m[d].get(k, 0) + 1
+    rollup["total"] += 1
+
+
+def update_rollup(audit_dir: Path) -> Dict:
+    """
+    增量汇总（checkpoint = 已读字节偏移）：
+    - 只读取上次偏移之后的完整行：O(新增行数)
+    - 日志被截断 / 轮转（长度变短或文件头变化）=> 从头重建
+    - 按月份保存 entity / action / rule_id 计数
+    - 多个进程同时汇总：加锁串行，避免重复计数 / 互相覆盖
+    """
+    with file_lock(audit_dir / (ROLLUP_NAME + ".lock")):
+        return _update_rollup(audit_dir)
+
+
+def _update_rollup(audit_dir: Path) -> Dict:
+    log = audit_dir / "interrupts.jsonl"
+    rp = audit_dir / ROLLUP_NAME
+
+    rollup = _empty_rollup()
+    if rp.exists():
+        try:
+            obj = json.loads(rp.read_text(encoding="utf-8"))
+            if int(obj.get("version") or 0) == ROLLUP_VERSION:
+                rollup = obj
+        except Exception:
+            pass
+
+    if not log.exists():
+        return _empty_rollup()
+
+    size = log.stat().st_size
+    if size < int(rollup["offset"]) or _head_digest(log, int(rollup["head_len"])) != rollup["head"]:
+        rollup = _empty_rollup()
+        rollup["head"] = _head_digest(log, 0)
+
+    if size == int(rollup["offset"]):
+        return rollup
+
+    offset = int(rollup["offset"])
+    with log.open("rb") as f:
+        f.seek(offset)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break  # 半行：等写完再计入
+            offset += len(raw)
+            try:
+                _bump(rollup, json.loads(raw))
+            except Exception:
+                continue
+
+    rollup["offset"] = offset
+    rollup["head_len"] = min(offset, _HEAD_BYTES)
+    rollup["head"] = _head_digest(log, rollup["head_len"])
+    tmp = tmp_path(rp)
+    tmp.write_text(json.dumps(rollup, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, rp)
+    return rollup
+
+
+def summarize_interrupts(audit_dir: Path, by: Optional[str] = None, month: Optional[str] = None) -> str:
     """
     用户显式调用 audit 时才输出摘要（最小）。
+    - by：entity / action / rule_id / month 分组
+    - month：只看某月（YYYY-MM）
     """
     p = audit_dir / "interrupts.jsonl"
     if not p.exists():
         return "No interrupts."
 
-    cnt = 0
-    with p.open("r", encoding="utf-8") as f:
-        for _ in f:
-            cnt += 1
-    return f"Interrupt count: {cnt}"
+    rollup = update_rollup(audit_dir)
+    months: Dict[str, Dict] = rollup["months"]
+    if month:
+        months = {month: months[month]} if month in months else {}
+
+    cnt = sum(int(m["total"]) for m in months.values())
+    scope = f" ({month})" if month else ""
+    lines: List[str] = [f"Interrupt count{scope}: {cnt}"]
+
+    if by == "month":
+        lines.append(f"By month{scope}:")
+        lines += [f"  {k}\t{int(v['total'])}" for k, v in sorted(months.items())]
+    elif by:
+        agg: Dict[str, int] = {}
+        for m in months.values():
+            for k, v in (m.get(by) or {}).items():
+                agg[k] = agg.get(k, 0) + int(v)
+        lines.append(f"By {by}{scope}:")
+        lines += [f"  {k}\t{v}" for k, v in sorted(agg.items(), key=lambda kv: (-kv[1], kv[0]))]
+    return "\n".join(lines)
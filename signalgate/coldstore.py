@@ -0,0 +1,510 @@
+from __future__ import annotations
+
+import importlib
+import json
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from . import metrics
+from .locks import lock_fd, tmp_path, unlock_fd
+from .models import Event
+
+SEGMENTS_DIR = "segments"
+META_NAME = "meta.json"
+INDEX_NAME = "index.tsv"
+LOCK_NAME = ".lock"
+ARCHIVE_DIR = "archive"
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+
+# 压缩层（retention 之后的冷数据）：archive/YYYY-MM.ndjson.<ext>
+CODECS = {"gzip": ".gz", "lzma": ".xz"}
+_OPENERS = {".gz": "gzip", ".xz": "lzma"}  # 压缩模块按需导入（热路径不需要）
+
+
+class FileStore:
+    """
+    v0.1 默认冷存：每个事件一个 JSON 文件（<event_id>.json）。
+    """
+
+    kind = "files"
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._dir = str(root)
+
+    def append(self, event: Event) -> Path:
+        # tmp + rename：并发读者 / 写者只会看到完整文件
+        out = self.root / f"{event.event_id}.json"
+        tmp = tmp_path(out)
+        data = json.dumps(event.to_dict(), ensure_ascii=False, indent=2).encode("utf-8")
+        tmp.write_bytes(data)
+        os.replace(tmp, out)
+        metrics.count("events_written")
+        metrics.count("bytes_written", len(data))
+        return out
+
+    def flush(self) -> None:
+        pass
+
+    def get(self, event_id: str) -> Optional[Event]:
+        # 批量点读（impact / get_events）的热路径：不构造 Path，不先 stat
+        try:
+            with open(os.path.join(self._dir, event_id + ".json"), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        return Event.from_dict(json.loads(data), event_id)
+
+    def __contains__(self, event_id: str) -> bool:
+        return (self.root / f"{event_id}.json").exists()
+
+    def iter_ids(self) -> Iterator[str]:
+        # 存储的 event_id（与 iter_entries 相同的取法）：文件名不一定等于 event_id，不能用 p.stem
+        for p in self.root.glob("*.json"):
+            try:
+                obj = json.loads(p.read_bytes())
+            except (OSError, ValueError):
+                continue
+            if isinstance(obj, dict):
+                yield str(obj.get("event_id") or obj.get("id") or p.stem)
+
+    def iter_entries(self) -> Iterator[Tuple[Path, Event]]:
+        # (文件路径, 事件)：文件名不一定等于 event_id（旧数据 / 手写文件）
+        for p in sorted(self.root.glob("*.json")):
+            try:
+                yield p, Event.from_dict(json.loads(p.read_text(encoding="utf-8")), p.stem)
+            except Exception:
+                continue
+
+    def iter_events(self) -> Iterator[Event]:
+        for _, ev in self.iter_entries():
+            yield ev
+
+
+@dataclass(frozen=True)
+class _Loc:
+    seg: int
+    offset: int
+    length: int
+
+
+class SegmentStore:
+    """
+    分段冷存（可选模式）：
+    - segments/seg-NNNNNN.ndjson：append-only，一行一个事件；超过 max_segment_bytes 滚动到新段
+    - segments/index.tsv：event_id -> (segment, offset, length)，点读 O(1)
+    - 同一 event_id 重复写入：后写覆盖（索引取最后一条）
+    - 崩溃恢复：打开时把最后一段中“已写入但未入索引”的尾部补进索引
+    - 多进程共享：写入前持有 segments/.lock（flock），并先追平其他进程追加的索引尾部；
+      缓冲数据落盘（flush）后才释放，批量模式下锁跨多次 append 持有
+    """
+
+    kind = "segments"
+
+    def __init__(self, root: Path, dir_name: str = SEGMENTS_DIR):
+        self.root = root
+        self.dir = root / dir_name
+        meta = json.loads((self.dir / META_NAME).read_text(encoding="utf-8"))
+        self.max_segment_bytes = int(meta.get("max_segment_bytes") or DEFAULT_SEGMENT_BYTES)
+
+        self._index: Dict[str, _Loc] = {}
+        self._ends: Dict[int, int] = {}   # 段 -> 已入索引的末尾偏移
+        self._idx_size = 0                # 已读入内存的 index.tsv 字节数
+        self._seg = 1
+        self._seg_f = None
+        self._idx_f = None
+        self._lock_fd: Optional[int] = None
+        self._acquire()
+        self.flush()
+
+    # ---- 布局
+    def _seg_path(self, n: int) -> Path:
+        return self.dir / f"seg-{n:06d}.ndjson"
+
+    def segment_numbers(self) -> list[int]:
+        return sorted(int(p.stem.split("-")[1]) for p in self.dir.glob("seg-*.ndjson"))
+
+    # ---- 锁
+    def _acquire(self) -> None:
+        if self._lock_fd is not None:
+            return
+        fd = os.open(self.dir / LOCK_NAME, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if not lock_fd(fd, blocking=False):
+                # 等待前先释放本进程持有的其他 store 锁（tentative / cold 交叉持有会死锁）
+                release_locks(keep=self)
+                lock_fd(fd)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._lock_fd = fd
+        _LOCKED.add(self)
+        self._sync()
+
+    def _release(self) -> None:
+        if self._lock_fd is None:
+            return
+        unlock_fd(self._lock_fd)
+        os.close(self._lock_fd)
+        self._lock_fd = None
+        _LOCKED.discard(self)
+
+    def _sync(self) -> None:
+        """
+        持锁后追平磁盘：读入 index.tsv 新增的完整行、切到最新段、补齐未入索引的段尾。
+        """
+        first = self._idx_size == 0
+        p = self.dir / INDEX_NAME
+        if p.exists() and p.stat().st_size > self._idx_size:
+            sizes = {n: self._seg_path(n).stat().st_size for n in self.segment_numbers()} if first else None
+            with p.open("rb") as f:
+                f.seek(self._idx_size)
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break
+                    self._idx_size += len(raw)
+                    parts = raw.decode("utf-8").rstrip("\n").split("\t")
+                    if len(parts) != 4:
+                        continue
+                    loc = _Loc(int(parts[1]), int(parts[2]), int(parts[3]))
+                    # 索引先于段落盘（崩溃）：丢弃指向不存在数据的条目
+                    if sizes is not None and loc.offset + loc.length > sizes.get(loc.seg, -1):
+                        continue
+                    self._put(parts[0], loc)
+
+        seg = self._seg
+        if first:
+            segs = self.segment_numbers()
+            seg = segs[-1] if segs else 1
+        while self._seg_path(seg + 1).exists():
+            seg += 1
+        if seg != self._seg and self._seg_f is not None:
+            self._seg_f.close()
+            self._seg_f = None
+        self._seg = seg
+        if self._seg_f is not None:
+            self._seg_f.seek(0, os.SEEK_END)  # 其他进程可能已追加
+        self._recover_tail()
+
+    # ---- 索引
+    def _put(self, event_id: str, loc: _Loc) -> None:
+        self._index[event_id] = loc
+        end = loc.offset + loc.length
+        if end > self._ends.get(loc.seg, 0):
+            self._ends[loc.seg] = end
+
+    def _recover_tail(self) -> None:
+        sp = self._seg_path(self._seg)
+        if not sp.exists():
+            return
+        end = self._ends.get(self._seg, 0)
+        size = sp.stat().st_size
+        if size <= end:
+            return
+        with sp.open("rb") as f:
+            f.seek(end)
+            off = end
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                try:
+                    eid = str(json.loads(raw).get("event_id") or "")
+                except Exception:
+                    eid = ""
+                if eid:
+                    self._index_append(eid, _Loc(self._seg, off, len(raw)))
+                off += len(raw)
+
+    def _index_append(self, event_id: str, loc: _Loc) -> None:
+        if self._idx_f is None:
+            self._idx_f = (self.dir / INDEX_NAME).open("ab")
+        line = f"{event_id}\t{loc.seg}\t{loc.offset}\t{loc.length}\n".encode("utf-8")
+        self._idx_f.write(line)
+        self._idx_size += len(line)  # 持锁写入：文件末尾只会因本进程而增长
+        self._put(event_id, loc)
+
+    # ---- 写
+    def append(self, event: Event) -> Path:
+        line = (json.dumps(event.to_dict(), ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+        self._acquire()
+        if self._seg_f is None:
+            self._seg_f = self._seg_path(self._seg).open("ab")
+        offset = self._seg_f.tell()
+        if offset and offset + len(line) > self.max_segment_bytes:
+            self._seg_f.close()
+            self._seg += 1
+            self._seg_f = self._seg_path(self._seg).open("ab")
+            offset = self._seg_f.tell()
+
+        self._seg_f.write(line)
+        self._index_append(event.event_id, _Loc(self._seg, offset, len(line)))
+        metrics.count("events_written")
+        metrics.count("bytes_written", len(line))
+        if not _BULK:
+            self.flush()
+        return self._seg_path(self._seg)
+
+    def flush(self) -> None:
+        # 先段后索引：索引永远不会指向未落盘的数据；全部落盘后才放锁
+        if self._seg_f is not None:
+            self._seg_f.flush()
+        if self._idx_f is not None:
+            self._idx_f.flush()
+        self._release()
+
+    def close(self) -> None:
+        self.flush()
+        for f in (self._seg_f, self._idx_f):
+            if f is not None:
+                f.close()
+        self._seg_f = self._idx_f = None
+
+    # ---- 读
+    def refresh(self) -> None:
+        """
+        读之前：本进程缓冲落盘 + 追平其他进程的写入（短暂持锁）。
+        """
+        self._acquire()
+        self.flush()
+
+    def __contains__(self, event_id: str) -> bool:
+        return event_id in self._index
+
+    def iter_ids(self) -> Iterator[str]:
+        self.refresh()
+        return iter(list(self._index))
+
+    def get(self, event_id: str) -> Optional[Event]:
+        self.flush()
+        loc = self._index.get(event_id)
+        if loc is None:
+            self.refresh()
+            loc = self._index.get(event_id)
+        if loc is None:
+            return None
+        with self._seg_path(loc.seg).open("rb") as f:
+            f.seek(loc.offset)
+            return Event.from_dict(json.loads(f.read(loc.length)))
+
+    def iter_events(self) -> Iterator[Event]:
+        """
+        按段 + 偏移顺序流式读取；只产出索引中“最后一次写入”的那一条（去重）。
+        """
+        self.refresh()
+        by_seg: Dict[int, list] = {}
+        for l in self._index.values():
+            by_seg.setdefault(l.seg, []).append(l)
+        for n in sorted(by_seg):
+            with self._seg_path(n).open("rb") as f:
+                for l in sorted(by_seg[n], key=lambda x: x.offset):
+                    f.seek(l.offset)
+                    try:
+                        yield Event.from_dict(json.loads(f.read(l.length)))
+                    except Exception:
+                        continue
+
+
+_OPEN: Dict[Path, FileStore | SegmentStore] = {}
+_LOCKED: set = set()  # 当前持有写锁（有未落盘缓冲）的 SegmentStore
+_BULK = 0
+_FLUSH_HOOKS: list = []  # 其他按目录维护的索引（如 seen）在批量写结束时一并落盘
+
+
+def on_flush(fn) -> None:
+    if fn not in _FLUSH_HOOKS:
+        _FLUSH_HOOKS.append(fn)
+
+
+def release_locks(keep=None) -> None:
+    """
+    落盘并释放本进程持有的 store 写锁（批量模式下跨多次 append 持有）；阻塞等待其他锁之前调用。
+    """
+    for st in list(_LOCKED):
+        if st is not keep:
+            st.flush()
+
+
+def in_bulk() -> bool:
+    return _BULK > 0
+
+
+def is_segmented(root: Path) -> bool:
+    return (root / SEGMENTS_DIR / META_NAME).exists()
+
+
+def open_store(root: Path) -> FileStore | SegmentStore:
+    """
+    进程内缓存：同一目录复用同一个 store（分段模式下复用文件句柄）。
+    """
+    st = _OPEN.get(root)
+    if st is not None and (st.kind == "segments") == is_segmented(root):
+        return st
+    st = SegmentStore(root) if is_segmented(root) else FileStore(root)
+    _OPEN[root] = st
+    return st
+
+
+def forget(root: Path) -> None:
+    """
+    丢弃进程内缓存的 store（目录被整体替换之后调用）。
+    """
+    st = _OPEN.pop(root, None)
+    if st is not None and st.kind == "segments":
+        st.close()
+
+
+def flush_all() -> None:
+    for st in _OPEN.values():
+        st.flush()
+    for fn in _FLUSH_HOOKS:
+        fn()
+
+
+@contextmanager
+def bulk_writes():
+    """
+    批量写入：分段模式下延迟 flush，直到退出上下文（ingest / run batch 使用）。
+    """
+    global _BULK
+    _BULK += 1
+    try:
+        yield
+    finally:
+        _BULK -= 1
+        if not _BULK:
+            flush_all()
+
+
+def archive_paths(root: Path) -> list[Path]:
+    d = root / ARCHIVE_DIR
+    if not d.exists():
+        return []
+    return sorted(p for p in d.iterdir() if p.suffix in _OPENERS and p.name.endswith(".ndjson" + p.suffix))
+
+
+def open_archive(path: Path, mode: str = "rb", ext: Optional[str] = None):
+    return importlib.import_module(_OPENERS[ext or path.suffix]).open(path, mode)
+
+
+def iter_archive(path: Path) -> Iterator[Event]:
+    with open_archive(path) as f:
+        for raw in f:
+            try:
+                yield Event.from_dict(json.loads(raw))
+            except Exception:
+                continue
+
+
+def iter_events(root: Path) -> Iterator[Event]:
+    """
+    透明读取两层：热层（逐文件 / 分段）优先，其次压缩归档；同一 event_id 只产出一次。
+    """
+    if not root.exists():
+        return
+    seen: set = set()
+    for ev in open_store(root).iter_events():
+        seen.add(ev.event_id)
+        yield ev
+    for p in archive_paths(root):
+        for ev in iter_archive(p):
+            if ev.event_id in seen:
+                continue
+            seen.add(ev.event_id)
+            yield ev
+
+
+def iter_ids(root: Path) -> Iterator[str]:
+    """
+    两层中所有 event_id（热层不解析事件本体；归档需解压扫描）。
+    """
+    if not root.exists():
+        return
+    yield from open_store(root).iter_ids()
+    for p in archive_paths(root):
+        for ev in iter_archive(p):
+            yield ev.event_id
+
+
+def read_event(root: Path, event_id: str) -> Optional[Event]:
+    """
+    点读：热层 O(1)；未命中再顺序扫描归档（冷路径，极少发生）。
+    """
+    ev = open_store(root).get(event_id)
+    if ev is not None:
+        return ev
+    found = None
+    for p in archive_paths(root):
+        for a in iter_archive(p):
+            if a.event_id == event_id:
+                found = a  # 归档内后写覆盖
+    return found
+
+
+def get_events(root: Path, ids: Iterable[str], months: Optional[Set[str]] = None) -> Dict[str, Event]:
+    """
+    按 id 取多条：热层逐个点读；未命中的再对归档做一遍顺序扫描（不逐个 id 扫归档）。
+    - months：只扫这些月份（YYYY-MM）的归档
+    - 与 iter_events 相同：热层优先，其次先出现的归档条目；不存在（或已被 compact 丢弃）的 id 不返回
+    """
+    out: Dict[str, Event] = {}
+    if not root.exists():
+        return out
+    store = open_store(root)
+    missing = set()
+    for eid in ids:
+        ev = store.get(eid)
+        if ev is None:
+            missing.add(eid)
+        else:
+            out[eid] = ev
+    for p in archive_paths(root):
+        if not missing:
+            break
+        if months is not None and p.name.split(".", 1)[0] not in months:
+            continue
+        for ev in iter_archive(p):
+            if ev.event_id in missing:
+                missing.discard(ev.event_id)
+                out[ev.event_id] = ev
+    return out
+
+
+def migrate_to_segments(root: Path, max_segment_bytes: int = DEFAULT_SEGMENT_BYTES) -> Tuple[int, int]:
+    """
+    一次性迁移：把逐文件冷存目录转换为分段存储。
+    - 先写段 + 索引 + meta，全部落盘后才删除原 JSON 文件
+    - 中途失败可重跑（重复 event_id 以后写为准）
+    返回 (migrated, skipped)
+    """
+    seg_dir = root / SEGMENTS_DIR
+    seg_dir.mkdir(parents=True, exist_ok=True)
+    meta = seg_dir / META_NAME
+    if not meta.exists():
+        tmp = meta.with_name(META_NAME + ".tmp")
+        tmp.write_text(
+            json.dumps({"format": "ndjson-segments", "version": 1, "max_segment_bytes": int(max_segment_bytes)}),
+            encoding="utf-8",
+        )
+        os.replace(tmp, meta)
+
+    _OPEN.pop(root, None)
+    store = open_store(root)
+    files = sorted(root.glob("*.json"))
+    done, skipped = [], 0
+    with bulk_writes():
+        for p in files:
+            try:
+                ev = Event.from_dict(json.loads(p.read_text(encoding="utf-8")), p.stem)
+            except Exception:
+                skipped += 1
+                continue
+            store.append(ev)
+            done.append(p)
+
+    for p in done:
+        p.unlink()
+    return len(done), skipped
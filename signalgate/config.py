@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from .locks import atomic_write_text
+
+CONFIG_FILES = ("bets.yaml", "rules.yaml")
+CACHE_NAME = "config.cache.json"
+CACHE_VERSION = 1
+_RACY_SECONDS = 2.0  # mtime 距今太近：同一时间粒度内可能再次被改写，必须比对内容摘要
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def _parse(text: str):
+    # yaml 只在真正需要解析时导入（快照命中时完全不加载）；LibYAML（C 实现）可用时优先
+    import yaml
+
+    return yaml.load(text, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+
+def load_yaml(path: Path) -> Dict:
+    return _parse(path.read_text(encoding="utf-8")) or {}
+
+
+# ---- 编译后的规则（每个 rules dict 只推导一次）
+
+def _get_list(d: Dict, path: List[str], default: List[str]) -> List[str]:
+    cur = d
+    for k in path:
+        if not isinstance(cur, dict) or k not in cur:
+            return default
+        cur = cur[k]
+    if cur is None:
+        return default
+    return [str(x) for x in cur] if isinstance(cur, list) else default
+
+
+def _get_bool(d: Dict, path: List[str], default: bool) -> bool:
+    cur = d
+    for k in path:
+        if not isinstance(cur, dict) or k not in cur:
+            return default
+        cur = cur[k]
+    return bool(cur)
+
+
+def _get_str(d: Dict, path: List[str], default: str) -> str:
+    cur = d
+    for k in path:
+        if not isinstance(cur, dict) or k not in cur:
+            return default
+        cur = cur[k]
+    return str(cur) if cur is not None else default
+
+
+def _int(d: Dict, key: str, default: int, where: str) -> int:
+    v = d.get(key)
+    if v is None:
+        return default
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        raise ConfigError(f"rules.yaml: {where}.{key} must be an integer, got {v!r}")
+
+
+@dataclass(frozen=True)
+class CompiledRules:
+    """
+    rules.yaml 中 decide / gate 每次都要用到的派生值（校验 + 预计算）。
+    """
+    rank: Dict[str, int]
+    q1_min: str
+    q1_always_no_for_c: bool
+    force_tags: FrozenSet[str]
+    explicit_tags: FrozenSet[str]
+    require_explicit: bool
+    impact_direct: bool
+    burst_window_minutes: int
+    burst_limit: int
+    monthly_budget: int  # <=0 => 不限
+    coalesce_max_chars: int  # 推送合并时正文长度上限；<=0 => 不限
+    allowed_actions: FrozenSet[str]
+    sell_tags: FrozenSet[str]
+    reduce_tags: FrozenSet[str]
+    buy_tags: FrozenSet[str]
+
+
+def _compile(rules_cfg: Dict) -> CompiledRules:
+    if not isinstance(rules_cfg, dict):
+        raise ConfigError("rules.yaml: top level must be a mapping")
+    for key in ("decision", "evidence", "gate", "interrupt"):
+        if rules_cfg.get(key) is not None and not isinstance(rules_cfg[key], dict):
+            raise ConfigError(f"rules.yaml: {key} must be a mapping")
+
+    # 默认兜底（不可逆）：C < B < A
+    rank = {"C": 0, "B": 1, "A": 2}
+    for k, v in ((rules_cfg.get("evidence") or {}).get("rank") or {}).items():
+        try:
+            rank[str(k).upper()] = int(v)
+        except (TypeError, ValueError):
+            raise ConfigError(f"rules.yaml: evidence.rank.{k} must be an integer, got {v!r}")
+
+    q1_min = _get_str(rules_cfg, ["decision", "q1_min_evidence"], "B").upper()
+    if q1_min not in ("A", "B", "C"):
+        q1_min = "B"
+
+    force_default = ["tax", "account", "kyc", "transfer", "identity", "legal", "regulation"]
+    impact_radius = (rules_cfg.get("decision") or {}).get("impact_radius") or {"direct": True}
+    gate = rules_cfg.get("gate") or {}
+    action_map = rules_cfg.get("action_map") or {}
+    if not isinstance(action_map, dict):
+        raise ConfigError("rules.yaml: action_map must be a mapping")
+
+    def _tags(key: str, default: List[str]) -> FrozenSet[str]:
+        # 空列表同样回落到默认值（与旧的 `or [...]` 语义一致）
+        return frozenset(t.lower() for t in (_get_list(action_map, [key], default) or default))
+
+    return CompiledRules(
+        rank=rank,
+        q1_min=q1_min,
+        q1_always_no_for_c=_get_bool(rules_cfg, ["decision", "tier_c_policy", "q1_always_no"], True),
+        force_tags=frozenset(t.lower() for t in _get_list(rules_cfg, ["decision", "q3_policy", "force_tags"], force_default)),
+        explicit_tags=frozenset(
+            t.lower() for t in _get_list(rules_cfg, ["decision", "q3_policy", "explicit_tags"], ["action_required"])
+        ),
+        require_explicit=_get_bool(rules_cfg, ["decision", "q3_policy", "require_explicit_tag"], True),
+        impact_direct=bool(impact_radius.get("direct", True)),
+        burst_window_minutes=_int(gate, "burst_window_minutes", 60, "gate"),
+        burst_limit=_int(gate, "burst_limit", 2, "gate"),
+        monthly_budget=_int(rules_cfg.get("interrupt") or {}, "monthly_budget", 0, "interrupt"),
+        coalesce_max_chars=_int(rules_cfg.get("interrupt") or {}, "coalesce_max_chars", 2000, "interrupt"),
+        allowed_actions=frozenset(
+            a.upper() for a in (_get_list(action_map, ["allowed_actions"], []) or ["BUY", "SELL", "REDUCE", "DO_NOTHING"])
+        ),
+        sell_tags=_tags("sell_tags", ["sell", "exit", "ban", "delist", "enforcement"]),
+        reduce_tags=_tags("reduce_tags", ["reduce", "trim", "risk_off"]),
+        buy_tags=_tags("buy_tags", ["buy", "add", "risk_on"]),
+    )
+
+
+_COMPILED: Dict[int, Tuple[Dict, CompiledRules]] = {}
+_COMPILED_SLOTS = 4
+
+
+def compile_rules(rules_cfg: Dict) -> CompiledRules:
+    """
+    按对象身份缓存（少量槽位）：同一个 rules dict 在整个进程里只编译一次。
+    """
+    hit = _COMPILED.get(id(rules_cfg))
+    if hit is not None and hit[0] is rules_cfg:
+        return hit[1]
+    cr = _compile(rules_cfg or {})
+    if len(_COMPILED) >= _COMPILED_SLOTS:
+        _COMPILED.clear()
+    _COMPILED[id(rules_cfg)] = (rules_cfg, cr)
+    return cr
+
+
+# ---- 配置快照（进程内 + data/state 持久化）
+
+@dataclass(frozen=True)
+class Config:
+    bets: Dict
+    rules: Dict
+
+    @property
+    def compiled(self) -> CompiledRules:
+        return compile_rules(self.rules)
+
+
+def _stat(p: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = p.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _trusted(stat: Tuple[int, int]) -> bool:
+    return time.time() - stat[0] / 1e9 > _RACY_SECONDS
+
+
+def _read_cache(state_dir: Optional[Path]) -> Dict:
+    if state_dir is None:
+        return {}
+    try:
+        obj = json.loads((state_dir / CACHE_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(obj, dict) or obj.get("version") != CACHE_VERSION:
+        return {}
+    return obj
+
+
+_OPEN: Dict[Path, Tuple[tuple, Config]] = {}
+
+
+def load_config(config_dir: Path, state_dir: Optional[Path] = None) -> Config:
+    """
+    bets.yaml + rules.yaml 的快照：
+    - 进程内：两文件 (mtime, size) 不变 => 直接复用同一对象（compile_bets / compile_rules 也随之命中）
+    - state_dir 给出时持久化到 <state_dir>/config.cache.json（JSON 解析远快于 YAML）：
+      (mtime, size) 一致且不在“刚修改”窗口内 => 直接用；否则比对 sha1，内容没变也不重新解析
+    - 文件缺失 => {}；结构不合法 => ConfigError
+    """
+    stats = tuple(_stat(config_dir / n) for n in CONFIG_FILES)
+    hit = _OPEN.get(config_dir)
+    if hit is not None and hit[0] == stats and all(s is None or _trusted(s) for s in stats):
+        return hit[1]
+
+    cache = _read_cache(state_dir)
+    files = cache.get("files") or {}
+    parsed: Dict[str, Dict] = {}
+    entries: Dict[str, Dict] = {}
+    dirty = not cache
+    for name, stat in zip(CONFIG_FILES, stats):
+        key = name.split(".", 1)[0]
+        old = files.get(name)
+        if stat is None:
+            parsed[key] = {}
+            entries[name] = None
+            dirty = dirty or old is not None
+            continue
+        if old and [old.get("mtime_ns"), old.get("size")] == list(stat) and _trusted(stat) and key in cache:
+            parsed[key], entries[name] = cache[key], old
+            continue
+        raw = (config_dir / name).read_bytes()
+        digest = hashlib.sha1(raw).hexdigest()
+        if old and old.get("sha1") == digest and key in cache:
+            parsed[key] = cache[key]  # touch 过但内容没变：不重新解析
+        else:
+            try:
+                parsed[key] = _parse(raw.decode("utf-8")) or {}
+            except Exception as e:  # yaml.YAMLError / 编码错误（yaml 延迟导入，不能直接引用异常类）
+                raise ConfigError(f"{name}: {e}")
+            if not isinstance(parsed[key], dict):
+                raise ConfigError(f"{name}: top level must be a mapping")
+        entries[name] = {"mtime_ns": stat[0], "size": stat[1], "sha1": digest}
+        dirty = True
+
+    cfg = Config(bets=parsed["bets"], rules=parsed["rules"])
+    compile_rules(cfg.rules)  # 校验：不合法的配置不会进入缓存
+
+    if dirty and state_dir is not None:
+        try:
+            text = json.dumps({"version": CACHE_VERSION, "files": entries, **parsed}, ensure_ascii=False)
+        except (TypeError, ValueError):
+            text = ""  # YAML 中有 JSON 无法表示的值（如日期）：只做进程内缓存
+        if text:
+            state_dir.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(state_dir / CACHE_NAME, text)
+
+    _OPEN[config_dir] = (stats, cfg)
+    return cfg
@@ -1,63 +1,34 @@
 from __future__ import annotations
 
+import glob
+import time
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
 
+from . import metrics
 from .audit import append_interrupt
-from .decision import decide, load_bets, load_rules
-from .gate import can_interrupt, on_interrupt
+from .coldstore import bulk_writes
+from .config import ConfigError, compile_rules
+from .decision import action_for_tags, decide, load_bets, load_rules
+from .gate import try_interrupt
 from .ingress import load_event_from_json, write_cold_event
 from .interrupt import format_interrupt
+from .matcher import compile_bets
 from .models import InterruptRecord, utc_now_iso
+from .observation import open_index, parse_ts, retain_hours_for
 
 
 def _infer_entity(event, bets_cfg) -> str:
-    bets = (bets_cfg.get("bets") or {})
-    direct = bets.get("direct") or []
-
-    text = f"{event.title}\n{event.body}".lower()
-    tags = [t.lower() for t in (event.tags or [])]
-
-    for b in direct:
-        bid = str(b.get("id") or "").lower()
-        name = str(b.get("name") or "").strip()
-        name_l = name.lower()
-        bt = [str(x).lower() for x in (b.get("tags") or [])]
-
-        hit = False
-        if bid and (bid in text or bid in tags):
-            hit = True
-        elif name_l and (name_l in text):
-            hit = True
-        elif any(t in tags for t in bt):
-            hit = True
-
-        if hit:
-            return name if name else (bid.upper() if bid else "UNKNOWN")
-
-    return "UNKNOWN"
+    # 与 Q2 共用同一个编译匹配器：按 bets.yaml 顺序取第一个命中
+    hits = compile_bets(bets_cfg).match_event(event)
+    return hits[0].entity if hits else "UNKNOWN"
 
 
 def _infer_action(event, rules_cfg) -> str:
-    action_map = (rules_cfg or {}).get("action_map") or {}
-
-    allowed = action_map.get("allowed_actions") or ["BUY", "SELL", "REDUCE", "DO_NOTHING"]
-    allowed_u = {str(a).upper() for a in allowed}
-
-    sell_tags = action_map.get("sell_tags") or ["sell", "exit", "ban", "delist", "enforcement"]
-    reduce_tags = action_map.get("reduce_tags") or ["reduce", "trim", "risk_off"]
-    buy_tags = action_map.get("buy_tags") or ["buy", "add", "risk_on"]
-
-    tags = {str(t).lower() for t in (event.tags or [])}
-
-    if "SELL" in allowed_u and tags.intersection({str(x).lower() for x in sell_tags}):
-        return "SELL"
-    if "REDUCE" in allowed_u and tags.intersection({str(x).lower() for x in reduce_tags}):
-        return "REDUCE"
-    if "BUY" in allowed_u and tags.intersection({str(x).lower() for x in buy_tags}):
-        return "BUY"
-
-    return "DO_NOTHING" if "DO_NOTHING" in allowed_u else "DO_NOTHING"
+    # action_map 的标签集合已在 compile_rules 中预计算（每个 rules dict 只算一次）
+    return action_for_tags({str(t).lower() for t in (event.tags or [])}, compile_rules(rules_cfg))
 
 
 def _format_dryrun(event, d, entity: str, action: str) -> str:
@@ -76,19 +47,6 @@ def _format_dryrun(event, d, entity: str, action: str) -> str:
     )
 
 
-def _parse_ts(ts: str) -> datetime | None:
-    if not ts:
-        return None
-    s = ts.strip()
-    try:
-        # 允许: 2026-02-07T00:00:00Z
-        if s.endswith("Z"):
-            s = s[:-1] + "+00:00"
-        return datetime.fromisoformat(s).astimezone(timezone.utc)
-    except Exception:
-        return None
-
-
 def _observation_cfg(rules_cfg) -> tuple[int, bool]:
     decision_cfg = (rules_cfg or {}).get("decision") or {}
     hours = int(decision_cfg.get("observation_window_hours") or 24)
@@ -98,68 +56,61 @@ def _observation_cfg(rules_cfg) -> tuple[int, bool]:
     return hours, allow_promo
 
 
-def _maybe_promote_by_multisource(event, tentative_dir: Path, entity: str, window_hours: int) -> bool:
+def _maybe_promote_by_multisource(event, tentative_dir: Path, entity: str, window_hours: int, bets_cfg=None) -> bool:
     """
-    v0.1 多源确认（极简）：
-    - 在 observation_window_hours 内
+    多源确认（索引版）：
+    - 在 observation_window_hours 内（|ts 差| <= 窗口）
     - 同一实体（entity != UNKNOWN）
     - 不同 source（event.source 不同）
     => promotion = True
+
+    只查询观察索引中该 entity 覆盖窗口的时间桶；索引缺失时从目录重建一次。
     """
     if entity == "UNKNOWN":
         return False
 
-    now = _parse_ts(getattr(event, "ts", "") or "") or datetime.now(timezone.utc)
-    cutoff = now - timedelta(hours=window_hours)
+    now = parse_ts(getattr(event, "ts", "") or "") or datetime.now(timezone.utc)
     cur_source = str(getattr(event, "source", "") or "").strip().lower()
 
-    for p in tentative_dir.glob("*.json"):
-        try:
-            ev2 = load_event_from_json(p)
-        except Exception:
-            continue
+    idx = open_index(
+        tentative_dir,
+        entity_fn=lambda ev: _infer_entity(ev, bets_cfg or {}),
+        retain_hours=retain_hours_for(window_hours),
+    )
+    if idx is None:
+        return False
 
-        ts2 = _parse_ts(getattr(ev2, "ts", "") or "")
-        if ts2 is None:
-            continue
-        if ts2 < cutoff:
+    for ob in idx.query(entity, now, window_hours):
+        if ob.event_id == event.event_id:
             continue
-
-        src2 = str(getattr(ev2, "source", "") or "").strip().lower()
-        if not src2 or src2 == cur_source:
+        if not ob.source or ob.source == cur_source:
             continue
-
-        # 用相同的实体推断逻辑保证一致性
-        # 注意：这里不依赖 bets_cfg（避免重复读取）；只用“标签/文本”很容易误判
-        # v0.1 简化：只要求文件名不同源 + 时间窗口内
         return True
 
     return False
 
 
-def run_once(
+def _process_event(
+    event,
+    bets_cfg: Dict,
+    rules_cfg: Dict,
     config_dir: Path,
     cold_dir: Path,
     audit_dir: Path,
     state_dir: Path,
-    input_json: Path,
     dry_run: bool = False,
+    outbox: bool = False,
 ) -> str:
     """
-    - dry_run=True：只判定 + 输出 DRYRUN；不写 cold/audit/state，不触发 gate
-    - dry_run=False：正常模式；
-        * interrupt：写 cold + 写 audit + 触发 gate + 输出
-        * tentative：写 data/tentative（沉默）
-        * cold：写 cold（沉默）
+    单事件判定 + 落盘（run_once / run_batch 共用；配置由调用方传入）。
+    - outbox=True：放行的打断同时进入 data/state/outbox（由 notify --drain 推送）
+      顺序：先以 held 入队 -> gate 锁内放行（release + 审计）-> 计数落盘；拒绝 => drop。
+      任一步之间崩溃都不会出现“名额已用掉、打断却丢了”（最坏是少计一次）
     """
-    event = load_event_from_json(input_json)
-
-    bets_cfg = load_bets(config_dir)
-    rules_cfg = load_rules(config_dir)
-
-    d = decide(event, bets_cfg, rules_cfg)
-    entity = _infer_entity(event, bets_cfg)
-    action = _infer_action(event, rules_cfg)
+    with metrics.stage("decide"):
+        d = decide(event, bets_cfg, rules_cfg)
+        entity = _infer_entity(event, bets_cfg)
+        action = _infer_action(event, rules_cfg)
 
     if dry_run:
         return _format_dryrun(event, d, entity, action)
@@ -170,28 +121,25 @@ def run_once(
         tentative_dir.mkdir(parents=True, exist_ok=True)
 
         # 写入待观察区（默认沉默）
-        write_cold_event(tentative_dir, event)
+        with metrics.stage("tentative_write"):
+            write_cold_event(tentative_dir, event, entity=entity)
 
         window_hours, allow_promo = _observation_cfg(rules_cfg)
-        if allow_promo and _maybe_promote_by_multisource(event, tentative_dir, entity, window_hours):
+        with metrics.stage("promote"):
+            promoted = allow_promo and _maybe_promote_by_multisource(event, tentative_dir, entity, window_hours, bets_cfg)
+        if promoted:
             # 升级为 interrupt（仍然遵循 gate）
-            d.state = "interrupt"
+            d = replace(d, state="interrupt")
         else:
             return ""
 
     # 正常 cold：永远写入 cold（tentative 未升级则不会走到这里）
-    write_cold_event(cold_dir, event)
+    with metrics.stage("cold_write"):
+        write_cold_event(cold_dir, event)
 
     if d.state != "interrupt":
         return ""
 
-    if not can_interrupt(config_dir, state_dir):
-        return ""
-
-    st = on_interrupt(config_dir, state_dir)
-    if st.tripped:
-        pass
-
     rec = InterruptRecord(
         ts=utc_now_iso(),
         event_id=event.event_id,
@@ -203,5 +151,193 @@ def run_once(
         deadline="",
         source_ref=event.url or event.source,
     )
-    append_interrupt(audit_dir, rec)
-    return format_interrupt(rec)
+    msg = format_interrupt(rec)
+    held = False
+    if outbox:
+        from .outbox import enqueue, settle
+
+        with metrics.stage("outbox"):
+            # 已入队 / 已发送过的同一事件 => 不再入队（与之前一样只走 gate + 审计）
+            held = enqueue(state_dir, event.event_id, text=msg.split("\n", 1)[0], desp=msg, held=True)
+
+    def persist() -> None:
+        if held:
+            settle(state_dir, event.event_id, allowed=True)
+        append_interrupt(audit_dir, rec)
+
+    # 检查 + 计数是一次原子操作：多个 run 进程共享 state_dir 也不会超出 burst_limit / 月度预算
+    # （gate 阶段的耗时包含锁内的放行 + 审计写入）
+    with metrics.stage("gate"):
+        allowed = try_interrupt(config_dir, state_dir, rules_cfg=rules_cfg, on_allow=persist) is not None
+    if not allowed:
+        if held:
+            settle(state_dir, event.event_id, allowed=False)
+        return ""
+    return msg
+
+
+def run_once(
+    config_dir: Path,
+    cold_dir: Path,
+    audit_dir: Path,
+    state_dir: Path,
+    input_json: Path,
+    dry_run: bool = False,
+    outbox: bool = False,
+) -> str:
+    """
+    - dry_run=True：只判定 + 输出 DRYRUN；不写 cold/audit/state，不触发 gate
+    - dry_run=False：正常模式；
+        * interrupt：写 cold + 写 audit + 触发 gate + 输出
+        * tentative：写 data/tentative（沉默）
+        * cold：写 cold（沉默）
+    """
+    with metrics.stage("read"):
+        event = load_event_from_json(input_json)
+
+    with metrics.stage("config"):
+        bets_cfg = load_bets(config_dir, state_dir)
+        rules_cfg = load_rules(config_dir, state_dir)
+
+    return _process_event(event, bets_cfg, rules_cfg, config_dir, cold_dir, audit_dir, state_dir, dry_run=dry_run, outbox=outbox)
+
+
+def iter_batch_inputs(spec: str, glob_pattern: str = "*.json") -> List[Path]:
+    """
+    batch 输入解析：目录（按 glob_pattern）或 glob 表达式；按文件名排序，保证 gate 顺序确定。
+    """
+    p = Path(spec).expanduser()
+    if p.is_file():
+        return [p.resolve()]
+    if p.is_dir():
+        return sorted(x.resolve() for x in p.glob(glob_pattern) if x.is_file())
+    return sorted(Path(x).resolve() for x in glob.glob(str(p)) if Path(x).is_file())
+
+
+@dataclass
+class BatchResult:
+    outputs: List[str] = field(default_factory=list)  # 非空输出（interrupt / DRYRUN）；给了 on_output 时不收集
+    emitted: int = 0                                  # 非空输出条数
+    processed: int = 0
+    failed: int = 0
+    elapsed_s: float = 0.0
+
+    @property
+    def events_per_sec(self) -> float:
+        return self.processed / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+
+def run_batch(
+    config_dir: Path,
+    cold_dir: Path,
+    audit_dir: Path,
+    state_dir: Path,
+    inputs: Iterable[Path],
+    dry_run: bool = False,
+    outbox: bool = False,
+    on_output: Optional[Callable[[str], None]] = None,
+) -> BatchResult:
+    """
+    批量模式（单进程）：
+    - bets/rules 只读取一次
+    - 逐个事件流式走 run_once 同样的判定与 gate 语义（按输入顺序）
+    - on_output 给出：每条非空输出在该事件判定完成时立即回调（不在内存中攒整批）；否则收集到 outputs
+    - 单个文件损坏只计 failed，不中断整批
+    """
+    t0 = time.perf_counter()
+    with metrics.stage("config"):
+        bets_cfg = load_bets(config_dir, state_dir)
+        rules_cfg = load_rules(config_dir, state_dir)
+
+    res = BatchResult()
+    with bulk_writes():
+        for f in inputs:
+            try:
+                with metrics.stage("read"):
+                    event = load_event_from_json(f)
+            except Exception:
+                res.failed += 1
+                continue
+
+            msg = _process_event(
+                event, bets_cfg, rules_cfg, config_dir, cold_dir, audit_dir, state_dir, dry_run=dry_run, outbox=outbox
+            )
+            res.processed += 1
+            if msg:
+                res.emitted += 1
+                if on_output is not None:
+                    on_output(msg)
+                else:
+                    res.outputs.append(msg)
+
+    res.elapsed_s = time.perf_counter() - t0
+    return res
+
+
+@dataclass
+class WatchItem:
+    path: Path
+    output: str = ""        # 非空输出（interrupt / DRYRUN）
+    failed: bool = False    # 读不出事件（JSON 损坏等）
+    latency_s: float = 0.0  # 文件落盘（mtime）-> 判定完成
+
+
+def run_watch(
+    config_dir: Path,
+    cold_dir: Path,
+    audit_dir: Path,
+    state_dir: Path,
+    inbox: Path,
+    glob_pattern: str = "*.json",
+    dry_run: bool = False,
+    outbox: bool = False,
+    poll: bool = False,
+    stop: Optional[Callable[[], bool]] = None,
+    on_config_error: Optional[Callable[[Exception], None]] = None,
+) -> Iterator[WatchItem]:
+    """
+    前台监视 inbox（watch 模式）：
+    - 每个新文件就绪后立即走 run_once 同样的判定与 gate 语义，处理过的文件记入 data/state/watch/ 下的 ledger
+      （dry_run 不写 ledger，也不写 cold/audit/state）；进程在判定完成、记账之前崩溃 => 重启后该文件会再判定一次
+    - bets/rules 每个事件都重新 load：文件没变时是同一快照对象（只多两次 stat），改了就热加载；
+      改坏了 => 回调 on_config_error 一次，继续用上一份有效配置
+    - stop() 为真时返回（最迟 watch.POLL_S 秒后检查一次）
+    """
+    from .terms import flush_stale
+    from .watch import InboxWatcher, default_ledger
+
+    inbox.mkdir(parents=True, exist_ok=True)
+    ledger = None if dry_run else default_ledger(state_dir, inbox, glob_pattern)
+    bets_cfg = load_bets(config_dir, state_dir)
+    rules_cfg = load_rules(config_dir, state_dir)
+    last_err = ""
+
+    with InboxWatcher(inbox, glob_pattern, ledger=ledger, poll=poll) as w:
+        while not (stop is not None and stop()):
+            for path, key in w.ready():
+                try:
+                    with metrics.stage("read"):
+                        event = load_event_from_json(path)
+                except FileNotFoundError:
+                    continue  # 就绪后又被移走
+                except Exception:
+                    if w.mark_failed(path, key):  # 还可能是写了一半：先不算失败，稍后重试
+                        yield WatchItem(path=path, failed=True)
+                    continue
+
+                try:
+                    with metrics.stage("config"):
+                        bets_cfg = load_bets(config_dir, state_dir)
+                        rules_cfg = load_rules(config_dir, state_dir)
+                    last_err = ""
+                except ConfigError as e:
+                    if str(e) != last_err and on_config_error is not None:
+                        on_config_error(e)
+                    last_err = str(e)
+
+                msg = _process_event(
+                    event, bets_cfg, rules_cfg, config_dir, cold_dir, audit_dir, state_dir, dry_run=dry_run, outbox=outbox
+                )
+                w.mark_done(path)
+                yield WatchItem(path=path, output=msg, latency_s=max(0.0, time.time() - key[0] / 1e9))
+            flush_stale()  # 倒排索引缓冲：空闲时也按 FLUSH_SECONDS 落盘，不等下一个事件
@@ -1,101 +1,34 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Tuple
-
-import yaml
+from typing import AbstractSet, Dict, Iterator, List, Optional, Sequence, Tuple
 
+from .config import CompiledRules, compile_rules, load_config, load_yaml  # noqa: F401  (load_yaml: 兼容旧调用方)
+from .matcher import Bet, compile_bets
 from .models import Decision, Event
 
 
-def load_yaml(path: Path) -> Dict:
-    return yaml.safe_load(path.read_text(encoding="utf-8")) or {}
-
-
-def load_bets(config_dir: Path) -> Dict:
-    p = config_dir / "bets.yaml"
-    if not p.exists():
-        return {}
-    return load_yaml(p)
-
-
-def load_rules(config_dir: Path) -> Dict:
-    p = config_dir / "rules.yaml"
-    if not p.exists():
-        return {}
-    return load_yaml(p)
-
-
-def _rank_map(rules_cfg: Dict) -> Dict[str, int]:
-    m = (rules_cfg.get("evidence") or {}).get("rank") or {}
-    # 默认兜底（不可逆）：C < B < A
-    base = {"C": 0, "B": 1, "A": 2}
-    for k, v in m.items():
-        base[str(k).upper()] = int(v)
-    return base
+def load_bets(config_dir: Path, state_dir: Optional[Path] = None) -> Dict:
+    return load_config(config_dir, state_dir).bets
 
 
-def _evidence_ge(rules_cfg: Dict, a: str, b: str) -> bool:
-    rank = _rank_map(rules_cfg)
-    return rank.get(str(a).upper(), 0) >= rank.get(str(b).upper(), 0)
+def load_rules(config_dir: Path, state_dir: Optional[Path] = None) -> Dict:
+    return load_config(config_dir, state_dir).rules
 
 
-def _get_list(d: Dict, path: List[str], default: List[str]) -> List[str]:
-    cur = d
-    for k in path:
-        if not isinstance(cur, dict) or k not in cur:
-            return default
-        cur = cur[k]
-    if cur is None:
-        return default
-    return [str(x) for x in cur] if isinstance(cur, list) else default
+_STRUCTURAL_TAGS = frozenset({"structural", "rule_change", "regulation"})
 
 
-def _get_bool(d: Dict, path: List[str], default: bool) -> bool:
-    cur = d
-    for k in path:
-        if not isinstance(cur, dict) or k not in cur:
-            return default
-        cur = cur[k]
-    return bool(cur)
-
-
-def _get_str(d: Dict, path: List[str], default: str) -> str:
-    cur = d
-    for k in path:
-        if not isinstance(cur, dict) or k not in cur:
-            return default
-        cur = cur[k]
-    return str(cur) if cur is not None else default
-
-
-def _match_direct_bets(event: Event, bets_cfg: Dict, impact_radius: Dict) -> bool:
+def _match_direct_bets(event: Event, bets_cfg: Dict, direct: bool) -> bool:
     """
     Q2：只在 impact_radius.direct=true 时匹配 direct bets。
     indirect/macro 在 v0.1 由配置冻结为 false。
     """
-    if not impact_radius.get("direct", True):
+    if not direct:
         return False
 
-    bets = (bets_cfg.get("bets") or {})
-    direct = bets.get("direct") or []
-
-    text = f"{event.title}\n{event.body}".lower()
-    tags = [t.lower() for t in (event.tags or [])]
-
-    for b in direct:
-        bid = str(b.get("id") or "").lower()
-        name = str(b.get("name") or "").lower()
-        bt = [str(x).lower() for x in (b.get("tags") or [])]
-
-        if bid and (bid in text or bid in tags):
-            return True
-        if name and (name in text):
-            return True
-        if any(t in tags for t in bt):
-            return True
-
-    return False
+    return bool(compile_bets(bets_cfg).match_event(event))
 
 
 def decide(event: Event, bets_cfg: Dict, rules_cfg: Dict) -> Decision:
@@ -119,39 +52,28 @@ def decide(event: Event, bets_cfg: Dict, rules_cfg: Dict) -> Decision:
       - 仅当 Q1/Q2/Q3 全 YES => interrupt
       - 否则：如果出现“结构/force 迹象” => tentative；否则 cold
     """
-    decision_cfg = rules_cfg.get("decision") or {}
+    r = compile_rules(rules_cfg)  # 派生值（rank / force / explicit tags）每个 rules dict 只算一次
 
     # ---- 基础输入
-    tags = [str(t).lower() for t in (event.tags or [])]
+    tags = {str(t).lower() for t in (event.tags or [])}
     evidence_q1 = str(event.source_tier or "C").upper()
     if evidence_q1 not in ("A", "B", "C"):
         evidence_q1 = "C"
 
     # ---- Q1：结构变化（候选）
-    structural_tags = {"structural", "rule_change", "regulation"}
-    force_tags_default = ["tax", "account", "kyc", "transfer", "identity", "legal", "regulation"]
-    force_tags = [t.lower() for t in _get_list(rules_cfg, ["decision", "q3_policy", "force_tags"], force_tags_default)]
-
-    structural_hit = any(t in structural_tags for t in tags)
-    force_hit = any(t in tags for t in force_tags)
+    structural_hit = not tags.isdisjoint(_STRUCTURAL_TAGS)
+    force_hit = not tags.isdisjoint(r.force_tags)
 
     q1_candidate = bool(structural_hit or force_hit)
 
-    # Q1 阈值：证据强度
-    q1_min = _get_str(rules_cfg, ["decision", "q1_min_evidence"], "B").upper()
-    if q1_min not in ("A", "B", "C"):
-        q1_min = "B"
-
-    # tier C 策略
-    q1_always_no_for_c = _get_bool(rules_cfg, ["decision", "tier_c_policy", "q1_always_no"], True)
-    if q1_always_no_for_c and evidence_q1 == "C":
+    # tier C 策略；Q1 阈值：证据强度
+    if r.q1_always_no_for_c and evidence_q1 == "C":
         q1 = False
     else:
-        q1 = q1_candidate and _evidence_ge(rules_cfg, evidence_q1, q1_min)
+        q1 = q1_candidate and r.rank.get(evidence_q1, 0) >= r.rank.get(r.q1_min, 0)
 
     # ---- Q2：影响已下注
-    impact_radius = decision_cfg.get("impact_radius") or {"direct": True, "indirect": False, "macro": False}
-    q2_direct = _match_direct_bets(event, bets_cfg, impact_radius)
+    q2_direct = _match_direct_bets(event, bets_cfg, r.impact_direct)
 
     # force 风险绕过 Q2（需要 bets.force 非空）
     bets = (bets_cfg.get("bets") or {})
@@ -164,11 +86,8 @@ def decide(event: Event, bets_cfg: Dict, rules_cfg: Dict) -> Decision:
     evidence_q2 = "B" if q2 else "C"
 
     # ---- Q3：需要行动？
-    require_explicit = _get_bool(rules_cfg, ["decision", "q3_policy", "require_explicit_tag"], True)
-    explicit_tags = [t.lower() for t in _get_list(rules_cfg, ["decision", "q3_policy", "explicit_tags"], ["action_required"])]
-
-    explicit_hit = any(t in tags for t in explicit_tags)
-    if require_explicit:
+    explicit_hit = not tags.isdisjoint(r.explicit_tags)
+    if r.require_explicit:
         q3 = bool(explicit_hit or force_hit)
     else:
         # 如果允许非显式标签，v0.1 仍只认 explicit/force（避免误打断）
@@ -193,3 +112,269 @@ def decide(event: Event, bets_cfg: Dict, rules_cfg: Dict) -> Decision:
         state=state,
         rule_id="rule_v0_1",
     )
+
+
+def action_for_tags(tags: AbstractSet[str], r: CompiledRules) -> str:
+    """
+    action_map：SELL > REDUCE > BUY，未命中（或不在 allowed_actions 中）=> DO_NOTHING。
+    tags 须已小写。
+    """
+    allowed = r.allowed_actions
+    if "SELL" in allowed and not tags.isdisjoint(r.sell_tags):
+        return "SELL"
+    if "REDUCE" in allowed and not tags.isdisjoint(r.reduce_tags):
+        return "REDUCE"
+    if "BUY" in allowed and not tags.isdisjoint(r.buy_tags):
+        return "BUY"
+    return "DO_NOTHING"
+
+
+# ---- 批量判定（回放 / 大批量事件）：与逐条 decide + _infer_entity + _infer_action 结果完全一致
+
+_G_STRUCT, _G_FORCE, _G_EXPLICIT, _G_SELL, _G_REDUCE, _G_BUY = range(6)
+_TIERS = ("A", "B", "C")
+_STATES = ("cold", "tentative", "interrupt")
+_NUMPY_MIN = 4096  # 批次太小时矩阵构建的固定开销不划算
+
+
+class _TagVocab:
+    """
+    标签驻留为整数 id；只登记会影响结果的标签（结构 / force / explicit / action_map），
+    其余标签对判定没有作用，直接丢弃。每个组是一个位掩码，一行事件 = 其标签 id 的位掩码。
+    """
+
+    def __init__(self, r: CompiledRules):
+        self.ids: Dict[str, int] = {}
+        groups = (_STRUCTURAL_TAGS, r.force_tags, r.explicit_tags, r.sell_tags, r.reduce_tags, r.buy_tags)
+        self.masks: Tuple[int, ...] = tuple(self._mask(g) for g in groups)
+        self._flags: Dict[int, int] = {}
+
+    def _mask(self, tags: AbstractSet[str]) -> int:
+        m = 0
+        for t in sorted(tags):
+            m |= 1 << self.ids.setdefault(t, len(self.ids))
+        return m
+
+    def row(self, tags) -> List[int]:
+        ids = self.ids
+        out = []
+        for t in tags or ():
+            i = ids.get(str(t).lower())
+            if i is not None:
+                out.append(i)
+        return out
+
+    def flags(self, ids: List[int]) -> int:
+        """
+        行 -> 组命中位（bit g = 命中第 g 组）；不同的标签组合很少，按掩码记忆化。
+        """
+        m = 0
+        for i in ids:
+            m |= 1 << i
+        f = self._flags.get(m)
+        if f is None:
+            f = 0
+            for g, gm in enumerate(self.masks):
+                if m & gm:
+                    f |= 1 << g
+            self._flags[m] = f
+        return f
+
+
+_VOCAB: Dict[int, Tuple[CompiledRules, _TagVocab]] = {}
+
+
+def _vocab(r: CompiledRules) -> _TagVocab:
+    hit = _VOCAB.get(id(r))
+    if hit is None or hit[0] is not r:
+        if len(_VOCAB) >= 4:
+            _VOCAB.clear()
+        hit = _VOCAB[id(r)] = (r, _TagVocab(r))
+    return hit[1]
+
+
+@dataclass
+class DecisionBatch:
+    """
+    decide_batch 的结果（按列存放，与输入事件一一对应）。
+    Decision 是不可变对象：相同结果共享同一个实例。
+    """
+    decisions: List[Decision] = field(default_factory=list)
+    entities: List[str] = field(default_factory=list)
+    actions: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.decisions)
+
+    def __iter__(self) -> Iterator[Tuple[Decision, str, str]]:
+        return zip(self.decisions, self.entities, self.actions)
+
+
+def _tier_code(tier) -> int:
+    t = str(tier or "C").upper()
+    return _TIERS.index(t) if t in _TIERS else 2
+
+
+def _combine(
+    r: CompiledRules,
+    flags: List[int],
+    tiers: List[int],
+    q2_direct: List[bool],
+    has_force_list: bool,
+) -> Tuple[List[int], List[int]]:
+    """
+    纯 Python 后端：逐行按命中位计算结果码（见 _decode）与 action 码。
+    """
+    tier_ok = [
+        not (r.q1_always_no_for_c and t == "C") and r.rank.get(t, 0) >= r.rank.get(r.q1_min, 0) for t in _TIERS
+    ]
+    allowed = [a in r.allowed_actions for a in ("SELL", "REDUCE", "BUY")]
+    codes, acts = [], []
+    for f, tier, q2d in zip(flags, tiers, q2_direct):
+        force = bool(f >> _G_FORCE & 1)
+        q1c = bool(f & (1 << _G_STRUCT | 1 << _G_FORCE))
+        q1 = q1c and tier_ok[tier]
+        q2_force = force and has_force_list
+        q2 = q2d or q2_force
+        q3 = bool(f >> _G_EXPLICIT & 1) or force
+        state = 2 if (q1 and q2 and q3) else (1 if (q1c or q2_force) else 0)
+        codes.append(q1 | q2 << 1 | q3 << 2 | tier << 3 | state << 5)
+        if allowed[0] and f >> _G_SELL & 1:
+            acts.append(0)
+        elif allowed[1] and f >> _G_REDUCE & 1:
+            acts.append(1)
+        elif allowed[2] and f >> _G_BUY & 1:
+            acts.append(2)
+        else:
+            acts.append(3)
+    return codes, acts
+
+
+def _combine_numpy(
+    np,
+    r: CompiledRules,
+    vocab: _TagVocab,
+    rows: List[List[int]],
+    tiers: List[int],
+    q2_direct: List[bool],
+    has_force_list: bool,
+) -> Tuple[List[int], List[int]]:
+    """
+    NumPy 后端：事件 × 标签 的 0/1 矩阵乘 标签 × 组 的成员矩阵 => 事件 × 组 命中矩阵，其余全部是向量运算。
+    """
+    n, v = len(rows), max(1, len(vocab.ids))
+    lens = np.fromiter((len(x) for x in rows), dtype=np.intp, count=n)
+    cols = np.fromiter((i for x in rows for i in x), dtype=np.intp, count=int(lens.sum()))
+    m = np.zeros((n, v), dtype=np.int32)
+    m[np.repeat(np.arange(n), lens), cols] = 1
+
+    member = np.zeros((v, len(vocab.masks)), dtype=np.int32)
+    for g, gm in enumerate(vocab.masks):
+        for i in range(v):
+            if gm >> i & 1:
+                member[i, g] = 1
+    hit = (m @ member) > 0
+
+    struct, force, explicit = hit[:, _G_STRUCT], hit[:, _G_FORCE], hit[:, _G_EXPLICIT]
+    tier = np.asarray(tiers, dtype=np.int32)
+    tier_ok = np.array(
+        [not (r.q1_always_no_for_c and t == "C") and r.rank.get(t, 0) >= r.rank.get(r.q1_min, 0) for t in _TIERS]
+    )
+    q1c = struct | force
+    q1 = q1c & tier_ok[tier]
+    q2_force = force & has_force_list
+    q2 = np.asarray(q2_direct, dtype=bool) | q2_force
+    q3 = explicit | force
+    state = np.where(q1 & q2 & q3, 2, np.where(q1c | q2_force, 1, 0))
+    i32 = np.int32
+    codes = q1.astype(i32) | q2.astype(i32) << 1 | q3.astype(i32) << 2 | tier << 3 | state.astype(i32) << 5
+
+    allowed = [a in r.allowed_actions for a in ("SELL", "REDUCE", "BUY")]
+    acts = np.where(
+        hit[:, _G_SELL] & allowed[0], 0,
+        np.where(hit[:, _G_REDUCE] & allowed[1], 1, np.where(hit[:, _G_BUY] & allowed[2], 2, 3)),
+    )
+    return codes.tolist(), acts.tolist()
+
+
+_DECISIONS: Dict[int, Decision] = {}
+_ACTIONS = ("SELL", "REDUCE", "BUY", "DO_NOTHING")
+
+
+def _decode(code: int) -> Decision:
+    d = _DECISIONS.get(code)
+    if d is None:
+        q1, q2, q3 = bool(code & 1), bool(code & 2), bool(code & 4)
+        d = Decision(
+            q1_structural=q1,
+            q2_affects_bets=q2,
+            q3_requires_action=q3,
+            evidence_q1=_TIERS[code >> 3 & 3],
+            evidence_q2="B" if q2 else "C",
+            evidence_q3="B" if q3 else "C",
+            state=_STATES[code >> 5],
+            rule_id="rule_v0_1",
+        )
+        _DECISIONS[code] = d
+    return d
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def decide_batch(
+    events: Sequence[Event],
+    bets_cfg: Dict,
+    rules_cfg: Dict,
+    backend: str = "auto",
+    hits: Optional[Sequence[Sequence[Bet]]] = None,
+) -> DecisionBatch:
+    """
+    一批事件的 三问 / 状态 / 实体 / action：
+    - 标签驻留为整数 id，整批表示为 事件 × 标签 矩阵，按组求命中后用集合 / 向量运算得到结果
+    - backend："numpy"（须已安装）/ "python"（位掩码）/ "auto"（NumPy 可用且批次足够大时用 NumPy）
+    - bets 文本匹配（Aho-Corasick）仍逐条进行，但每条只扫描一次（Q2 与实体推断共用）
+    - hits 给出：调用方已按 bets_cfg 匹配好的每条事件命中的 bets（按优先级排序），不再扫描
+    结果与逐条 decide / _infer_entity / _infer_action 完全一致。
+    """
+    r = compile_rules(rules_cfg)
+    vocab = _vocab(r)
+    matcher = compile_bets(bets_cfg) if hits is None else None
+    has_force_list = bool((bets_cfg.get("bets") or {}).get("force") or [])
+
+    rows: List[List[int]] = []
+    tiers: List[int] = []
+    q2_direct: List[bool] = []
+    entities: List[str] = []
+    for i, ev in enumerate(events):
+        rows.append(vocab.row(ev.tags))
+        tiers.append(_tier_code(ev.source_tier))
+        bets = matcher.match_event(ev) if matcher is not None else hits[i]
+        entities.append(bets[0].entity if bets else "UNKNOWN")
+        q2_direct.append(r.impact_direct and bool(bets))
+
+    np = None
+    if backend == "numpy":
+        np = _numpy()
+        if np is None:
+            raise RuntimeError("decide_batch: backend='numpy' requires numpy")
+    elif backend == "auto" and len(rows) >= _NUMPY_MIN:
+        np = _numpy()
+    elif backend not in ("auto", "python"):
+        raise ValueError(f"decide_batch: unknown backend {backend!r}")
+
+    if np is not None and rows:
+        codes, acts = _combine_numpy(np, r, vocab, rows, tiers, q2_direct, has_force_list)
+    else:
+        codes, acts = _combine(r, [vocab.flags(x) for x in rows], tiers, q2_direct, has_force_list)
+
+    return DecisionBatch(
+        decisions=[_decode(c) for c in codes],
+        entities=entities,
+        actions=[_ACTIONS[a] for a in acts],
+    )
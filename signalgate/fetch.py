@@ -1,14 +1,25 @@
 from __future__ import annotations
 
+import email.utils
 import hashlib
+import http.client
+import io
+import base64
 import json
 import re
+import threading
+import time
 import urllib.parse
 import urllib.request
 import xml.etree.ElementTree as ET
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional
+
+from . import metrics
 
 
 @dataclass
@@ -27,13 +38,13 @@ def _strip_html(s: str) -> str:
     return s
 
 
-def _guess_iso_ts(raw: str) -> str:
+def _parse_published(raw: str) -> datetime | None:
     """
-    v0.1：尽力解析常见 RSS/Atom 时间；失败则用当前 UTC
+    v0.1：尽力解析常见 RSS/Atom 时间；失败返回 None
     """
     raw = (raw or "").strip()
     if not raw:
-        return datetime.now(timezone.utc).isoformat()
+        return None
 
     # Atom: 2026-02-07T00:00:00Z
     try:
@@ -41,92 +52,312 @@ def _guess_iso_ts(raw: str) -> str:
         dt = datetime.fromisoformat(s)
         if dt.tzinfo is None:
             dt = dt.replace(tzinfo=timezone.utc)
-        return dt.astimezone(timezone.utc).isoformat()
+        return dt.astimezone(timezone.utc)
     except Exception:
         pass
 
-    # RSS pubDate 常见格式太多，v0.1 不做重度解析
-    return datetime.now(timezone.utc).isoformat()
+    # RSS pubDate：RFC-822 / RFC-2822（Sat, 07 Feb 2026 00:00:00 GMT）
+    try:
+        dt = email.utils.parsedate_to_datetime(raw)
+    except Exception:
+        return None
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
 
 
-def _fetch_bytes(url: str, timeout: int = 20) -> bytes:
-    req = urllib.request.Request(
-        url,
-        headers={
-            "User-Agent": "SignalGate/0.1 (+https://github.com/shuiguoe/SignalGate)",
-            "Accept": "application/rss+xml, application/atom+xml, application/xml, text/xml, */*",
-        },
-        method="GET",
-    )
+def _guess_iso_ts(raw: str) -> str:
+    """
+    v0.1：尽力解析常见 RSS/Atom 时间；失败则用当前 UTC
+    """
+    dt = _parse_published(raw) or datetime.now(timezone.utc)
+    return dt.isoformat()
+
+
+_HEADERS = {
+    "User-Agent": "SignalGate/0.1 (+https://github.com/shuiguoe/SignalGate)",
+    "Accept": "application/rss+xml, application/atom+xml, application/xml, text/xml, */*",
+}
+_REDIRECTS = (301, 302, 303, 307, 308)
+
+
+class FetchError(RuntimeError):
+    pass
+
+
+@dataclass
+class _Fetched:
+    status: int
+    body: bytes = b""
+    etag: str = ""
+    last_modified: str = ""
+    value: Any = None  # consume(resp) 的返回值（流式模式）
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+
+class _DeadlineReader:
+    """
+    响应体的总时限：每次读之前把 socket 超时收紧到剩余时间，用 read1 有多少读多少
+    （read(n) 会等满 n 字节：慢滴的服务端每次都赶在 socket 超时之前送一点，就能无限占住名额）。
+    """
+
+    def __init__(self, resp: http.client.HTTPResponse, conn: http.client.HTTPConnection, deadline: float):
+        self._resp = resp
+        self._conn = conn
+        self._deadline = deadline
+
+    def read(self, n: int = -1) -> bytes:
+        left = self._deadline - time.monotonic()
+        if left <= 0:
+            raise FetchError("feed deadline exceeded")
+        if self._conn.sock is not None:
+            self._conn.sock.settimeout(left)
+        try:
+            return self._resp.read1(n if n > 0 else _CHUNK)
+        except TimeoutError:
+            if time.monotonic() >= self._deadline:
+                raise FetchError("feed deadline exceeded")
+            raise
+
+
+class _ConnPool:
+    """
+    keep-alive 连接复用：每个线程按 (scheme, host:port) 持有一条 HTTP/1.1 连接。
+    - 复用的连接若已被对端关闭：自动重连重试一次
+    - 最多跟随 3 次重定向
+    - 代理与 urllib 一致：HTTP(S)_PROXY / NO_PROXY（getproxies / proxy_bypass）；
+      http 目标以绝对 URI 经代理请求，https 目标经 CONNECT 隧道
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._all: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self._proxies = urllib.request.getproxies()
+
+    def _proxy(self, scheme: str, host: str) -> Optional[tuple[str, Dict[str, str]]]:
+        # (代理 host:port, 代理认证头)；不走代理 => None
+        p = self._proxies.get(scheme)
+        if not p or urllib.request.proxy_bypass(host):
+            return None
+        u = urllib.parse.urlsplit(p if "://" in p else f"http://{p}")
+        auth: Dict[str, str] = {}
+        if u.username is not None:
+            cred = f"{urllib.parse.unquote(u.username)}:{urllib.parse.unquote(u.password or '')}"
+            auth["Proxy-Authorization"] = "Basic " + base64.b64encode(cred.encode("utf-8")).decode("ascii")
+        return f"{u.hostname}:{u.port or 80}", auth
+
+    def _conn(self, scheme: str, netloc: str, timeout: float) -> tuple[http.client.HTTPConnection, bool, Optional[Dict[str, str]]]:
+        """
+        (连接, 是否复用, 经代理的 http 请求要加的头 / None = 请求目标用路径)
+        """
+        conns = self._local.__dict__.setdefault("conns", {})
+        hit = conns.get((scheme, netloc))
+        if hit is not None:
+            c = hit[0]
+            c.timeout = timeout
+            if c.sock is not None:
+                c.sock.settimeout(timeout)
+            return c, True, hit[1]
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        proxy = self._proxy(scheme, urllib.parse.urlsplit(f"//{netloc}").hostname or netloc)
+        via: Optional[Dict[str, str]] = None
+        if proxy is None:
+            c = cls(netloc, timeout=timeout)
+        elif scheme == "https":
+            c = cls(proxy[0], timeout=timeout)
+            c.set_tunnel(netloc, headers=proxy[1] or None)
+        else:
+            c, via = cls(proxy[0], timeout=timeout), proxy[1]
+        conns[(scheme, netloc)] = (c, via)
+        with self._lock:
+            self._all.append(c)
+        return c, False, via
+
+    def get(
+        self,
+        url: str,
+        timeout: float = 20,
+        headers: Optional[Dict[str, str]] = None,
+        consume: Optional[Callable[[BinaryIO], Any]] = None,
+        deadline: Optional[float] = None,
+    ) -> _Fetched:
+        """
+        consume 给出时：2xx 响应体不预读，直接交给 consume 流式读取；
+        consume 提前返回（未读完）则关闭该连接，不再复用。
+        deadline（time.monotonic()）：整个请求（含重定向与读响应体）的截止时间；超时 => FetchError / socket.timeout。
+        """
+        hdrs = dict(_HEADERS, **(headers or {}))
+        for _ in range(4):
+            u = urllib.parse.urlsplit(url)
+            if u.scheme not in ("http", "https"):
+                raise FetchError(f"unsupported scheme: {u.scheme}")
+            target = (u.path or "/") + (f"?{u.query}" if u.query else "")
+
+            t = timeout
+            if deadline is not None:
+                t = min(timeout, deadline - time.monotonic())
+                if t <= 0:
+                    raise FetchError("feed deadline exceeded")
+            c, reused, via = self._conn(u.scheme, u.netloc, t)
+            req_target, req_hdrs = target, hdrs
+            if via is not None:  # http 经代理：绝对 URI（Host 头由 http.client 从中取）
+                req_target, req_hdrs = url.split("#", 1)[0], {**hdrs, **via}
+            try:
+                c.request("GET", req_target, headers=req_hdrs)
+                resp = c.getresponse()
+            except (http.client.HTTPException, ConnectionError):
+                c.close()
+                if not reused:
+                    raise
+                c.request("GET", req_target, headers=req_hdrs)
+                resp = c.getresponse()
+
+            if consume is not None and 200 <= resp.status < 300:
+                try:
+                    value = consume(resp if deadline is None else _DeadlineReader(resp, c, deadline))
+                finally:
+                    if resp.will_close or not resp.isclosed():
+                        c.close()
+                return _Fetched(
+                    status=resp.status,
+                    etag=resp.getheader("ETag") or "",
+                    last_modified=resp.getheader("Last-Modified") or "",
+                    value=value,
+                )
+
+            body = resp.read()
+            if resp.will_close:
+                c.close()
+
+            loc = resp.getheader("Location")
+            if resp.status in _REDIRECTS and loc:
+                url = urllib.parse.urljoin(url, loc)
+                continue
+            if resp.status != 304 and not (200 <= resp.status < 300):
+                raise FetchError(f"HTTP {resp.status}")
+            return _Fetched(
+                status=resp.status,
+                body=body,
+                etag=resp.getheader("ETag") or "",
+                last_modified=resp.getheader("Last-Modified") or "",
+            )
+        raise FetchError("too many redirects")
+
+    def close(self) -> None:
+        with self._lock:
+            for c in self._all:
+                c.close()
+            self._all.clear()
+
+
+def _fetch_bytes(url: str, timeout: int = 20, pool: Optional[_ConnPool] = None) -> bytes:
+    if pool is not None:
+        return pool.get(url, timeout=timeout).body
+    req = urllib.request.Request(url, headers=_HEADERS, method="GET")
     with urllib.request.urlopen(req, timeout=timeout) as resp:
         return resp.read()
 
 
-def _first_text(el: ET.Element | None, paths: list[str]) -> str:
-    if el is None:
-        return ""
-    for p in paths:
-        node = el.find(p)
-        if node is not None and (node.text or "").strip():
-            return (node.text or "").strip()
+_CHUNK = 64 * 1024
+_ITEM_TAGS = ("item", "entry")  # RSS 2.0 / RSS 1.0 item，Atom entry
+
+
+def _local(tag: str) -> str:
+    # "{http://www.w3.org/2005/Atom}entry" -> "entry"
+    return tag.rsplit("}", 1)[-1] if tag[:1] == "{" else tag.rsplit(":", 1)[-1]
+
+
+def _child_text(el: ET.Element, names: tuple[str, ...]) -> str:
+    """
+    按 names 顺序取第一个有内容的直接子元素（忽略命名空间前缀）。
+    """
+    found: Dict[str, str] = {}
+    for ch in el:
+        n = _local(ch.tag)
+        if n in names and n not in found:
+            t = (ch.text or "").strip()
+            if t:
+                found[n] = t
+    for n in names:
+        if n in found:
+            return found[n]
     return ""
 
 
-def _parse_rss_or_atom(xml_bytes: bytes, base_url: str) -> list[FeedItem]:
-    root = ET.fromstring(xml_bytes)
-    ns = {"atom": "http://www.w3.org/2005/Atom"}
+def _atom_link(el: ET.Element) -> str:
+    best = ""
+    for ch in el:
+        if _local(ch.tag) != "link":
+            continue
+        href = (ch.attrib.get("href") or "").strip()
+        if not href:
+            # RSS <link>text</link>
+            href = (ch.text or "").strip()
+        if href and ch.attrib.get("rel", "alternate") == "alternate":
+            return href
+        best = best or href
+    return best
+
+
+def _to_item(el: ET.Element, host: str) -> FeedItem:
+    title = _child_text(el, ("title",))
+    summary = _child_text(el, ("description", "summary", "content", "encoded"))
+    published = _child_text(el, ("pubDate", "published", "updated", "date"))
+    return FeedItem(
+        title=_strip_html(title),
+        link=_atom_link(el),
+        summary=_strip_html(summary),
+        published=published,
+        source=host,
+    )
+
 
+def _iter_feed_items(stream: BinaryIO, base_url: str) -> Iterator[FeedItem]:
+    """
+    增量解析 RSS / Atom：
+    - 按块读取，item/entry 闭合即产出
+    - 已产出的元素立即从树上摘除，内存与 feed 总长度无关
+    - 调用方停止迭代 => 不再读取剩余字节（提前终止）
+    """
     host = urllib.parse.urlparse(base_url).hostname or "unknown"
+    parser = ET.XMLPullParser(events=("start", "end"))
+    stack: List[ET.Element] = []
+    depth_in_item = 0
+
+    while True:
+        chunk = stream.read(_CHUNK)
+        if chunk:
+            parser.feed(chunk)
+        else:
+            parser.close()
+        for ev, el in parser.read_events():
+            if ev == "start":
+                stack.append(el)
+                if _local(el.tag) in _ITEM_TAGS:
+                    depth_in_item += 1
+                continue
+
+            stack.pop()
+            if _local(el.tag) in _ITEM_TAGS:
+                depth_in_item -= 1
+                yield _to_item(el, host)
+                if stack:
+                    stack[-1].remove(el)
+            elif depth_in_item == 0 and stack:
+                # item 之外的元素（channel 标题等）：不保留
+                stack[-1].remove(el)
+        if not chunk:
+            return
 
-    items: list[FeedItem] = []
-
-    # RSS 2.0: <rss><channel><item>...
-    channel = root.find("channel")
-    if channel is not None:
-        for it in channel.findall("item"):
-            title = _first_text(it, ["title"])
-            link = _first_text(it, ["link"])
-            desc = _first_text(it, ["description"])
-            pub = _first_text(it, ["pubDate"])
-
-            items.append(
-                FeedItem(
-                    title=_strip_html(title),
-                    link=(link or "").strip(),
-                    summary=_strip_html(desc),
-                    published=pub,
-                    source=host,
-                )
-            )
-        return items
-
-    # Atom: <feed><entry>...
-    if root.tag.endswith("feed"):
-        for e in root.findall("atom:entry", ns) + root.findall("entry"):
-            title = _first_text(e, ["atom:title", "title"])
-            summary = _first_text(e, ["atom:summary", "summary", "atom:content", "content"])
-            updated = _first_text(e, ["atom:updated", "updated", "atom:published", "published"])
-
-            link = ""
-            # atom link: <link href="..."/>
-            ln = e.find("atom:link", ns) or e.find("link")
-            if ln is not None:
-                href = ln.attrib.get("href", "").strip()
-                if href:
-                    link = href
-
-            items.append(
-                FeedItem(
-                    title=_strip_html(title),
-                    link=link,
-                    summary=_strip_html(summary),
-                    published=updated,
-                    source=host,
-                )
-            )
-        return items
 
-    return items
+def _parse_rss_or_atom(xml_bytes: bytes, base_url: str) -> list[FeedItem]:
+    return list(_iter_feed_items(io.BytesIO(xml_bytes), base_url))
 
 
 def _event_id(item: FeedItem) -> str:
@@ -135,39 +366,330 @@ def _event_id(item: FeedItem) -> str:
     return f"evt_rss_{h}"
 
 
-def _write_event(inbox_dir: Path, item: FeedItem) -> Path:
-    inbox_dir.mkdir(parents=True, exist_ok=True)
+CURSOR_IDS = 1000  # 每个 feed 记住最近 N 个 event_id（无可靠时间戳时去重）
+
+
+@dataclass
+class FeedState:
+    """
+    data/state/feeds/<sha1(url)>.json：条件请求校验值 + 游标（高水位）。
+    """
+    url: str
+    etag: str = ""
+    last_modified: str = ""
+    hwm_ts: str = ""                         # 已发出条目中最新的发布时间（ISO）
+    recent_ids: List[str] = field(default_factory=list)
+
+
+def _state_path(state_dir: Path, url: str) -> Path:
+    h = hashlib.sha1(url.encode("utf-8", errors="ignore")).hexdigest()[:16]
+    return state_dir / "feeds" / f"{h}.json"
+
+
+def load_feed_state(state_dir: Path, url: str) -> FeedState:
+    p = _state_path(state_dir, url)
+    if not p.exists():
+        return FeedState(url=url)
+    try:
+        obj = json.loads(p.read_text(encoding="utf-8"))
+    except Exception:
+        return FeedState(url=url)
+    return FeedState(
+        url=url,
+        etag=str(obj.get("etag") or ""),
+        last_modified=str(obj.get("last_modified") or ""),
+        hwm_ts=str(obj.get("hwm_ts") or ""),
+        recent_ids=[str(x) for x in (obj.get("recent_ids") or [])],
+    )
+
+
+def save_feed_state(state_dir: Path, st: FeedState) -> None:
+    p = _state_path(state_dir, st.url)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_name(p.name + ".tmp")
+    tmp.write_text(json.dumps(st.__dict__, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(p)
+
+
+def _is_new(item: FeedItem, eid: str, hwm: datetime | None, recent: set) -> bool:
+    if eid in recent:
+        return False
+    dt = _parse_published(item.published)
+    if hwm is None or dt is None:
+        return True
+    return dt >= hwm
 
-    eid = _event_id(item)
-    ts = _guess_iso_ts(item.published)
-    url = (item.link or "").strip()
 
-    obj = {
-        "event_id": eid,
-        "ts": ts,
+def _event_obj(item: FeedItem, source_tier: str = "B") -> Dict[str, Any]:
+    # inbox 文件的内容（pipeline 不落 inbox，直接用这个 dict）
+    return {
+        "event_id": _event_id(item),
+        "ts": _guess_iso_ts(item.published),
         "title": item.title or "",
         "body": item.summary or "",
-        "url": url,
+        "url": (item.link or "").strip(),
         "source": item.source,
-        # v0.1：RSS 默认给 B（可在后续按宪法做 source-tier 映射/加权）
-        "source_tier": "B",
+        # v0.1：RSS 默认给 B；--sources 模式按 sources.yaml tiers 映射
+        "source_tier": source_tier,
         "tags": [],
     }
 
-    path = inbox_dir / f"{eid}.json"
-    path.write_text(json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8")
+
+def _write_event(inbox_dir: Path, obj: Dict[str, Any]) -> Path:
+    inbox_dir.mkdir(parents=True, exist_ok=True)
+    path = inbox_dir / f"{obj['event_id']}.json"
+    data = json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    path.write_bytes(data)
+    metrics.count("files_written")
+    metrics.count("bytes_written", len(data))
     return path
 
 
-def fetch_rss_to_inbox(url: str, inbox_dir: Path, limit: int = 20) -> int:
-    xml_bytes = _fetch_bytes(url)
-    items = _parse_rss_or_atom(xml_bytes, url)
+def fetch_rss_to_inbox(
+    url: str,
+    inbox_dir: Path,
+    limit: int = 20,
+    timeout: int = 20,
+    source_tier: str = "B",
+    pool: Optional[_ConnPool] = None,
+    state_dir: Optional[Path] = None,
+    seen=None,
+) -> int:
+    n, _, _ = _fetch_feed(url, _inbox_sink(inbox_dir), limit, timeout, source_tier, pool, state_dir, seen)
+    return n
+
+
+def _inbox_sink(inbox_dir: Path) -> Callable[[Dict[str, Any]], None]:
+    def sink(obj: Dict[str, Any]) -> None:
+        with metrics.stage("write_inbox"):
+            _write_event(inbox_dir, obj)
+
+    return sink
 
-    n = 0
-    for it in items[: max(0, int(limit))]:
-        # 必须有 link 或 title，否则跳过
-        if not (it.link or it.title):
+
+def _fetch_feed(
+    url: str,
+    sink: Callable[[Dict[str, Any]], None],
+    limit: int,
+    timeout: int,
+    source_tier: str,
+    pool: Optional[_ConnPool],
+    state_dir: Optional[Path],
+    seen=None,
+    save_state: bool = True,
+) -> tuple[int, bool, int]:
+    """
+    返回 (交给 sink 的条数, 是否 304, 已在冷存而跳过的条数)。
+    - sink：每个新条目的事件 dict（fetch 写 inbox 文件；pipeline 直接进内存队列）
+    - seen（冷存的 SeenIndex）给出：已存储过的条目在交给 sink 之前跳过
+    - 响应体边读边解析，写满 limit 条即停止读取（大 feed 不必整体下载）
+    - state_dir=None：v0.1 行为（无状态，写前 limit 条）
+    - state_dir 给出：条件请求（If-None-Match / If-Modified-Since）+ 游标
+        * 304：不解析、不写盘
+        * 只写比游标新的条目（发布时间 >= 高水位且 event_id 未见过）
+        * 写满 limit 提前停止：剩下的条目还没看过，不保存 ETag / Last-Modified（否则下次 304 把它们藏掉），
+          高水位也不前移（feed 通常新的在前，剩下的更旧，会落到高水位之下）；已看过的只进 recent_ids
+    - save_state=False（dry-run）：游标只读，不回写
+    - timeout 是整个 feed 的时限（连接 + 下载），不只是单次 socket 读
+    """
+    deadline = time.monotonic() + timeout
+    with metrics.stage("feed_state"):
+        st = load_feed_state(state_dir, url) if state_dir is not None else None
+    headers: Dict[str, str] = {}
+    if st is not None and st.etag:
+        headers["If-None-Match"] = st.etag
+    if st is not None and st.last_modified:
+        headers["If-Modified-Since"] = st.last_modified
+
+    hwm = _parse_published(st.hwm_ts) if st is not None else None
+    recent = set(st.recent_ids) if st is not None else set()
+    emitted: List[tuple[str, datetime | None]] = []
+    cap = max(0, int(limit))
+    skipped = 0
+    capped = cap == 0  # 没有读完整个 feed
+
+    def consume(resp: BinaryIO) -> int:
+        nonlocal skipped, capped
+        n = 0
+        if cap == 0:
+            return n
+        for it in _iter_feed_items(resp, url):
+            # 必须有 link 或 title，否则跳过
+            if not (it.link or it.title):
+                continue
+            eid = _event_id(it)
+            if st is not None:
+                if not _is_new(it, eid, hwm, recent):
+                    continue
+                emitted.append((eid, _parse_published(it.published)))
+            if seen is not None and eid in seen:
+                skipped += 1
+                continue
+            sink(_event_obj(it, source_tier=source_tier))
+            n += 1
+            if n >= cap:
+                capped = True
+                break
+        return n
+
+    own = pool is None
+    pool = pool or _ConnPool()
+    try:
+        # http：连接 + 下载 + 流式解析（三者交错，无法再拆）；包含 sink（write_inbox）
+        with metrics.stage("http"):
+            got = pool.get(url, timeout=timeout, headers=headers, consume=consume, deadline=deadline)
+    finally:
+        if own:
+            pool.close()
+    if got.not_modified:
+        return 0, True, 0
+
+    if st is not None and save_state:
+        if not capped:
+            st.etag, st.last_modified = got.etag, got.last_modified
+            dts = [dt for _, dt in emitted if dt is not None] + ([hwm] if hwm is not None else [])
+            if dts:
+                st.hwm_ts = max(dts).isoformat()
+        st.recent_ids = (st.recent_ids + [eid for eid, _ in emitted])[-CURSOR_IDS:]
+        with metrics.stage("feed_state"):
+            save_feed_state(state_dir, st)
+    return int(got.value or 0), False, skipped
+
+
+@dataclass
+class FeedResult:
+    url: str
+    items: int = 0
+    skipped: int = 0
+    not_modified: bool = False
+    latency_s: float = 0.0
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+@dataclass
+class FeedSpec:
+    url: str
+    limit: int = 20
+    timeout: int = 20
+    source_tier: str = "B"
+    host: str = field(default="", repr=False)
+
+
+def _tier_for(host: str, tiers: Dict) -> str:
+    host = (host or "").lower()
+    for tier in ("A", "B", "C"):
+        for dom in tiers.get(tier) or []:
+            dom = str(dom).lower()
+            if host == dom or host.endswith("." + dom):
+                return tier
+    return "B"
+
+
+def load_feed_specs(sources_cfg: Dict, limit: int = 20, timeout: int = 20) -> List[FeedSpec]:
+    """
+    sources.yaml:
+      tiers: {A: [domain...], B: [...], C: [...]}
+      feeds: [{url, limit?, timeout?, tier?}]  # tier 缺省按域名映射 tiers
+    """
+    tiers = (sources_cfg or {}).get("tiers") or {}
+    out: List[FeedSpec] = []
+    for f in (sources_cfg or {}).get("feeds") or []:
+        if isinstance(f, str):
+            f = {"url": f}
+        url = str((f or {}).get("url") or "").strip()
+        if not url:
             continue
-        _write_event(inbox_dir, it)
-        n += 1
-    return n
+        host = urllib.parse.urlparse(url).hostname or ""
+        tier = str(f.get("tier") or _tier_for(host, tiers)).upper()
+        out.append(
+            FeedSpec(
+                url=url,
+                limit=int(f.get("limit") or limit),
+                timeout=int(f.get("timeout") or timeout),
+                source_tier=tier if tier in ("A", "B", "C") else "B",
+                host=host,
+            )
+        )
+    return out
+
+
+def fetch_feeds_to_inbox(
+    feeds: List[FeedSpec],
+    inbox_dir: Path,
+    workers: int = 8,
+    per_host: int = 2,
+    state_dir: Optional[Path] = None,
+    seen=None,
+) -> List[FeedResult]:
+    return fetch_feeds(feeds, _inbox_sink(inbox_dir), workers, per_host, state_dir, seen)
+
+
+def fetch_feeds(
+    feeds: List[FeedSpec],
+    sink: Callable[[Dict[str, Any]], None],
+    workers: int = 8,
+    per_host: int = 2,
+    state_dir: Optional[Path] = None,
+    seen=None,
+    save_state: bool = True,
+) -> List[FeedResult]:
+    """
+    多源并发抓取：
+    - 有界线程池（workers）+ 每个 host 的并发上限（per_host）
+    - 按 host 排队调度：某 host 有空闲名额时才提交它的下一个 feed，线程池里不会有等名额的线程，
+      同一 host 的积压不挡其他 host
+    - 线程内 keep-alive 连接复用；每个 feed 的 timeout 是总时限
+    - 单个 feed 失败只记录在结果里，不影响其他 feed
+    - sink 在抓取线程中被调用（需线程安全）
+    返回与 feeds 同序的结果（默认沉默，由 CLI 决定是否输出）。
+    """
+    pool = _ConnPool()
+    limit = max(1, int(per_host))
+    queues: Dict[str, deque] = {}
+    for i, f in enumerate(feeds):
+        queues.setdefault(f.host, deque()).append(i)
+    active: Dict[str, int] = dict.fromkeys(queues, 0)
+    results: List[Optional[FeedResult]] = [None] * len(feeds)
+
+    def one(f: FeedSpec) -> FeedResult:
+        res = FeedResult(url=f.url)
+        t0 = time.perf_counter()
+        try:
+            res.items, res.not_modified, res.skipped = _fetch_feed(
+                f.url, sink, f.limit, f.timeout, f.source_tier, pool, state_dir, seen, save_state
+            )
+        except Exception as e:
+            res.error = f"{type(e).__name__}: {e}"
+        res.latency_s = time.perf_counter() - t0
+        return res
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, int(workers))) as ex:
+            running: Dict[Future, int] = {}
+
+            def submit(host: str) -> None:
+                i = queues[host].popleft()
+                active[host] += 1
+                running[ex.submit(one, feeds[i])] = i
+
+            # 第一轮按 host 轮转提交：每个 host 先占一个名额，再补到 per_host
+            for _ in range(limit):
+                for host, q in queues.items():
+                    if q and active[host] < limit:
+                        submit(host)
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    i = running.pop(fut)
+                    results[i] = fut.result()
+                    host = feeds[i].host
+                    active[host] -= 1
+                    if queues[host]:
+                        submit(host)
+        return [r for r in results if r is not None]
+    finally:
+        pool.close()
@@ -4,9 +4,9 @@ import json
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Dict
+from typing import Callable, Dict, Optional
 
-import yaml
+from .locks import atomic_write_text, file_lock
 
 
 @dataclass
@@ -15,17 +15,19 @@ class GateState:
     burst_count: int = 0
     burst_window_start: str = ""  # ISO
     last_interrupt_ts: str = ""
+    month: str = ""               # YYYY-MM（UTC），month_count 所属月份
+    month_count: int = 0          # 本月已打断次数（interrupt.monthly_budget）
 
 
 def _utc_now() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def load_rules(config_dir: Path) -> Dict:
-    p = config_dir / "rules.yaml"
-    if not p.exists():
-        return {}
-    return yaml.safe_load(p.read_text(encoding="utf-8")) or {}
+def load_rules(config_dir: Path, state_dir: Path | None = None) -> Dict:
+    # 与 decision 共用同一份配置快照（见 config.load_config）；延迟导入：reset-gate 不需要配置
+    from .config import load_config
+
+    return load_config(config_dir, state_dir).rules
 
 
 def load_state(state_dir: Path) -> GateState:
@@ -38,31 +40,51 @@ def load_state(state_dir: Path) -> GateState:
         burst_count=int(obj.get("burst_count", 0)),
         burst_window_start=str(obj.get("burst_window_start", "")),
         last_interrupt_ts=str(obj.get("last_interrupt_ts", "")),
+        month=str(obj.get("month", "")),
+        month_count=int(obj.get("month_count", 0)),
     )
 
 
 def save_state(state_dir: Path, st: GateState) -> None:
-    p = state_dir / "gate.json"
-    p.write_text(json.dumps(st.__dict__, ensure_ascii=False, indent=2), encoding="utf-8")
+    # 原子替换：并发读者不会读到半个 JSON
+    atomic_write_text(state_dir / "gate.json", json.dumps(st.__dict__, ensure_ascii=False, indent=2))
 
 
-def can_interrupt(config_dir: Path, state_dir: Path) -> bool:
-    st = load_state(state_dir)
-    return not st.tripped
+def _gate_lock(state_dir: Path):
+    # 所有 gate.json 的读-改-写都在这把锁内完成（多个 run 进程共享同一 SIGNALGATE_HOME）
+    return file_lock(state_dir / "gate.lock")
 
 
-def on_interrupt(config_dir: Path, state_dir: Path) -> GateState:
-    """
-    熔断机制（硬约束）：
-    - 1 小时内 >=2 次 interrupt => tripped = True
-    """
-    rules = load_rules(config_dir).get("gate", {})
-    window_min = int(rules.get("burst_window_minutes", 60))
-    limit = int(rules.get("burst_limit", 2))
+def _month_key(now: datetime) -> str:
+    return now.strftime("%Y-%m")
+
+
+def _limits(rules_cfg: Dict) -> tuple[int, int, int]:
+    from .config import compile_rules
 
-    now = _utc_now()
-    st = load_state(state_dir)
+    # 未配置 / <=0 => 不限月度预算
+    r = compile_rules(rules_cfg)
+    return r.burst_window_minutes, r.burst_limit, r.monthly_budget
 
+
+def _blocked_reason(st: GateState, now: datetime, window_min: int, limit: int, budget: int) -> str:
+    # "" => 允许；否则为拦截原因（tripped / burst / budget）
+    if st.tripped:
+        return "tripped"
+    if st.burst_window_start:
+        start = datetime.fromisoformat(st.burst_window_start)
+        if now - start <= timedelta(minutes=window_min) and st.burst_count >= limit:
+            return "burst"
+    if budget > 0 and st.month == _month_key(now) and st.month_count >= budget:
+        return "budget"
+    return ""
+
+
+def _allows(st: GateState, now: datetime, window_min: int, limit: int, budget: int) -> bool:
+    return not _blocked_reason(st, now, window_min, limit, budget)
+
+
+def _record(st: GateState, now: datetime, window_min: int, limit: int) -> None:
     if st.burst_window_start:
         start = datetime.fromisoformat(st.burst_window_start)
     else:
@@ -80,12 +102,80 @@ def on_interrupt(config_dir: Path, state_dir: Path) -> GateState:
 
     st.last_interrupt_ts = now.isoformat()
 
+    month = _month_key(now)
+    if st.month != month:
+        st.month, st.month_count = month, 0
+    st.month_count += 1
+
     if st.burst_count >= limit:
         st.tripped = True
 
-    save_state(state_dir, st)
+
+def can_interrupt(config_dir: Path, state_dir: Path, rules_cfg: Dict | None = None) -> bool:
+    """
+    O(1)：只读 gate.json，不扫描审计日志（只读查询；要真正打断请用 try_interrupt）。
+    - 熔断（tripped）=> False
+    - 当前 burst 窗口内已达 burst_limit => False
+    - 本月已达 interrupt.monthly_budget => False（跨月自动归零）
+    """
+    if rules_cfg is None:
+        rules_cfg = load_rules(config_dir, state_dir)
+    window_min, limit, budget = _limits(rules_cfg)
+    return _allows(load_state(state_dir), _utc_now(), window_min, limit, budget)
+
+
+def on_interrupt(config_dir: Path, state_dir: Path, rules_cfg: Dict | None = None) -> GateState:
+    """
+    熔断机制（硬约束）：
+    - 1 小时内 >=2 次 interrupt => tripped = True
+    - 月度计数：跨月（UTC）归零后 +1
+    - rules_cfg 可由调用方传入（batch 模式避免重复读取 rules.yaml）
+    """
+    if rules_cfg is None:
+        rules_cfg = load_rules(config_dir, state_dir)
+    window_min, limit, _ = _limits(rules_cfg)
+
+    with _gate_lock(state_dir):
+        st = load_state(state_dir)
+        _record(st, _utc_now(), window_min, limit)
+        save_state(state_dir, st)
+    return st
+
+
+def try_interrupt(
+    config_dir: Path,
+    state_dir: Path,
+    rules_cfg: Dict | None = None,
+    on_allow: Optional[Callable[[], None]] = None,
+) -> Optional[GateState]:
+    """
+    检查 + 计数合并为一次加锁的读-改-写：
+    - 允许 => 记一次打断并返回新状态
+    - 不允许 => None（状态不变）
+    并发进程不会同时通过同一个名额（can_interrupt + on_interrupt 分开调用则可能）。
+    on_allow：放行时在同一把锁内、计数落盘之前调用（调用方先把打断持久化；
+    之后崩溃最多少计一次，不会出现“名额已用掉、打断却没留下”）；抛异常 => 不计数。
+    """
+    if rules_cfg is None:
+        rules_cfg = load_rules(config_dir, state_dir)
+    window_min, limit, budget = _limits(rules_cfg)
+
+    with _gate_lock(state_dir):
+        st = load_state(state_dir)
+        now = _utc_now()
+        if not _allows(st, now, window_min, limit, budget):
+            return None
+        if on_allow is not None:
+            on_allow()
+        _record(st, now, window_min, limit)
+        save_state(state_dir, st)
     return st
 
 
 def reset_gate(state_dir: Path) -> None:
-    save_state(state_dir, GateState())
+    """
+    人工复位熔断：清空 burst 状态；月度计数保留（复位不等于追加预算）。
+    """
+    with _gate_lock(state_dir):
+        st = load_state(state_dir)
+        save_state(state_dir, GateState(month=st.month, month_count=st.month_count))
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from .coldstore import get_events, iter_events
+from .config import CompiledRules, compile_rules
+from .decision import _STRUCTURAL_TAGS, decide_batch
+from .matcher import Bet, BetMatcher, compile_bets
+from .terms import WordVocab, open_terms, tag_key, words
+
+# 探针 = 若干组键的“与”；每组内为“或”：命中探针 = 每一组都至少命中一个键
+Probe = List[Set[str]]
+
+
+def _tier_ok(r: CompiledRules) -> Dict[str, bool]:
+    return {
+        t: not (r.q1_always_no_for_c and t == "C") and r.rank.get(t, 0) >= r.rank.get(r.q1_min, 0)
+        for t in ("A", "B", "C")
+    }
+
+
+def _bet_keys(b: Bet) -> Tuple[Set[str], Set[str]]:
+    # (子串模式, 标签键)：与 BetMatcher 相同（id / name 子串命中 title+body；id / tags 与事件标签精确相等）
+    pats = {p for p in (b.bid, b.name_l) if p}
+    tags = {tag_key(t) for t in ((b.bid,) if b.bid else ()) + b.tags}
+    return pats, tags
+
+
+def _bet_sig(b: Bet) -> Tuple:
+    return (b.bid, b.name, b.tags)
+
+
+@dataclass
+class ConfigDiff:
+    """
+    两份配置之间会改变 decide / 实体 / action 结果的特征：
+    - patterns：需要按子串解析的 bets id / name
+    - probes：标签 / 等级键组成的探针
+    - full_scan：出现无法用词表解析的模式（不含任何 \\w 字符）=> 退化为全量扫描
+    """
+    patterns: Set[str] = field(default_factory=set)
+    probes: List[Probe] = field(default_factory=list)
+    reasons: List[str] = field(default_factory=list)
+    full_scan: bool = False
+
+    @property
+    def empty(self) -> bool:
+        return not (self.patterns or self.probes or self.full_scan)
+
+
+def diff_configs(old_bets: Dict, old_rules: Dict, new_bets: Dict, new_rules: Dict) -> ConfigDiff:
+    ro, rn = compile_rules(old_rules), compile_rules(new_rules)
+    bo, bn = compile_bets(old_bets).bets, compile_bets(new_bets).bets
+    out = ConfigDiff()
+
+    def bets_changed(bets) -> None:
+        for b in bets:
+            pats, tags = _bet_keys(b)
+            out.patterns |= pats
+            if tags:
+                out.probes.append([tags])
+
+    # bets.direct：按内容做序列比对。未变动的区段内 bets 的相对顺序不变（实体 = 首个命中的 bet），
+    # 只命中这些 bets 的事件结果不变；增删改与调换顺序的 bets 落在变动区段
+    ko, kn = [_bet_sig(b) for b in bo], [_bet_sig(b) for b in bn]
+    touched = []
+    for op, i1, i2, j1, j2 in SequenceMatcher(None, ko, kn, autojunk=False).get_opcodes():
+        if op != "equal":
+            touched += list(bo[i1:i2]) + list(bn[j1:j2])
+    if touched:
+        bets_changed(touched)
+        out.reasons.append(f"bets.direct: {len(touched)} bet(s) added / removed / changed / reordered")
+    if ro.impact_direct != rn.impact_direct:
+        bets_changed(bo + bn)
+        out.reasons.append("decision.impact_radius.direct")
+
+    force_o = bool(((old_bets or {}).get("bets") or {}).get("force"))
+    force_n = bool(((new_bets or {}).get("bets") or {}).get("force"))
+    force_all = {tag_key(t) for t in ro.force_tags | rn.force_tags}
+
+    for name, a, b in (
+        ("q3_policy.force_tags", ro.force_tags, rn.force_tags),
+        ("q3_policy.explicit_tags", ro.explicit_tags, rn.explicit_tags),
+        ("action_map.sell_tags", ro.sell_tags, rn.sell_tags),
+        ("action_map.reduce_tags", ro.reduce_tags, rn.reduce_tags),
+        ("action_map.buy_tags", ro.buy_tags, rn.buy_tags),
+    ):
+        if a != b:
+            out.probes.append([{tag_key(t) for t in a ^ b}])
+            out.reasons.append(f"{name}: {', '.join(sorted(a ^ b))}")
+    if force_o != force_n:
+        out.probes.append([force_all])
+        out.reasons.append("bets.force (empty <-> non-empty)")
+    if ro.allowed_actions != rn.allowed_actions:
+        out.probes.append([{tag_key(t) for t in ro.sell_tags | ro.reduce_tags | ro.buy_tags | rn.sell_tags | rn.reduce_tags | rn.buy_tags}])
+        out.reasons.append("action_map.allowed_actions")
+
+    # Q1 阈值（rank / q1_min_evidence / tier C 策略）：只影响“有结构 / force 迹象”的对应等级事件
+    to, tn = _tier_ok(ro), _tier_ok(rn)
+    tiers = [t for t in ("A", "B", "C") if to[t] != tn[t]]
+    if tiers:
+        out.probes.append([{f"r:{t}" for t in tiers}, {tag_key(t) for t in _STRUCTURAL_TAGS} | force_all])
+        out.reasons.append(f"q1 evidence threshold: tier {','.join(tiers)}")
+
+    out.full_scan = any(not words(p) for p in out.patterns)
+    return out
+
+
+def _pattern_probe(p: str, vocab: WordVocab) -> Probe:
+    """
+    子串 p 命中 title+body => 按同一分词规则，p 的首词是某个词的后缀、尾词是某个词的前缀、中间词完整出现；
+    单个词时则为某个词的子串。只用于缩小候选集，最终由 decide 复核。
+    """
+    ws = words(p)
+    if len(ws) == 1:
+        return [{"w:" + w for w in vocab.containing(ws[0])}]
+    probe = [{"w:" + w for w in vocab.endswith(ws[0])}]
+    probe += [{"w:" + w} for w in ws[1:-1]]
+    probe.append({"w:" + w for w in vocab.startswith(ws[-1])})
+    return probe
+
+
+def _candidates(root: Path, diff: ConfigDiff) -> Set[str]:
+    idx = open_terms(root)
+    probes = list(diff.probes)
+    if diff.patterns:
+        vocab = idx.word_vocab()
+        probes += [_pattern_probe(p, vocab) for p in diff.patterns]
+    hits = idx.lookup({k for pr in probes for g in pr for k in g})
+    out: Set[str] = set()
+    for pr in probes:
+        cur: Optional[Set[str]] = None
+        for g in sorted(pr, key=len):
+            ids = set().union(*(hits.get(k, ()) for k in g))
+            cur = ids if cur is None else cur & ids
+            if not cur:
+                break
+        out |= cur or set()
+    return out
+
+
+def _match_both(events: List, old_bets: Dict, new_bets: Dict) -> Tuple[List[List[Bet]], List[List[Bet]]]:
+    """
+    新旧 bets 合并成一个匹配器，每条事件只扫描一次（文本扫描是判定的主要开销）；
+    命中按下标拆回两份（下标顺序即各自的优先级顺序）。
+    """
+    od = ((old_bets or {}).get("bets") or {}).get("direct") or []
+    nd = ((new_bets or {}).get("bets") or {}).get("direct") or []
+    n = len(od)
+    m = BetMatcher([*od, *nd])
+    old: List[List[Bet]] = []
+    new: List[List[Bet]] = []
+    for ev in events:
+        bets = m.match_event(ev)
+        old.append([b for b in bets if b.index < n])
+        new.append([b for b in bets if b.index >= n])
+    return old, new
+
+
+@dataclass
+class ImpactReport:
+    reasons: List[str] = field(default_factory=list)
+    candidates: int = 0
+    full_scan: bool = False
+    elapsed_s: float = 0.0
+    changes: Counter = field(default_factory=Counter)   # (旧 state, 新 state) -> 条数
+    affected: List[Dict] = field(default_factory=list)  # 结果（state / 三问 / 实体 / action）有变化的事件
+
+    def to_dict(self) -> Dict:
+        return {
+            "reasons": self.reasons,
+            "candidates": self.candidates,
+            "full_scan": self.full_scan,
+            "elapsed_s": round(self.elapsed_s, 4),
+            "affected": len(self.affected),
+            "changes": [{"old": a, "new": b, "count": n} for (a, b), n in self.changes.most_common()],
+            "events": self.affected,
+        }
+
+
+def impact(roots: List[Path], old_bets: Dict, old_rules: Dict, new_bets: Dict, new_rules: Dict) -> ImpactReport:
+    """
+    配置变更会影响哪些已存事件：
+    - 由两份配置的差异得到探针 -> 在各存储目录的倒排索引中求候选（不扫描事件本体）
+    - 候选事件用新旧配置各判定一次，只报告结果真正变化的事件
+    """
+    t0 = time.perf_counter()
+    diff = diff_configs(old_bets, old_rules, new_bets, new_rules)
+    rep = ImpactReport(reasons=diff.reasons, full_scan=diff.full_scan)
+    if diff.empty:
+        rep.elapsed_s = time.perf_counter() - t0
+        return rep
+
+    for root in roots:
+        if not root.exists():
+            continue
+        if diff.full_scan:
+            events = list(iter_events(root))
+        else:
+            events = list(get_events(root, _candidates(root, diff)).values())
+        rep.candidates += len(events)
+        if not events:
+            continue
+        old_hits, new_hits = _match_both(events, old_bets, new_bets)
+        old = decide_batch(events, old_bets, old_rules, hits=old_hits)
+        new = decide_batch(events, new_bets, new_rules, hits=new_hits)
+        for ev, a, b in zip(events, old, new):
+            if a == b:
+                continue
+            rep.changes[(a[0].state, b[0].state)] += 1
+            rep.affected.append({
+                "store": root.name,
+                "ts": ev.ts,
+                "event_id": ev.event_id,
+                "old": {"state": a[0].state, "entity": a[1], "action": a[2], "q": _q(a[0])},
+                "new": {"state": b[0].state, "entity": b[1], "action": b[2], "q": _q(b[0])},
+            })
+    rep.affected.sort(key=lambda x: (x["ts"], x["event_id"]))
+    rep.elapsed_s = time.perf_counter() - t0
+    return rep
+
+
+def _q(d) -> str:
+    return "".join("Y" if x else "N" for x in (d.q1_structural, d.q2_affects_bets, d.q3_requires_action))
+
+
+def format_report(rep: ImpactReport, limit: int = 50) -> str:
+    if not rep.reasons:
+        return "No decision-relevant config changes."
+    lines = ["Changed:"] + [f"  {r}" for r in rep.reasons]
+    scope = "full scan" if rep.full_scan else "index"
+    lines.append(
+        f"Candidates: {rep.candidates} ({scope})  affected: {len(rep.affected)}  elapsed: {rep.elapsed_s * 1000:.0f}ms"
+    )
+    for (a, b), n in rep.changes.most_common():
+        lines.append(f"  {a} -> {b}\t{n}")
+    for x in rep.affected[:limit]:
+        o, n = x["old"], x["new"]
+        lines.append(
+            f"  {x['ts']}\t{x['event_id']}\t{x['store']}\t"
+            f"{o['state']}/{o['q']}/{o['entity']}/{o['action']} -> {n['state']}/{n['q']}/{n['entity']}/{n['action']}"
+        )
+    if len(rep.affected) > limit:
+        lines.append(f"  ... {len(rep.affected) - limit} more (--limit / --json)")
+    return "\n".join(lines)
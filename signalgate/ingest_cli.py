@@ -1,9 +1,23 @@
 from __future__ import annotations
 
+import fnmatch
+import hashlib
+import os
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Optional, Tuple
 
+from . import metrics
+from .coldstore import bulk_writes, flush_all
 from .ingress import load_event_from_json, write_cold_event
+from .models import Event
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
 
 
 def _iter_inputs(p: Path, glob_pattern: str) -> List[Path]:
@@ -14,18 +28,189 @@ def _iter_inputs(p: Path, glob_pattern: str) -> List[Path]:
     return []
 
 
-def ingest(input_path: Path, cold_dir: Path, glob_pattern: str = "*.json") -> int:
+@dataclass
+class IngestResult:
+    new: int = 0
+    skipped: int = 0  # 已在冷存中（seen index 命中）
+    failed: int = 0   # 并行模式：无法解析的文件（计数后跳过）
+    resumed: int = 0  # 并行模式：checkpoint 中已完成、本次未重读的文件
+
+    @property
+    def files(self) -> int:
+        return self.new + self.skipped + self.failed
+
+
+def ingest(
+    input_path: Path,
+    cold_dir: Path,
+    glob_pattern: str = "*.json",
+    workers: int = 0,
+    checkpoint: Optional[Path] = None,
+    progress: Optional[Callable[[IngestResult, float], None]] = None,
+) -> IngestResult:
     """
     Ingress v0.1（收集层）：
     - 只负责把事件写入 Cold Store
     - 不过滤、不判定、不打断
+    - 已见过的 event_id 跳过（不重写）
+    - workers > 1 且输入为目录：并行解码 + 单写者批量写入（见 _ingest_parallel）
     - 默认沉默：不 print
     """
-    files = _iter_inputs(input_path, glob_pattern)
-    n = 0
-    for f in files:
-        # v0.1 只 ingest “事件 JSON”，后续再接 RSS/API/文本
-        ev = load_event_from_json(f)
-        write_cold_event(cold_dir, ev)
-        n += 1
-    return n
+    if workers > 1 and input_path.is_dir():
+        return _ingest_parallel(input_path, cold_dir, glob_pattern, workers, checkpoint, progress)
+
+    with metrics.stage("scan"):
+        files = _iter_inputs(input_path, glob_pattern)
+    res = IngestResult()
+    with bulk_writes():
+        for f in files:
+            # v0.1 只 ingest “事件 JSON”，后续再接 RSS/API/文本
+            with metrics.stage("read"):
+                ev = load_event_from_json(f)
+            with metrics.stage("cold_write"):
+                out = write_cold_event(cold_dir, ev)
+            if out is None:
+                res.skipped += 1
+            else:
+                res.new += 1
+    return res
+
+
+# ---- 并行 ingest
+
+BATCH_FILES = 256
+
+
+def default_checkpoint(state_dir: Path, input_path: Path, glob_pattern: str) -> Path:
+    key = f"{input_path}|{glob_pattern}".encode("utf-8", errors="ignore")
+    return state_dir / "ingest" / f"{hashlib.sha1(key).hexdigest()[:16]}.ckpt"
+
+
+def _scan(input_path: Path, glob_pattern: str) -> Iterator[str]:
+    # os.scandir 流式枚举：不把整个目录列表装进内存
+    with os.scandir(input_path) as it:
+        for e in it:
+            if fnmatch.fnmatch(e.name, glob_pattern) and e.is_file():
+                yield e.name
+
+
+def _batches(names: Iterable[str], size: int) -> Iterator[List[str]]:
+    buf: List[str] = []
+    for n in names:
+        buf.append(n)
+        if len(buf) >= size:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+
+def _decode_batch(input_dir: str, names: List[str]) -> List[Tuple[str, Optional[Event]]]:
+    """
+    工作进程：读取 + JSON 解码 + 规范化；失败的文件返回 None。
+    """
+    out: List[Tuple[str, Optional[Event]]] = []
+    for n in names:
+        try:
+            ev = load_event_from_json(Path(input_dir) / n)
+            out.append((n, ev if ev.event_id else None))
+        except Exception:
+            out.append((n, None))
+    return out
+
+
+def _load_checkpoint(p: Optional[Path]) -> set:
+    if p is None or not p.exists():
+        return set()
+    return set(p.read_text(encoding="utf-8").split("\n")) - {""}
+
+
+def _ingest_parallel(
+    input_path: Path,
+    cold_dir: Path,
+    glob_pattern: str,
+    workers: int,
+    checkpoint: Optional[Path],
+    progress: Optional[Callable[[IngestResult, float], None]],
+) -> IngestResult:
+    """
+    并行 ingest：
+    - 扫描 -> 进程池解码（有界在途批次）-> 有界队列 -> 单写者线程批量写入
+    - 内存与输入规模无关（只有在途批次常驻；续跑时另加已完成文件名集合）
+    - checkpoint：每批写入落盘后追加该批文件名；中断后再跑会跳过已完成文件，全部完成后删除
+    """
+    from concurrent.futures import ProcessPoolExecutor  # 只有并行模式才加载 multiprocessing
+
+    res = IngestResult()
+    done = _load_checkpoint(checkpoint)
+    if checkpoint is not None:
+        checkpoint.parent.mkdir(parents=True, exist_ok=True)
+
+    q: "queue.Queue" = queue.Queue(maxsize=workers * 2)
+    t0 = time.perf_counter()
+    err: List[BaseException] = []
+
+    def writer() -> None:
+        ck = checkpoint.open("a", encoding="utf-8") if checkpoint is not None else None
+        try:
+            with bulk_writes():
+                while True:
+                    batch = q.get()
+                    if batch is None:
+                        return
+                    # 解码在工作进程中完成（本进程看不到 read 耗时，只计文件数）
+                    metrics.count("files_read", len(batch))
+                    with metrics.stage("cold_write"):
+                        for _, ev in batch:
+                            if ev is None:
+                                res.failed += 1
+                            elif write_cold_event(cold_dir, ev) is None:
+                                res.skipped += 1
+                            else:
+                                res.new += 1
+                    # 先让数据落盘，再记 checkpoint
+                    with metrics.stage("flush"):
+                        flush_all()
+                    if ck is not None:
+                        ck.write("".join(f"{n}\n" for n, _ in batch))
+                        ck.flush()
+                    if progress is not None:
+                        progress(res, time.perf_counter() - t0)
+        except BaseException as e:  # 交给主线程抛出
+            err.append(e)
+            while q.get() is not None:
+                pass
+        finally:
+            if ck is not None:
+                ck.close()
+
+    wt = threading.Thread(target=writer, name="signalgate-ingest-writer", daemon=True)
+    wt.start()
+
+    def todo() -> Iterator[str]:
+        for n in _scan(input_path, glob_pattern):
+            if n in done:
+                res.resumed += 1
+                continue
+            yield n
+
+    inflight: "deque[Future]" = deque()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            for names in _batches(todo(), BATCH_FILES):
+                inflight.append(ex.submit(_decode_batch, str(input_path), names))
+                if len(inflight) >= workers * 2:
+                    q.put(inflight.popleft().result())
+                if err:
+                    break
+            while inflight and not err:
+                q.put(inflight.popleft().result())
+    finally:
+        q.put(None)
+        wt.join()
+
+    if err:
+        raise err[0]
+    if checkpoint is not None and checkpoint.exists():
+        checkpoint.unlink()
+    return res
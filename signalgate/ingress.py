@@ -2,33 +2,52 @@ from __future__ import annotations
 
 import json
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
 
-from .models import Event, utc_now_iso
+from . import metrics
+from .coldstore import open_store
+from .models import CompactEvent, Event
+from .observation import open_index
+from .seen import open_seen
+from .terms import open_terms
 
 
-def load_event_from_json(path: Path) -> Event:
+def load_event_from_json(path: Path, compact: bool = False) -> Union[Event, CompactEvent]:
     """
     v0.1：最小 ingress
     - 读取一个 JSON 文件作为事件输入（你可以手动丢文件/或后续接 RSS/API）
+    - compact=True：返回 CompactEvent（大批量常驻内存时用）
     """
-    obj = json.loads(path.read_text(encoding="utf-8"))
-    return Event(
-        event_id=str(obj.get("event_id") or obj.get("id") or path.stem),
-        ts=str(obj.get("ts") or utc_now_iso()),
-        title=str(obj.get("title") or ""),
-        body=str(obj.get("body") or ""),
-        url=str(obj.get("url") or ""),
-        source=str(obj.get("source") or ""),
-        source_tier=str(obj.get("source_tier") or "C"),
-        tags=list(obj.get("tags") or []),
-    )
-
-
-def write_cold_event(cold_dir: Path, event: Event) -> Path:
+    raw = path.read_bytes()
+    metrics.count("files_read")
+    metrics.count("bytes_read", len(raw))
+    obj = json.loads(raw.decode("utf-8"))
+    return (CompactEvent if compact else Event).from_dict(obj, fallback_id=path.stem)
+
+
+def write_cold_event(cold_dir: Path, event: Union[Event, CompactEvent], entity: Optional[str] = None) -> Optional[Path]:
     """
     冷存写入：默认墓地（无输出、无提示）。
+    - 已见过的 event_id：直接跳过（不编码、不写盘），返回 None；
+      判定与写入在 seen 索引的跨进程锁内完成，并发的 ingest / run 不会重复写入同一事件
+    - 存储形态由目录决定：逐文件 JSON（默认）或分段 NDJSON（migrate-cold 之后）
+    - 追加倒排索引（<dir>/_terms，供 impact 查询）：只进内存缓冲，批量结束 / 查询前 / 退出时落盘
+    - entity 非空（tentative 观察区）：同步追加观察索引；索引尚不存在则留给下次查询时重建
     """
-    out = cold_dir / f"{event.event_id}.json"
-    out.write_text(json.dumps(event.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+    seen = open_seen(cold_dir)
+    if event.event_id in seen and seen.current():  # 已见（重复抓取的常见情况）：不必拿锁
+        return None
+    with seen.locked():
+        if event.event_id in seen:
+            return None
+
+        terms = open_terms(cold_dir)  # 先打开：索引缺失时的重建不会把本事件算进去两次
+        out = open_store(cold_dir).append(event)
+        seen.add(event.event_id)
+    terms.add(event)
+
+    if entity is not None:
+        idx = open_index(cold_dir)
+        if idx is not None:
+            idx.add(entity, event.ts, event.source, event.event_id)
     return out
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # 非 POSIX：退化为无锁（单进程使用）
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: Path, shared: bool = False) -> Iterator[None]:
+    """
+    跨进程互斥（fcntl.flock，阻塞等待）：
+    - path 是专用锁文件（不存在则创建，内容为空，永不删除）
+    - 进程崩溃时内核自动释放，不会留下死锁
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # 关闭即释放锁
+
+
+def lock_fd(fd: int, blocking: bool = True) -> bool:
+    """
+    对已打开的 fd 加排他锁；blocking=False 时拿不到锁返回 False。
+    """
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+def unlock_fd(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def tmp_path(path: Path) -> Path:
+    # 每个进程独立的临时文件名：并发 rename 不会互相踩掉对方的 tmp
+    return path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """
+    写临时文件 + fsync + rename：读者只会看到旧内容或完整的新内容。
+    """
+    tmp = tmp_path(path)
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
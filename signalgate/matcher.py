@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class Bet:
+    """bets.direct 单项（已规范化：id/name/tags 全部小写）。"""
+    index: int      # bets.yaml 中的顺序 = 优先级
+    bid: str
+    name: str       # 原始 name（去首尾空白），用于展示
+    name_l: str
+    tags: Tuple[str, ...]
+
+    @property
+    def entity(self) -> str:
+        return self.name if self.name else (self.bid.upper() if self.bid else "UNKNOWN")
+
+
+class _Automaton:
+    """
+    Aho-Corasick：一次扫描文本，返回所有命中的 payload（bet index）。
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, int]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+
+        outs: List[set] = [set()]
+        for pat, payload in patterns:
+            if not pat:
+                continue
+            s = 0
+            for ch in pat:
+                nxt = self._goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[s][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outs.append(set())
+                s = nxt
+            outs[s].add(payload)
+
+        # BFS 构建 fail 链，并把 fail 链上的输出合并到当前节点
+        q = deque(self._goto[0].values())
+        while q:
+            s = q.popleft()
+            for ch, nxt in self._goto[s].items():
+                q.append(nxt)
+                f = self._fail[s]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                outs[nxt] |= outs[self._fail[nxt]]
+
+        self._out = [tuple(o) for o in outs]
+
+    def scan(self, text: str) -> set:
+        goto, fail, out = self._goto, self._fail, self._out
+        hits: set = set()
+        s = 0
+        for ch in text:
+            while s and ch not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(ch, 0)
+            if out[s]:
+                hits.update(out[s])
+        return hits
+
+
+class BetMatcher:
+    """
+    bets.direct 的编译匹配器（Q2 与实体推断共用，保证两处语义一致）：
+    - id / name：子串命中 title+body（Aho-Corasick 一次扫描）
+    - id / tags：与事件 tag 精确相等（hash 索引）
+    - 返回结果按 bets.yaml 顺序（优先级）排列
+    """
+
+    def __init__(self, direct: Sequence[Dict]):
+        bets: List[Bet] = []
+        for i, b in enumerate(direct or []):
+            b = b or {}
+            name = str(b.get("name") or "").strip()
+            bets.append(
+                Bet(
+                    index=i,
+                    bid=str(b.get("id") or "").lower(),
+                    name=name,
+                    name_l=name.lower(),
+                    tags=tuple(str(x).lower() for x in (b.get("tags") or [])),
+                )
+            )
+        self.bets: Tuple[Bet, ...] = tuple(bets)
+
+        patterns: List[Tuple[str, int]] = []
+        tag_index: Dict[str, set] = {}
+        for b in self.bets:
+            patterns.append((b.bid, b.index))
+            patterns.append((b.name_l, b.index))
+            for t in ((b.bid,) if b.bid else ()) + b.tags:
+                tag_index.setdefault(t, set()).add(b.index)
+
+        self._ac = _Automaton(patterns)
+        self._tag_index = tag_index
+
+    def match(self, text: str, tags: Iterable[str]) -> List[Bet]:
+        if not self.bets:
+            return []
+        hits = self._ac.scan(text.lower())
+        for t in tags:
+            idx = self._tag_index.get(str(t).lower())
+            if idx:
+                hits |= idx
+        return [self.bets[i] for i in sorted(hits)]
+
+    def match_event(self, event) -> List[Bet]:
+        return self.match(f"{event.title}\n{event.body}", event.tags or [])
+
+
+_CACHE: Dict[int, Tuple[object, BetMatcher]] = {}
+_CACHE_SLOTS = 4  # 回放时当前配置与候选配置交替使用，单槽会反复重编译
+
+
+def compile_bets(bets_cfg: Dict) -> BetMatcher:
+    """
+    按 bets_cfg 对象身份缓存（同一份已加载配置只编译一次）。
+    """
+    hit = _CACHE.get(id(bets_cfg))
+    if hit is not None and hit[0] is bets_cfg:
+        return hit[1]
+    direct = ((bets_cfg or {}).get("bets") or {}).get("direct") or []
+    m = BetMatcher(direct)
+    if len(_CACHE) >= _CACHE_SLOTS:
+        _CACHE.clear()
+    _CACHE[id(bets_cfg)] = (bets_cfg, m)
+    return m
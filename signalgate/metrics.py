@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+ENV_METRICS = "SIGNALGATE_METRICS"
+METRICS_NAME = "metrics.jsonl"
+
+_OFF = nullcontext()
+
+
+class _Recorder:
+    """
+    一次 CLI 调用的阶段耗时与计数（线程安全：并行 fetch / ingest 写者线程共用）。
+    """
+
+    def __init__(self, cmd: str):
+        self.cmd = cmd
+        self.t0 = time.perf_counter()
+        self.stages: Dict[str, List[float]] = {}   # name -> [秒, 次数]
+        self.counters: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self.lock:
+            s = self.stages.setdefault(name, [0.0, 0])
+            s[0] += seconds
+            s[1] += 1
+
+    def count(self, name: str, n: int) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+
+_ACTIVE: Optional[_Recorder] = None
+
+
+def env_enabled() -> bool:
+    return os.environ.get(ENV_METRICS, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def start(cmd: str) -> None:
+    global _ACTIVE
+    _ACTIVE = _Recorder(cmd)
+
+
+@contextmanager
+def _timed(rec: _Recorder, name: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        rec.add(name, time.perf_counter() - t0)
+
+
+def stage(name: str):
+    """
+    with stage("decide"): ...
+    未开启时返回共享的空上下文：开销只有一次全局变量读取。
+    同名阶段多次进入时累加（秒 + 次数）；阶段之间不嵌套计时。
+    """
+    rec = _ACTIVE
+    if rec is None:
+        return _OFF
+    return _timed(rec, name)
+
+
+def count(name: str, n: int = 1) -> None:
+    rec = _ACTIVE
+    if rec is not None:
+        rec.count(name, n)
+
+
+def finish(state_dir: Path, ok: bool = True) -> Optional[Dict]:
+    """
+    结束本次记录，向 <state_dir>/metrics.jsonl 追加一行（整行一次 O_APPEND 写入）。
+    """
+    global _ACTIVE
+    rec, _ACTIVE = _ACTIVE, None
+    if rec is None:
+        return None
+    out = {
+        "ts": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "cmd": rec.cmd,
+        "ok": ok,
+        "wall_s": round(time.perf_counter() - rec.t0, 6),
+        "stages": {k: {"s": round(v[0], 6), "n": v[1]} for k, v in sorted(rec.stages.items())},
+        "counters": dict(sorted(rec.counters.items())),
+    }
+    state_dir.mkdir(parents=True, exist_ok=True)
+    line = (json.dumps(out, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+    fd = os.open(state_dir / METRICS_NAME, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+    return out
+
+
+def _pct(xs: List[float], q: float) -> float:
+    # 最近秩（nearest-rank），样本少时不插值
+    xs = sorted(xs)
+    k = max(0, min(len(xs) - 1, math.ceil(q * len(xs)) - 1))
+    return xs[k]
+
+
+def summarize_metrics(state_dir: Path, cmd: Optional[str] = None, last: int = 0) -> str:
+    """
+    用户显式调用 metrics 时才输出：按阶段汇总每次调用的耗时 p50 / p95（毫秒），以及计数均值。
+    - cmd：只看某个子命令
+    - last：只看最近 N 条记录（0 = 全部）
+    """
+    p = state_dir / METRICS_NAME
+    if not p.exists():
+        return "No metrics."
+
+    recs: List[Dict] = []
+    with p.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                r = json.loads(line)
+            except Exception:
+                continue
+            if cmd and r.get("cmd") != cmd:
+                continue
+            recs.append(r)
+    if last > 0:
+        recs = recs[-last:]
+    if not recs:
+        return "No metrics."
+
+    stages: Dict[str, List[float]] = {"(wall)": [float(r.get("wall_s") or 0) for r in recs]}
+    counters: Dict[str, List[int]] = {}
+    for r in recs:
+        for k, v in (r.get("stages") or {}).items():
+            stages.setdefault(k, []).append(float(v.get("s") or 0))
+        for k, v in (r.get("counters") or {}).items():
+            counters.setdefault(k, []).append(int(v))
+
+    scope = f" ({cmd})" if cmd else ""
+    lines = [f"Runs{scope}: {len(recs)}", "stage\truns\tp50_ms\tp95_ms"]
+    for k, xs in stages.items():
+        lines.append(f"  {k}\t{len(xs)}\t{_pct(xs, 0.5) * 1000:.2f}\t{_pct(xs, 0.95) * 1000:.2f}")
+    if counters:
+        lines.append("counter\truns\tmean")
+        for k, xs in sorted(counters.items()):
+            lines.append(f"  {k}\t{len(xs)}\t{sum(xs) / len(xs):.1f}")
+    return "\n".join(lines)
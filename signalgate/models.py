@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, asdict
+import sys
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 
 def utc_now_iso() -> str:
@@ -22,9 +23,91 @@ class Event:
     tags: List[str] = None
 
     def to_dict(self) -> Dict[str, Any]:
-        d = asdict(self)
-        d["tags"] = self.tags or []
-        return d
+        # 手写（asdict 会逐字段递归深拷贝，冷存写入的热路径上不划算）
+        return {
+            "event_id": self.event_id,
+            "ts": self.ts,
+            "title": self.title,
+            "body": self.body,
+            "url": self.url,
+            "source": self.source,
+            "source_tier": self.source_tier,
+            "tags": list(self.tags or []),
+        }
+
+    @classmethod
+    def from_dict(cls, obj: Dict[str, Any], fallback_id: str = "") -> "Event":
+        return cls(
+            event_id=str(obj.get("event_id") or obj.get("id") or fallback_id),
+            ts=str(obj.get("ts") or utc_now_iso()),
+            title=str(obj.get("title") or ""),
+            body=str(obj.get("body") or ""),
+            url=str(obj.get("url") or ""),
+            source=str(obj.get("source") or ""),
+            source_tier=str(obj.get("source_tier") or "C"),
+            tags=list(obj.get("tags") or []),
+        )
+
+
+def _intern(x):
+    return sys.intern(x) if type(x) is str else x
+
+
+@dataclass(frozen=True, slots=True)
+class CompactEvent:
+    """
+    大批量（回放 / 批量判定）用的紧凑事件：字段与 Event 相同，可直接传给 decide / write_cold_event。
+    - __slots__：无实例 __dict__
+    - source / source_tier / tags 驻留（大量事件共享同一份字符串）
+    - tags 为 tuple（保留原始顺序与大小写，to_dict 与 Event 输出一致）
+    """
+    event_id: str
+    ts: str
+    title: str
+    body: str = ""
+    url: str = ""
+    source: str = ""
+    source_tier: str = "C"
+    tags: Tuple[str, ...] = ()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "event_id": self.event_id,
+            "ts": self.ts,
+            "title": self.title,
+            "body": self.body,
+            "url": self.url,
+            "source": self.source,
+            "source_tier": self.source_tier,
+            "tags": list(self.tags),
+        }
+
+    @classmethod
+    def from_dict(cls, obj: Dict[str, Any], fallback_id: str = "") -> "CompactEvent":
+        # 规范化规则与 Event.from_dict 相同
+        return cls(
+            event_id=str(obj.get("event_id") or obj.get("id") or fallback_id),
+            ts=str(obj.get("ts") or utc_now_iso()),
+            title=str(obj.get("title") or ""),
+            body=str(obj.get("body") or ""),
+            url=str(obj.get("url") or ""),
+            source=sys.intern(str(obj.get("source") or "")),
+            source_tier=sys.intern(str(obj.get("source_tier") or "C")),
+            tags=tuple(_intern(t) for t in (obj.get("tags") or ())),
+        )
+
+    @classmethod
+    def from_event(cls, ev: Event) -> "CompactEvent":
+        return cls(
+            event_id=ev.event_id,
+            ts=ev.ts,
+            title=ev.title,
+            body=ev.body,
+            url=ev.url,
+            source=_intern(ev.source),
+            source_tier=_intern(ev.source_tier),
+            tags=tuple(_intern(t) for t in (ev.tags or ())),
+        )
 
 
 @dataclass(frozen=True)
@@ -1,40 +1,148 @@
 from __future__ import annotations
 
+import http.client
+import json
 import os
+import random
+import time
 import urllib.parse
 import urllib.request
+from typing import Callable, Optional, Tuple
+
+from . import metrics
 
 
 DEFAULT_URL = "https://api2.pushdeer.com/message/push"
 
+RETRIES = 4          # 失败后最多再试几次（可重试的错误：连接 / 超时 / 5xx / 429）
+BACKOFF_S = 0.5      # 第 i 次重试前等待 uniform(0, min(BACKOFF_CAP_S, BACKOFF_S * 2**i))（全抖动）
+BACKOFF_CAP_S = 8.0
+TIMEOUT_S = 15
+
+
+class PushError(RuntimeError):
+    def __init__(self, msg: str, retryable: bool = False):
+        super().__init__(msg)
+        self.retryable = retryable
+
+
+class Pusher:
+    """
+    PushDeer 推送（POST /message/push {pushkey,text,desp,type}）：
+    - keep-alive：同一 endpoint 复用一条 HTTP/1.1 连接；复用的连接已被对端关闭 => 立即重连一次（不计重试）
+    - 失败重试：指数退避 + 全抖动；4xx / 业务错误码（JSON code != 0）不重试
+    """
+
+    def __init__(
+        self,
+        pushkey: Optional[str] = None,
+        url: Optional[str] = None,
+        retries: int = RETRIES,
+        timeout: float = TIMEOUT_S,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        pk = (pushkey or os.getenv("PUSHDEER_KEY") or "").strip()
+        if not pk:
+            raise RuntimeError("Missing PUSHDEER_KEY (set env or pass --pushkey).")
+        self.pushkey = pk
+        self.endpoint = (url or os.getenv("PUSHDEER_URL") or DEFAULT_URL).strip()
+        u = urllib.parse.urlsplit(self.endpoint)
+        if u.scheme not in ("http", "https"):
+            raise RuntimeError(f"unsupported PushDeer URL: {self.endpoint}")
+        self._cls = http.client.HTTPSConnection if u.scheme == "https" else http.client.HTTPConnection
+        self._netloc = u.netloc
+        self._target = (u.path or "/") + (f"?{u.query}" if u.query else "")
+        self.retries = retries
+        self.timeout = timeout
+        self.sleep = sleep
+        self.retried = 0  # 累计重试次数（统计用）
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def _post(self, body: bytes) -> Tuple[int, bytes]:
+        hdrs = {"Content-Type": "application/x-www-form-urlencoded"}
+        reused = self._conn is not None
+        if self._conn is None:
+            self._conn = self._cls(self._netloc, timeout=self.timeout)
+        try:
+            self._conn.request("POST", self._target, body=body, headers=hdrs)
+            resp = self._conn.getresponse()
+        except (http.client.HTTPException, ConnectionError):
+            self.close()
+            if not reused:
+                raise
+            self._conn = self._cls(self._netloc, timeout=self.timeout)
+            self._conn.request("POST", self._target, body=body, headers=hdrs)
+            resp = self._conn.getresponse()
+        data = resp.read()
+        if resp.will_close:
+            self.close()
+        return resp.status, data
+
+    def _once(self, body: bytes) -> None:
+        try:
+            status, data = self._post(body)
+        except (OSError, http.client.HTTPException) as e:  # 连接 / 超时 / 协议错误
+            self.close()
+            raise PushError(f"{type(e).__name__}: {e}", retryable=True)
+        if not 200 <= status < 300:
+            raise PushError(f"HTTP {status}", retryable=status >= 500 or status == 429)
+        # PushDeer 出错时也可能返回 200 + {"code": 非 0, "error": ...}；不是 JSON 则只看 HTTP 状态
+        try:
+            obj = json.loads(data)
+        except ValueError:
+            return
+        if isinstance(obj, dict) and obj.get("code", 0) != 0:
+            raise PushError(f"PushDeer code {obj.get('code')}: {obj.get('error') or ''}".rstrip())
+
+    def push(self, text: str, desp: str = "") -> None:
+        """
+        发送一条；重试用尽或不可重试 => PushError。
+        """
+        body = urllib.parse.urlencode({"pushkey": self.pushkey, "text": text, "desp": desp, "type": "text"}).encode("utf-8")
+        metrics.count("bytes_sent", len(body))
+        for attempt in range(self.retries + 1):
+            try:
+                with metrics.stage("http"):
+                    self._once(body)
+                return
+            except PushError as e:
+                if not e.retryable or attempt >= self.retries:
+                    raise
+            self.retried += 1
+            metrics.count("push_retries")
+            self.sleep(random.uniform(0, min(BACKOFF_CAP_S, BACKOFF_S * 2 ** attempt)))
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self) -> "Pusher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
 
 def send_push(text: str, desp: str = "", pushkey: str | None = None, url: str | None = None) -> bool:
     """
     PushDeer v0.1
-    - 仅负责发送推送
-    - 参数遵循官方：POST /message/push {pushkey,text,desp,type}  :contentReference[oaicite:2]{index=2}
+    - 仅负责发送推送（单次请求，不重试；重试 / 连接复用见 Pusher）
+    - 参数遵循官方：POST /message/push {pushkey,text,desp,type}
+    - 失败抛异常（urllib.error.HTTPError / URLError）；返回值：HTTP 状态是否 2xx
     """
     pk = (pushkey or os.getenv("PUSHDEER_KEY") or "").strip()
     if not pk:
         raise RuntimeError("Missing PUSHDEER_KEY (set env or pass --pushkey).")
 
     endpoint = (url or os.getenv("PUSHDEER_URL") or DEFAULT_URL).strip()
-
-    data = {
-        "pushkey": pk,
-        "text": text,
-        "desp": desp,
-        "type": "text",
-    }
-    body = urllib.parse.urlencode(data).encode("utf-8")
-
+    body = urllib.parse.urlencode({"pushkey": pk, "text": text, "desp": desp, "type": "text"}).encode("utf-8")
     req = urllib.request.Request(
         endpoint,
         data=body,
         headers={"Content-Type": "application/x-www-form-urlencoded"},
         method="POST",
     )
-
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        # PushDeer 在线版通常返回 JSON，但 v0.1 不依赖返回结构（只要 HTTP 200）
+    with urllib.request.urlopen(req, timeout=TIMEOUT_S) as resp:
+        # 不依赖返回结构（只要 HTTP 2xx）
         return 200 <= int(resp.status) < 300
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from .locks import tmp_path
+
+INDEX_NAME = "_observation.idx"   # 非 .json 后缀：不会被 *.json glob 当成事件
+INDEX_VERSION = 1
+BUCKET_SECONDS = 3600             # 时间桶：1 小时
+RETAIN_HOURS = 24 * 7             # 索引至少保留最近 N 小时；观察窗口更长时按窗口保留（目录本身不动）
+
+
+@dataclass(frozen=True)
+class Observation:
+    ts: float       # epoch seconds (UTC)
+    source: str     # 小写 host
+    event_id: str
+
+
+def parse_ts(ts: str) -> datetime | None:
+    if not ts:
+        return None
+    s = ts.strip()
+    try:
+        # 允许: 2026-02-07T00:00:00Z
+        if s.endswith("Z"):
+            s = s[:-1] + "+00:00"
+        dt = datetime.fromisoformat(s)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.astimezone(timezone.utc)
+    except Exception:
+        return None
+
+
+class ObservationIndex:
+    """
+    tentative 观察区索引（持久化，append-only JSONL）：
+    - 键：entity -> 时间桶 -> [Observation]
+    - 查询：只扫描窗口覆盖的时间桶（有界），与目录大小无关
+    - 索引丢失/版本不符 => 从 tentative 目录重建
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._buckets: Dict[str, Dict[int, List[Observation]]] = {}
+        self._ids: set = set()
+        self._offset = 0
+        self._newest = 0.0
+        self._n = 0
+        self._prune_at = 0  # 条目数达到该值才重新检查是否需要裁剪（摊还 O(1)）
+
+    # ---- 内存结构
+    def _put(self, entity: str, ob: Observation) -> None:
+        if ob.event_id in self._ids:
+            return
+        self._ids.add(ob.event_id)
+        b = int(ob.ts // BUCKET_SECONDS)
+        self._buckets.setdefault(entity, {}).setdefault(b, []).append(ob)
+        self._newest = max(self._newest, ob.ts)
+        self._n += 1
+
+    def _reset(self) -> None:
+        self._buckets, self._ids = {}, set()
+        self._offset, self._newest, self._n = 0, 0.0, 0
+        self._prune_at = 0
+
+    # ---- 持久化
+    def refresh(self) -> bool:
+        """
+        增量读取文件尾部（其他进程追加的行）；文件被截断/重写则整体重读。
+        返回 False 表示索引不可用（缺失或版本不符），需要 rebuild。
+        """
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return False
+        if size < self._offset:
+            self._reset()
+        if size == self._offset:
+            return True
+
+        with self.path.open("rb") as f:
+            f.seek(self._offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # 半行：等写完再读
+                self._offset += len(raw)
+                try:
+                    obj = json.loads(raw)
+                except Exception:
+                    continue
+                if "v" in obj:
+                    if int(obj["v"]) != INDEX_VERSION:
+                        return False
+                    continue
+                self._put(str(obj["e"]), Observation(float(obj["t"]), str(obj["s"]), str(obj["id"])))
+        return True
+
+    def _line(self, entity: str, ob: Observation) -> str:
+        return json.dumps({"e": entity, "t": ob.ts, "s": ob.source, "id": ob.event_id}, ensure_ascii=False) + "\n"
+
+    def add(self, entity: str, ts: str, source: str, event_id: str) -> None:
+        dt = parse_ts(ts)
+        if dt is None or not entity or entity == "UNKNOWN":
+            return
+        if event_id in self._ids:
+            return
+        ob = Observation(dt.timestamp(), str(source or "").strip().lower(), event_id)
+        self.refresh()
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(self._line(entity, ob))
+        self._put(entity, ob)
+        self._offset = self.path.stat().st_size
+
+    def rewrite(self, entries: List[tuple[str, Observation]]) -> None:
+        """
+        原子重写（rebuild / 裁剪过期条目时使用）。
+        """
+        tmp = tmp_path(self.path)
+        with tmp.open("w", encoding="utf-8") as f:
+            f.write(json.dumps({"v": INDEX_VERSION}) + "\n")
+            for entity, ob in entries:
+                f.write(self._line(entity, ob))
+        os.replace(tmp, self.path)
+        self._reset()
+        self.refresh()
+
+    def prune(self, retain_hours: int = RETAIN_HOURS) -> None:
+        """
+        过期条目超过一半时裁剪（相对最新事件时间，而非墙钟）。
+        每次查询都会调用：只在条目数比上次检查增长一半（且至少 1000 条）后才真正扫描。
+        """
+        if self._n < self._prune_at:
+            return
+        horizon = self._newest - retain_hours * 3600
+        live = [(e, ob) for e, bs in self._buckets.items() for obs in bs.values() for ob in obs if ob.ts >= horizon]
+        if self._n - len(live) > max(1000, len(live)):
+            self.rewrite(sorted(live, key=lambda x: x[1].ts))
+        self._prune_at = self._n + max(1000, self._n // 2)
+
+    # ---- 查询
+    def query(self, entity: str, center: datetime, window_hours: int) -> Iterator[Observation]:
+        """
+        同一 entity、|ts - center| <= window 的观测（只访问覆盖窗口的时间桶）。
+        """
+        buckets = self._buckets.get(entity)
+        if not buckets:
+            return
+        c = center.timestamp()
+        lo, hi = c - window_hours * 3600, c + window_hours * 3600
+        for b in range(int(lo // BUCKET_SECONDS), int(hi // BUCKET_SECONDS) + 1):
+            for ob in buckets.get(b, ()):
+                if lo <= ob.ts <= hi:
+                    yield ob
+
+
+_OPEN: Dict[Path, ObservationIndex] = {}
+
+
+def rebuild_index(tentative_dir: Path, entity_fn: Callable) -> ObservationIndex:
+    """
+    从 tentative 目录全量重建（仅在索引缺失/损坏时发生一次）。
+    """
+    from .coldstore import iter_events
+
+    idx = ObservationIndex(tentative_dir / INDEX_NAME)
+    entries: List[tuple[str, Observation]] = []
+    for ev in iter_events(tentative_dir):
+        dt = parse_ts(getattr(ev, "ts", "") or "")
+        entity = entity_fn(ev)
+        if dt is None or entity == "UNKNOWN":
+            continue
+        entries.append((entity, Observation(dt.timestamp(), str(ev.source or "").strip().lower(), ev.event_id)))
+    entries.sort(key=lambda x: x[1].ts)
+    idx.rewrite(entries)
+    _OPEN[idx.path] = idx
+    return idx
+
+
+def retain_hours_for(window_hours: int) -> int:
+    """
+    索引保留时长：不短于观察窗口（否则窗口内较早的观测会被裁掉）。
+    """
+    return max(int(window_hours), RETAIN_HOURS)
+
+
+def open_index(
+    tentative_dir: Path, entity_fn: Optional[Callable] = None, retain_hours: Optional[int] = None
+) -> ObservationIndex | None:
+    """
+    进程内缓存 + 增量刷新；缺失时若给出 entity_fn 则重建，否则返回 None。
+    retain_hours：按该时长裁剪过期条目（查询方按观察窗口给出）；None => 不裁剪（只追加的写入方不知道窗口）。
+    """
+    path = tentative_dir / INDEX_NAME
+    idx = _OPEN.get(path)
+    if idx is None:
+        idx = ObservationIndex(path)
+    if idx.refresh():
+        _OPEN[path] = idx
+        if retain_hours is not None:
+            idx.prune(retain_hours)
+        return idx
+    _OPEN.pop(path, None)
+    if entity_fn is None:
+        return None
+    return rebuild_index(tentative_dir, entity_fn)
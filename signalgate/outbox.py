@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .locks import atomic_write_text, file_lock, lock_fd
+
+OUTBOX_DIR = "outbox"
+LOG_NAME = "outbox.jsonl"
+WINDOW_S = 30.0      # 入队时间相差不超过 N 秒的打断合并成一条推送
+SENT_KEEP = 10_000   # 压实后保留的已发送 event_id 数（去重用）
+COMPACT_SENT = 256   # 已发送的 add 行超过这么多 => drain 结束时压实
+HELD_KEEP_S = 86400  # 一直没有放行 / 丢弃结论的 held 条目（进程在 gate 之前崩溃）压实时保留这么久
+
+# outbox.jsonl 每行一个操作（追加写，同一把锁内整行 O_APPEND）：
+#   {"op": "add", "event_id", "ts", "text", "desp"}   入队（旧格式 / 不经 gate：直接可推送）
+#   {"op": "add", ..., "held": true}                  gate 之前先入队：等放行才推送
+#   {"op": "release", "event_id"}                     gate 放行（在 gate 计数落盘之前写入）
+#   {"op": "drop", "event_id"}                        gate 拒绝：移出 outbox
+#   {"op": "sent", "ids": [...], "ts"}                 已推送（压实后保留一行最近 SENT_KEEP 个 id）
+
+
+@dataclass
+class Pending:
+    event_id: str
+    ts: float      # 入队时间（epoch 秒）
+    text: str      # 标题（打断消息首行）
+    desp: str      # 正文（完整打断消息）
+    held: bool = False  # 等待 gate 结论（drain 跳过）
+
+
+def _dir(state_dir: Path) -> Path:
+    return state_dir / OUTBOX_DIR
+
+
+def _lock(state_dir: Path):
+    return file_lock(_dir(state_dir) / "outbox.lock")
+
+
+# 进程内缓存：outbox.jsonl -> (inode, 已读字节偏移, adds, sent)；文件只追加，压实是整文件替换（inode 变化）
+_CACHE: Dict[Path, Tuple[int, int, Dict[str, Pending], Dict[str, None]]] = {}
+
+
+def _load(state_dir: Path) -> Tuple[Dict[str, Pending], Dict[str, None]]:
+    """
+    (入队的全部事件, 已发送 id)，两者都按写入顺序；调用方须持有 outbox 锁，且不得修改返回值。
+    同一进程内再次调用只解析新追加的完整行。
+    """
+    p = _dir(state_dir) / LOG_NAME
+    try:
+        st = p.stat()
+    except FileNotFoundError:
+        _CACHE.pop(p, None)
+        return {}, {}
+    hit = _CACHE.get(p)
+    if hit is None or hit[0] != st.st_ino or hit[1] > st.st_size:
+        hit = (st.st_ino, 0, {}, {})
+    ino, off, adds, sent = hit
+    if off < st.st_size:
+        with p.open("rb") as f:
+            f.seek(off)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                r = json.loads(line)
+            except ValueError:
+                continue  # 崩溃留下的半行
+            op = r.get("op")
+            if op == "add":
+                eid = str(r.get("event_id") or "")
+                if eid and eid not in adds:
+                    adds[eid] = Pending(eid, float(r.get("ts") or 0), str(r.get("text") or ""), str(r.get("desp") or ""), bool(r.get("held")))
+            elif op == "release":
+                x = adds.get(str(r.get("event_id") or ""))
+                if x is not None:
+                    x.held = False
+            elif op == "drop":
+                x = adds.get(str(r.get("event_id") or ""))
+                if x is not None and x.held:
+                    del adds[x.event_id]
+            elif op == "sent":
+                sent.update(dict.fromkeys(str(x) for x in r.get("ids") or ()))
+        off += end
+    _CACHE[p] = (ino, off, adds, sent)
+    return adds, sent
+
+
+def _append(state_dir: Path, rec: Dict) -> None:
+    line = (json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8")
+    fd = os.open(_dir(state_dir) / LOG_NAME, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def enqueue(state_dir: Path, event_id: str, text: str, desp: str, now: Optional[float] = None, held: bool = False) -> bool:
+    """
+    打断消息入队（只落盘，不推送）；同一 event_id 已入队或已发送 => 跳过，返回 False。
+    - held=True：在 gate 之前入队，等 settle 给出结论；已有同一 event_id 的未决条目 => 沿用它，返回 True
+    """
+    _dir(state_dir).mkdir(parents=True, exist_ok=True)
+    with _lock(state_dir):
+        adds, sent = _load(state_dir)
+        x = adds.get(event_id)
+        if x is not None and x.held and held and event_id not in sent:
+            return True
+        if x is not None or event_id in sent:
+            return False
+        rec = {"op": "add", "event_id": event_id, "ts": time.time() if now is None else now, "text": text, "desp": desp}
+        if held:
+            rec["held"] = True
+        _append(state_dir, rec)
+    return True
+
+
+def settle(state_dir: Path, event_id: str, allowed: bool) -> None:
+    """
+    held 条目的 gate 结论：放行 => 可推送；拒绝 => 移出 outbox。
+    """
+    with _lock(state_dir):
+        _append(state_dir, {"op": "release" if allowed else "drop", "event_id": event_id})
+
+
+def pending(state_dir: Path) -> List[Pending]:
+    with _lock(state_dir):
+        adds, sent = _load(state_dir)
+    return [x for eid, x in adds.items() if eid not in sent and not x.held]
+
+
+def coalesce(items: List[Pending], window_s: float = WINDOW_S, max_chars: int = 0) -> List[List[Pending]]:
+    """
+    按入队顺序分组：与组内第一条相差不超过 window_s 秒、合并后正文不超过 max_chars（<=0 不限）。
+    单条本身超过 max_chars 时单独成组，不截断（消息模板冻结）。
+    """
+    groups: List[List[Pending]] = []
+    size = 0
+    for x in items:
+        g = groups[-1] if groups else None
+        if g and x.ts - g[0].ts <= window_s and (max_chars <= 0 or size + 1 + len(x.desp) <= max_chars):
+            g.append(x)
+            size += 1 + len(x.desp)
+        else:
+            groups.append([x])
+            size = len(x.desp)
+    return groups
+
+
+def _message(group: List[Pending]) -> Tuple[str, str]:
+    if len(group) == 1:
+        return group[0].text, group[0].desp
+    return f"{group[0].text} (+{len(group) - 1})", "\n".join(x.desp.rstrip("\n") + "\n" for x in group)
+
+
+@dataclass
+class DrainResult:
+    sent: int = 0          # 已推送的打断条数
+    messages: int = 0      # 实际推送次数（合并后）
+    retries: int = 0
+    pending: int = 0       # 本次结束后仍未发送的条数
+    error: str = ""        # 推送失败（重试用尽 / 不可重试）的原因；非空时剩余条目留待下次
+    elapsed_s: float = 0.0
+    latencies: List[float] = field(default_factory=list)  # 每条：入队 -> 推送成功（秒）
+
+
+def drain(state_dir: Path, pusher, window_s: float = WINDOW_S, max_chars: int = 0) -> DrainResult:
+    """
+    把 outbox 中未发送的打断推送出去（pusher：notify.Pusher 或同接口对象）：
+    - 同一时间只允许一个 drain（拿不到锁 => RuntimeError）；enqueue 不受影响
+    - 合并见 coalesce；每条推送成功后立即记 sent（崩溃后至多重发正在发送的那一条）
+    - 一条推送失败（重试用尽 / 不可重试）=> 停止，剩余条目留在 outbox
+    """
+    t0 = time.perf_counter()
+    d = _dir(state_dir)
+    d.mkdir(parents=True, exist_ok=True)
+    fd = os.open(d / "drain.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if not lock_fd(fd, blocking=False):
+            raise RuntimeError(f"another notify drain is running (lock {d / 'drain.lock'})")
+        items = pending(state_dir)
+        res = DrainResult(pending=len(items))
+        retried0 = pusher.retried
+        for group in coalesce(items, window_s, max_chars):
+            text, desp = _message(group)
+            try:
+                pusher.push(text, desp)
+            except Exception as e:  # PushError / 缺 key 等：留在 outbox
+                res.error = str(e)
+                break
+            now = time.time()
+            with _lock(state_dir):
+                _append(state_dir, {"op": "sent", "ids": [x.event_id for x in group], "ts": now})
+            res.sent += len(group)
+            res.messages += 1
+            res.pending -= len(group)
+            res.latencies += [now - x.ts for x in group]
+        res.retries = pusher.retried - retried0
+        _compact(state_dir)
+    finally:
+        os.close(fd)
+    res.elapsed_s = time.perf_counter() - t0
+    return res
+
+
+def _compact(state_dir: Path) -> None:
+    # 已发送的 add 行攒多了就重写：保留未发送的 add + 最近 SENT_KEEP 个已发送 id；
+    # 超过 HELD_KEEP_S 仍未决的 held 条目（gate 之前崩溃，从未占用名额）一并清掉
+    with _lock(state_dir):
+        adds, sent = _load(state_dir)
+        done = [eid for eid in adds if eid in sent]
+        if len(done) <= COMPACT_SENT:
+            return
+        keep = [eid for eid in sent if eid not in adds] + done  # 压实过的旧 id 在前，本轮按入队顺序在后
+        now = time.time()
+        lines = [json.dumps({"op": "sent", "ids": keep[-SENT_KEEP:], "ts": now}, ensure_ascii=False)]
+        for eid, x in adds.items():
+            if eid in sent or (x.held and now - x.ts > HELD_KEEP_S):
+                continue
+            rec = {"op": "add", "event_id": eid, "ts": x.ts, "text": x.text, "desp": x.desp}
+            if x.held:
+                rec["held"] = True
+            lines.append(json.dumps(rec, ensure_ascii=False))
+        atomic_write_text(_dir(state_dir) / LOG_NAME, "\n".join(lines) + "\n")
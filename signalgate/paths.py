@@ -35,6 +35,10 @@ def resolve_root(cli_root: Optional[str]) -> Path:
 
 
 def get_paths(cli_root: Optional[str]) -> Paths:
+    """
+    只解析路径，不触碰文件系统：目录由真正写入的模块按需创建
+    （冷存 / seen、审计追加、gate 锁、配置快照等）。
+    """
     root = resolve_root(cli_root)
     config_dir = root / "config"
     data_dir = root / "data"
@@ -42,9 +46,6 @@ def get_paths(cli_root: Optional[str]) -> Paths:
     audit_dir = data_dir / "audit"
     state_dir = data_dir / "state"
 
-    for d in (config_dir, cold_dir, audit_dir, state_dir):
-        d.mkdir(parents=True, exist_ok=True)
-
     return Paths(
         root=root,
         config_dir=config_dir,
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+from . import metrics
+from .coldstore import bulk_writes
+from .core import _process_event, iter_batch_inputs
+from .decision import load_bets, load_rules
+from .fetch import FeedResult, FeedSpec, fetch_feeds
+from .ingress import load_event_from_json, write_cold_event
+from .models import Event
+from .seen import SeenIndex, open_seen
+
+ARCHIVE_DIR = "archived_inbox"
+QUEUE_SIZE = 1024  # 抓取线程 -> 主线程的队列容量（也是一批的上限）
+
+
+@dataclass
+class PipelineResult:
+    fetched: int = 0        # feed 新条目（已在冷存的在抓取时就跳过）
+    inbox: int = 0          # data/inbox 中读到的文件
+    failed: int = 0         # 读不出事件的 inbox 文件（留在原地）
+    new: int = 0            # 首次写入冷存
+    decided: int = 0        # 去重后判定的事件
+    outputs: List[str] = field(default_factory=list)  # 非空输出（interrupt / DRYRUN），按判定顺序；给了 on_output 时不收集
+    emitted: int = 0                                  # 非空输出条数
+    archived: int = 0
+    feeds: List[FeedResult] = field(default_factory=list)
+    drain: Optional[object] = None                     # outbox.DrainResult（--notify 时）
+    stages: Dict[str, float] = field(default_factory=dict)  # 阶段 -> 秒；fetch+ingest 是抓取期间的墙钟，含 inbox_read / cold_write / decide
+    elapsed_s: float = 0.0
+
+
+def run_pipeline(
+    config_dir: Path,
+    cold_dir: Path,
+    audit_dir: Path,
+    state_dir: Path,
+    inbox_dir: Path,
+    feeds: List[FeedSpec],
+    workers: int = 8,
+    per_host: int = 2,
+    full: bool = False,
+    dry_run: bool = False,
+    pusher=None,
+    window_s: float = 30.0,
+    on_output: Optional[Callable[[str], None]] = None,
+) -> PipelineResult:
+    """
+    单进程：fetch -> 去重 + 冷存 -> decide + gate -> notify，等价于 fetch / ingest / run / notify 依次执行，
+    但条目不经 inbox 文件周转：
+    - 抓取线程把事件 dict 放进有界队列，主线程（唯一写者）逐批取出：写冷存后立即判定，内存只有队列里的条目
+    - 先处理 data/inbox 里已有的文件（按文件名顺序，与 `run --input data/inbox` 相同）；
+      feed 条目按到达分批（每批 = 当时队列里已有的条目），批内按文件名（<event_id>.json）排序
+    - 同一文件名只判定一次，冷存按 event_id 去重；gate 顺序即上述判定顺序
+    - on_output 给出：每条非空输出在判定完成时立即回调；否则收集到 outputs
+    - dry_run：不写 cold / audit / state（feed 游标只读），不推送，不归档
+    - pusher 给出（--notify）：放行的打断入 outbox 后立即 drain
+    - 最后把处理过的 inbox 文件移到 data/state/archived_inbox/<UTC 时间>/
+    """
+    t_all = time.perf_counter()
+    res = PipelineResult()
+    st = res.stages
+    st.update(dict.fromkeys(("config", "inbox_read", "cold_write", "fetch+ingest", "decide", "notify", "archive"), 0.0))
+
+    def timed(name: str, t0: float) -> None:
+        st[name] = st.get(name, 0.0) + time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with metrics.stage("config"):
+        cache_dir = None if dry_run else state_dir  # dry_run 不回写 config.cache.json
+        bets_cfg = load_bets(config_dir, cache_dir)
+        rules_cfg = load_rules(config_dir, cache_dir)
+    # dry_run：只读探测（索引缺失时在内存里构建，不写 _seen）；冷存还不存在 => 没有可跳过的条目
+    if not dry_run:
+        seen = open_seen(cold_dir)
+    else:
+        seen = SeenIndex(cold_dir, read_only=True) if cold_dir.exists() else None
+    timed("config", t0)
+
+    q: "queue.Queue" = queue.Queue(maxsize=QUEUE_SIZE)
+    err: List[BaseException] = []
+
+    def producer() -> None:
+        try:
+            res.feeds = fetch_feeds(
+                feeds, q.put, workers=workers, per_host=per_host,
+                state_dir=None if full else state_dir, seen=seen, save_state=not dry_run,
+            )
+        except BaseException as e:  # 交给主线程抛出
+            err.append(e)
+        finally:
+            q.put(None)
+
+    names: Set[str] = set()  # 已处理的文件名（先到先得）
+    inbox_files: List[Path] = []
+
+    def process(name: str, ev: Event) -> None:
+        if name in names:
+            return
+        names.add(name)
+        if not dry_run:
+            t1 = time.perf_counter()
+            with metrics.stage("cold_write"):
+                if write_cold_event(cold_dir, ev) is not None:
+                    res.new += 1
+            timed("cold_write", t1)
+        t1 = time.perf_counter()
+        msg = _process_event(
+            ev, bets_cfg, rules_cfg, config_dir, cold_dir, audit_dir, state_dir,
+            dry_run=dry_run, outbox=pusher is not None,
+        )
+        timed("decide", t1)
+        res.decided += 1
+        if msg:
+            res.emitted += 1
+            if on_output is not None:
+                on_output(msg)
+            else:
+                res.outputs.append(msg)
+
+    with bulk_writes():
+        t0 = time.perf_counter()
+        th = threading.Thread(target=producer, name="pipeline-fetch", daemon=True)
+        if feeds:
+            th.start()
+
+        # 抓取进行中先处理 inbox 里已有的文件
+        for p in iter_batch_inputs(str(inbox_dir)) if inbox_dir.is_dir() else []:
+            res.inbox += 1
+            t1 = time.perf_counter()
+            try:
+                with metrics.stage("read"):
+                    ev = load_event_from_json(p)
+            except Exception:
+                res.failed += 1
+                continue
+            finally:
+                timed("inbox_read", t1)
+            inbox_files.append(p)
+            process(p.name, ev)
+
+        done = not feeds
+        while not done:
+            batch = [q.get()]
+            while len(batch) < QUEUE_SIZE:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is None:  # 结束标记只会是最后一个
+                batch.pop()
+                done = True
+            res.fetched += len(batch)
+            evs = [Event.from_dict(obj) for obj in batch]
+            for ev in sorted(evs, key=lambda e: f"{e.event_id}.json"):
+                process(f"{ev.event_id}.json", ev)
+        if feeds:
+            th.join()
+            if err:
+                raise err[0]
+        st["fetch+ingest"] = time.perf_counter() - t0
+
+    if pusher is not None and not dry_run:
+        from .config import compile_rules
+        from .outbox import drain
+
+        t0 = time.perf_counter()
+        with metrics.stage("notify"):
+            res.drain = drain(state_dir, pusher, window_s=window_s, max_chars=compile_rules(rules_cfg).coalesce_max_chars)
+        timed("notify", t0)
+
+    if inbox_files and not dry_run:
+        t0 = time.perf_counter()
+        dest = state_dir / ARCHIVE_DIR / datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        dest.mkdir(parents=True, exist_ok=True)
+        for p in inbox_files:
+            try:
+                os.replace(p, dest / p.name)
+                res.archived += 1
+            except FileNotFoundError:
+                pass
+        timed("archive", t0)
+
+    res.elapsed_s = time.perf_counter() - t_all
+    return res
@@ -0,0 +1,382 @@
+from __future__ import annotations
+
+import heapq
+import json
+import os
+import shutil
+import tempfile
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+from .coldstore import SEGMENTS_DIR, archive_paths, is_segmented, open_archive
+from .config import compile_rules
+from .decision import decide_batch
+from .gate import GateState, _blocked_reason, _record
+from .models import CompactEvent
+from .observation import parse_ts
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+UNIT_FILES = 2000     # 逐文件冷存：每个分片的文件数
+RUN_EVENTS = 20_000   # 每个有序 run 的事件数上限（工作进程的内存上界）
+MAX_OPEN_RUNS = 256   # 归并时同时打开的 run 文件数上限；超出则分轮归并
+_NO_TS = float("-inf")
+
+# run 文件一行一条记录（JSON 数组）：
+# [ts, event_id, source, cur_entity, cur_state, cur_action, alt_entity, alt_state, alt_action]
+_TS, _ID, _SRC = 0, 1, 2
+
+
+@dataclass(frozen=True)
+class _Unit:
+    """
+    分片单元：一批逐文件事件 / 一个分段文件 / 一个归档文件。
+    """
+    kind: str                   # files / segment / archive
+    path: str
+    names: Tuple[str, ...] = ()
+
+
+def _units(root: Path) -> Iterator[_Unit]:
+    """
+    只读枚举：不打开 SegmentStore（它会加锁并修补索引尾部），直接顺序读段文件。
+    """
+    if not root.exists():
+        return
+    if is_segmented(root):
+        for p in sorted((root / SEGMENTS_DIR).glob("seg-*.ndjson")):
+            yield _Unit("segment", str(p))
+    else:
+        buf: List[str] = []
+        with os.scandir(root) as it:
+            for e in it:
+                if e.name.endswith(".json") and e.is_file():
+                    buf.append(e.name)
+                    if len(buf) >= UNIT_FILES:
+                        yield _Unit("files", str(root), tuple(buf))
+                        buf = []
+        if buf:
+            yield _Unit("files", str(root), tuple(buf))
+    for p in archive_paths(root):
+        yield _Unit("archive", str(p))
+
+
+def _iter_unit(unit: _Unit) -> Iterator[CompactEvent]:
+    if unit.kind == "files":
+        root = Path(unit.path)
+        for n in unit.names:
+            try:
+                obj = json.loads((root / n).read_bytes())
+                yield CompactEvent.from_dict(obj, fallback_id=n[: -len(".json")])
+            except Exception:
+                continue
+        return
+    opener = open_archive(Path(unit.path)) if unit.kind == "archive" else open(unit.path, "rb")
+    with opener as f:
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break  # 写者尚未写完的段尾
+            try:
+                yield CompactEvent.from_dict(json.loads(raw))
+            except Exception:
+                continue
+
+
+# ---- 判定（可在工作进程中执行）
+
+_CFGS: Tuple[Dict, Dict, Dict, Dict] = ({}, {}, {}, {})  # cur_bets, cur_rules, alt_bets, alt_rules
+
+
+def _init_worker(cfgs: Tuple[Dict, Dict, Dict, Dict]) -> None:
+    global _CFGS
+    _CFGS = cfgs
+
+
+def _sort_key(rec: list) -> tuple:
+    return (_NO_TS if rec[_TS] is None else rec[_TS], rec[_ID])
+
+
+def _write_run(tmp_dir: str, unit_no: int, part: int, events: List[CompactEvent]) -> str:
+    cur_bets, cur_rules, alt_bets, alt_rules = _CFGS
+    cur = decide_batch(events, cur_bets, cur_rules)
+    alt = decide_batch(events, alt_bets, alt_rules)
+    recs = []
+    for i, ev in enumerate(events):
+        dt = parse_ts(ev.ts)
+        recs.append([
+            dt.timestamp() if dt is not None else None,
+            ev.event_id,
+            str(ev.source or "").strip().lower(),
+            cur.entities[i], cur.decisions[i].state, cur.actions[i],
+            alt.entities[i], alt.decisions[i].state, alt.actions[i],
+        ])
+    recs.sort(key=_sort_key)
+    p = Path(tmp_dir) / f"run-{unit_no:06d}-{part:04d}.jsonl"
+    with p.open("w", encoding="utf-8") as f:
+        for r in recs:
+            f.write(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n")
+    return str(p)
+
+
+def _eval_unit(unit: _Unit, unit_no: int, tmp_dir: str) -> List[str]:
+    """
+    一个分片 -> 若干个按 (ts, event_id) 排好序的 run 文件（每个最多 RUN_EVENTS 条）。
+    """
+    runs: List[str] = []
+    buf: List[CompactEvent] = []
+    for ev in _iter_unit(unit):
+        buf.append(ev)
+        if len(buf) >= RUN_EVENTS:
+            runs.append(_write_run(tmp_dir, unit_no, len(runs), buf))
+            buf = []
+    if buf:
+        runs.append(_write_run(tmp_dir, unit_no, len(runs), buf))
+    return runs
+
+
+# ---- 归并
+
+def _read_run(p: str) -> Iterator[list]:
+    with open(p, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _merge(runs: List[str], tmp_dir: str) -> Iterator[list]:
+    """
+    k 路归并；run 太多时先分轮合并成较少的 run（打开的文件数有上界）。
+    """
+    level = 0
+    while len(runs) > MAX_OPEN_RUNS:
+        merged = []
+        for i in range(0, len(runs), MAX_OPEN_RUNS):
+            out = Path(tmp_dir) / f"merge-{level:02d}-{i // MAX_OPEN_RUNS:06d}.jsonl"
+            with out.open("w", encoding="utf-8") as f:
+                for r in heapq.merge(*(_read_run(p) for p in runs[i:i + MAX_OPEN_RUNS]), key=_sort_key):
+                    f.write(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n")
+            for p in runs[i:i + MAX_OPEN_RUNS]:
+                os.unlink(p)
+            merged.append(str(out))
+        runs, level = merged, level + 1
+    return heapq.merge(*(_read_run(p) for p in runs), key=_sort_key)
+
+
+# ---- 按事件时间模拟 观察区升级 + gate
+
+@dataclass
+class ReplayStats:
+    decided: Counter = field(default_factory=Counter)   # cold / tentative / interrupt（decide 的原始结果）
+    promoted: int = 0
+    admitted: int = 0
+    blocked: Counter = field(default_factory=Counter)   # tripped / burst / budget
+    trips: int = 0
+    by_month: Counter = field(default_factory=Counter)  # 放行的打断按月（UTC）
+
+    def to_dict(self) -> Dict:
+        return {
+            "decided": dict(self.decided),
+            "promoted": self.promoted,
+            "admitted": self.admitted,
+            "blocked": dict(self.blocked),
+            "trips": self.trips,
+            "by_month": dict(sorted(self.by_month.items())),
+        }
+
+
+class _Sim:
+    """
+    单一配置的时序模拟（状态只在内存中）：
+    - tentative：同实体、窗口内、不同来源 => 升级为 interrupt（与 _maybe_promote_by_multisource 相同，
+      按时间顺序到达，因此只看得到更早的观测）
+    - interrupt：gate 检查 + 计数，now = 事件时间
+    - reset_after：熔断后 N 小时模拟一次人工 reset-gate（0 = 永不复位，与线上一致）
+    """
+
+    def __init__(self, rules_cfg: Dict, reset_after_hours: float = 0.0):
+        from .core import _observation_cfg
+
+        r = compile_rules(rules_cfg)
+        self.window_min, self.limit, self.budget = r.burst_window_minutes, r.burst_limit, r.monthly_budget
+        self.obs_hours, self.allow_promo = _observation_cfg(rules_cfg)
+        self.reset_after = timedelta(hours=reset_after_hours) if reset_after_hours > 0 else None
+        self.gate = GateState()
+        self.tripped_at: Optional[datetime] = None
+        self.obs: Dict[str, deque] = {}
+        self.stats = ReplayStats()
+
+    def _promote(self, ts: float, eid: str, source: str, entity: str) -> bool:
+        if entity == "UNKNOWN":
+            return False
+        q = self.obs.setdefault(entity, deque())
+        lo = ts - self.obs_hours * 3600
+        while q and q[0][0] < lo:
+            q.popleft()  # 按时间顺序到达：滑出窗口的观测不会再被用到
+        hit = any(s and s != source for _, s, _ in q)
+        q.append((ts, source, eid))
+        return self.allow_promo and hit
+
+    def step(self, ts: Optional[float], eid: str, source: str, entity: str, state: str) -> str:
+        """
+        返回最终结果：cold / tentative / interrupt / blocked:<原因> / untimed（无法解析时间，不参与时序模拟）
+        """
+        self.stats.decided[state] += 1
+        if ts is None:
+            return "untimed" if state != "cold" else "cold"
+        if state == "tentative":
+            if not self._promote(ts, eid, source, entity):
+                return "tentative"
+            self.stats.promoted += 1
+        elif state != "interrupt":
+            return "cold"
+
+        now = datetime.fromtimestamp(ts, timezone.utc)
+        if self.gate.tripped and self.reset_after is not None and now - self.tripped_at >= self.reset_after:
+            self.gate = GateState(month=self.gate.month, month_count=self.gate.month_count)
+        reason = _blocked_reason(self.gate, now, self.window_min, self.limit, self.budget)
+        if reason:
+            self.stats.blocked[reason] += 1
+            return f"blocked:{reason}"
+        was_tripped = self.gate.tripped
+        _record(self.gate, now, self.window_min, self.limit)
+        if self.gate.tripped and not was_tripped:
+            self.stats.trips += 1
+            self.tripped_at = now
+        self.stats.admitted += 1
+        self.stats.by_month[now.strftime("%Y-%m")] += 1
+        return "interrupt"
+
+
+@dataclass
+class ReplayReport:
+    events: int = 0
+    untimed: int = 0
+    duplicates: int = 0
+    current: ReplayStats = field(default_factory=ReplayStats)
+    candidate: ReplayStats = field(default_factory=ReplayStats)
+    changes: Counter = field(default_factory=Counter)   # (current 结果, candidate 结果) -> 条数
+    samples: List[Dict] = field(default_factory=list)   # 最早的若干条结果变化
+
+    def to_dict(self) -> Dict:
+        return {
+            "events": self.events,
+            "untimed": self.untimed,
+            "duplicates": self.duplicates,
+            "current": self.current.to_dict(),
+            "candidate": self.candidate.to_dict(),
+            "changes": [{"current": a, "candidate": b, "count": n} for (a, b), n in self.changes.most_common()],
+            "samples": self.samples,
+        }
+
+
+def replay(
+    roots: List[Path],
+    cur_bets: Dict,
+    cur_rules: Dict,
+    alt_bets: Dict,
+    alt_rules: Dict,
+    workers: int = 0,
+    samples: int = 20,
+    reset_after_hours: float = 0.0,
+    tmp_dir: Optional[Path] = None,
+) -> ReplayReport:
+    """
+    回放冷存（cold + tentative，含压缩归档）：同一批历史事件分别用当前配置与候选配置判定，
+    按事件时间顺序模拟观察区升级与 gate，给出两边结果的差异。
+    - 只读：不打开 store、不写 state / audit / cold；中间结果只写临时目录（结束后删除）
+    - 内存有界：分片判定后写成有序 run，主进程 k 路归并流式模拟
+    - workers > 1：分片在进程池中判定（每个进程只接收一次配置）
+    """
+    cfgs = (cur_bets, cur_rules, alt_bets, alt_rules)
+    for rc in (cur_rules, alt_rules):
+        compile_rules(rc)  # 配置不合法 => ConfigError（在启动工作进程之前）
+
+    tmp = tempfile.mkdtemp(prefix="signalgate-replay-", dir=str(tmp_dir) if tmp_dir else None)
+    try:
+        units = (u for root in roots for u in _units(root))
+        runs: List[str] = []
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor  # 只有并行模式才加载 multiprocessing
+
+            inflight: "deque[Future]" = deque()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cfgs,)) as ex:
+                for i, u in enumerate(units):
+                    inflight.append(ex.submit(_eval_unit, u, i, tmp))
+                    if len(inflight) >= workers * 2:
+                        runs += inflight.popleft().result()
+                while inflight:
+                    runs += inflight.popleft().result()
+        else:
+            _init_worker(cfgs)
+            for i, u in enumerate(units):
+                runs += _eval_unit(u, i, tmp)
+
+        rep = ReplayReport()
+        cur = _Sim(cur_rules, reset_after_hours)
+        alt = _Sim(alt_rules, reset_after_hours)
+        last_id, last_ts = None, None
+        for rec in _merge(runs, tmp):
+            ts, eid, src = rec[_TS], rec[_ID], rec[_SRC]
+            if eid == last_id and ts == last_ts:
+                rep.duplicates += 1  # cold 与 tentative（或热层与归档）中的同一事件
+                continue
+            last_id, last_ts = eid, ts
+            rep.events += 1
+            rep.untimed += ts is None
+            a = cur.step(ts, eid, src, rec[3], rec[4])
+            b = alt.step(ts, eid, src, rec[6], rec[7])
+            if a != b:
+                rep.changes[(a, b)] += 1
+                if len(rep.samples) < samples:
+                    rep.samples.append({
+                        "ts": datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ") if ts is not None else "",
+                        "event_id": eid,
+                        "entity": rec[6] if rec[6] != "UNKNOWN" else rec[3],
+                        "current": a,
+                        "candidate": b,
+                        "action": rec[8] if b == "interrupt" else (rec[5] if a == "interrupt" else ""),
+                    })
+        rep.current, rep.candidate = cur.stats, alt.stats
+        return rep
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def format_report(rep: ReplayReport) -> str:
+    c, a = rep.current, rep.candidate
+    rows = [
+        ("decided interrupt", c.decided["interrupt"], a.decided["interrupt"]),
+        ("decided tentative", c.decided["tentative"], a.decided["tentative"]),
+        ("decided cold", c.decided["cold"], a.decided["cold"]),
+        ("promoted", c.promoted, a.promoted),
+        ("admitted", c.admitted, a.admitted),
+        ("blocked (tripped)", c.blocked["tripped"], a.blocked["tripped"]),
+        ("blocked (burst)", c.blocked["burst"], a.blocked["burst"]),
+        ("blocked (budget)", c.blocked["budget"], a.blocked["budget"]),
+        ("gate trips", c.trips, a.trips),
+    ]
+    lines = [
+        f"Replay: {rep.events} events (duplicates skipped: {rep.duplicates}, untimed: {rep.untimed})",
+        f"{'':<20}{'current':>10}{'candidate':>11}{'delta':>8}",
+    ]
+    for name, x, y in rows:
+        lines.append(f"{name:<20}{x:>10}{y:>11}{y - x:>+8}")
+
+    months = sorted(set(c.by_month) | set(a.by_month))
+    if months:
+        lines.append("Admitted by month:")
+        for m in months:
+            lines.append(f"  {m:<18}{c.by_month[m]:>10}{a.by_month[m]:>11}{a.by_month[m] - c.by_month[m]:>+8}")
+
+    total = sum(rep.changes.values())
+    lines.append(f"Changed outcomes: {total}")
+    for (x, y), n in rep.changes.most_common():
+        lines.append(f"  {x} -> {y}\t{n}")
+    if rep.samples:
+        lines.append(f"First {len(rep.samples)} changes:")
+        for s in rep.samples:
+            lines.append(f"  {s['ts']}\t{s['event_id']}\t{s['entity']}\t{s['current']} -> {s['candidate']}\t{s['action']}")
+    return "\n".join(lines)
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+from .coldstore import (
+    ARCHIVE_DIR,
+    CODECS,
+    SEGMENTS_DIR,
+    SegmentStore,
+    archive_paths,
+    forget,
+    is_segmented,
+    iter_archive,
+    open_archive,
+    open_store,
+)
+from .config import ConfigError, _int
+from .observation import parse_ts
+from .seen import forget_seen
+from .terms import forget_events
+
+
+@dataclass
+class RetentionPolicy:
+    hot_days: int = 30            # 热层（未压缩）保留天数
+    codec: str = "gzip"           # gzip / lzma
+    drop_after_days: int = 0      # 0 = 永不删除
+
+
+@dataclass
+class CompactStats:
+    kept: int = 0
+    archived: int = 0
+    dropped: int = 0
+    deduped: int = 0
+
+
+def load_policy(rules_cfg: Dict) -> RetentionPolicy:
+    """
+    rules.yaml 的 retention 段；缺省的键取默认值，显式给出的值（包括 0）照用，非法 => ConfigError。
+    """
+    r = (rules_cfg or {}).get("retention")
+    if r is None:
+        r = {}
+    if not isinstance(r, dict):
+        raise ConfigError("rules.yaml: retention must be a mapping")
+    d = RetentionPolicy()
+    codec = r.get("codec")
+    codec = d.codec if codec is None else str(codec).lower()
+    if codec not in CODECS:
+        raise ConfigError(f"rules.yaml: retention.codec must be one of {', '.join(CODECS)}, got {r.get('codec')!r}")
+    policy = RetentionPolicy(
+        hot_days=_int(r, "hot_days", d.hot_days, "retention"),
+        codec=codec,
+        drop_after_days=_int(r, "drop_after_days", d.drop_after_days, "retention"),
+    )
+    for key in ("hot_days", "drop_after_days"):
+        if getattr(policy, key) < 0:
+            raise ConfigError(f"rules.yaml: retention.{key} must be >= 0, got {getattr(policy, key)}")
+    return policy
+
+
+def _month_of(name: str) -> str:
+    # archive/2026-02.ndjson.gz -> 2026-02
+    return name.split(".", 1)[0]
+
+
+def _month_end(month: str) -> datetime:
+    y, m = (int(x) for x in month.split("-"))
+    y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return datetime(y, m, 1, tzinfo=timezone.utc)
+
+
+def _merge_month(arch_dir: Path, month: str, spool: Path, codec: str, st: CompactStats) -> None:
+    """
+    把本次 spool 与该月已有归档合并：按 event_id 去重（后写覆盖），原子重写为目标压缩格式。
+    """
+    merged: Dict[str, bytes] = {}
+    old = [p for p in archive_paths(arch_dir.parent) if _month_of(p.name) == month]
+    for p in old:
+        for ev in iter_archive(p):
+            merged[ev.event_id] = json.dumps(ev.to_dict(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    with spool.open("rb") as f:
+        for raw in f:
+            eid = str(json.loads(raw).get("event_id") or "")
+            if eid in merged:
+                st.deduped += 1
+            merged[eid] = raw.rstrip(b"\n")
+
+    ext = CODECS[codec]
+    out = arch_dir / f"{month}.ndjson{ext}"
+    tmp = arch_dir / f".{month}.ndjson{ext}.tmp"
+    with open_archive(tmp, "wb", ext=ext) as f:
+        for line in merged.values():
+            f.write(line + b"\n")
+    os.replace(tmp, out)
+    for p in old:
+        if p != out:
+            p.unlink()
+    spool.unlink()
+
+
+def compact_dir(root: Path, policy: RetentionPolicy, now: Optional[datetime] = None) -> CompactStats:
+    """
+    单目录（cold 或 tentative）压实：
+    - ts 在 hot_days 内：留在热层（分段模式下重写段，顺带清理重复 event_id）
+    - 超过 hot_days：按月流式写入压缩归档（与已有归档去重合并）
+    - 超过 drop_after_days（>0）：直接丢弃；整月早于截止线的归档文件整体删除
+    - ts 无法解析：保守留在热层
+    """
+    st = CompactStats()
+    if not root.exists():
+        return st
+
+    now = now or datetime.now(timezone.utc)
+    hot_cut = now - timedelta(days=policy.hot_days)
+    drop_cut = now - timedelta(days=policy.drop_after_days) if policy.drop_after_days > 0 else None
+
+    arch_dir = root / ARCHIVE_DIR
+    arch_dir.mkdir(parents=True, exist_ok=True)
+
+    store = open_store(root)
+    segmented = is_segmented(root)
+    new_store = None
+    if segmented:
+        tmp_dir = root / (SEGMENTS_DIR + ".compact")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir()
+        shutil.copy2(store.dir / "meta.json", tmp_dir / "meta.json")
+        new_store = SegmentStore(root, dir_name=tmp_dir.name)
+
+    spools: Dict[str, object] = {}
+    remove: list[Path] = []
+    dropped: list[str] = []
+    # 逐文件模式按实际文件路径删除：文件名不一定等于 event_id（旧数据 / 手写文件）
+    entries = ((None, ev) for ev in store.iter_events()) if segmented else store.iter_entries()
+    try:
+        for src, ev in entries:
+            dt = parse_ts(ev.ts)
+            if dt is None or dt >= hot_cut:
+                st.kept += 1
+                if new_store is not None:
+                    new_store.append(ev)
+                continue
+
+            if src is not None:
+                remove.append(src)
+            if drop_cut is not None and dt < drop_cut:
+                st.dropped += 1
+                dropped.append(ev.event_id)
+                continue
+
+            month = dt.strftime("%Y-%m")
+            f = spools.get(month)
+            if f is None:
+                f = spools[month] = (arch_dir / f".spool-{month}.ndjson").open("ab")
+            f.write((json.dumps(ev.to_dict(), ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8"))
+            st.archived += 1
+    finally:
+        for f in spools.values():
+            f.close()
+
+    # 1) 归档先落盘
+    for month in sorted(spools):
+        _merge_month(arch_dir, month, arch_dir / f".spool-{month}.ndjson", policy.codec, st)
+
+    # 2) 再移除热层中已归档/丢弃的数据
+    if new_store is not None:
+        new_store.close()
+        forget(root)
+        old_dir = root / (SEGMENTS_DIR + ".old")
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.replace(store.dir, old_dir)
+        os.replace(new_store.dir, root / SEGMENTS_DIR)
+        shutil.rmtree(old_dir, ignore_errors=True)
+    for p in remove:
+        p.unlink(missing_ok=True)
+
+    # 3) 整月过期的归档
+    if drop_cut is not None:
+        for p in archive_paths(root):
+            if _month_end(_month_of(p.name)) <= drop_cut:
+                dropped.extend(ev.event_id for ev in iter_archive(p))
+                p.unlink()
+
+    # 4) 倒排索引：被丢弃的事件记墓碑（检索不再返回）；seen 索引删掉它们（重新抓取可以再次写入）
+    forget_events(root, dropped)
+    forget_seen(root, dropped)
+    return st
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import heapq
+import math
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .observation import parse_ts
+from .terms import month_key, open_terms, query_terms, tier_key
+
+K1 = 1.2
+B = 0.75
+MONTH_PREFILTER = 12   # 时间范围不超过 N 个月时先用月份键预筛；更宽时只在读取命中时过滤
+BATCH = 50             # 每批读取的最少命中数（过滤掉的会再取下一批）
+
+
+@dataclass
+class Hit:
+    score: float
+    store: str      # cold / tentative
+    event_id: str
+    ts: str
+    source_tier: str
+    source: str
+    title: str
+    url: str
+
+    def to_dict(self) -> Dict:
+        d = dict(self.__dict__)
+        d["score"] = round(self.score, 4)
+        return d
+
+
+class _Weights(dict):
+    """
+    倒排条目的 "dl" / "tf:dl" -> 该词的 BM25 分量；取值组合很少，按需计算并缓存。
+    """
+
+    def __init__(self, idf: float, c1: float, c2: float):
+        super().__init__()
+        self.w, self.c1, self.c2 = idf * (K1 + 1), c1, c2
+
+    def __missing__(self, key: str) -> float:
+        tf, _, dl = key.rpartition(":")
+        tf, dl = int(tf or 1), int(dl)
+        v = self[key] = self.w * tf / (tf + self.c1 + self.c2 * dl)
+        return v
+
+
+def _months(since: Optional[datetime], until: Optional[datetime]) -> Optional[List[str]]:
+    # [since, until) 覆盖的月份；任一端缺省或跨度过大 => None（不预筛）
+    if since is None or until is None or until <= since:
+        return None
+    y, m = since.year, since.month
+    out = []
+    while (y, m) <= (until.year, until.month):
+        out.append(f"{y:04d}-{m:02d}")
+        if len(out) > MONTH_PREFILTER:
+            return None
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return out
+
+
+def _in_range(ts: str, since: Optional[datetime], until: Optional[datetime]) -> bool:
+    if since is None and until is None:
+        return True
+    dt = parse_ts(ts)
+    if dt is None:
+        return False
+    return (since is None or dt >= since) and (until is None or dt < until)
+
+
+def _ranked(accs: List[Dict[str, float]], limit: int) -> Iterator[List[Tuple[float, str, int]]]:
+    """
+    (得分, event_id, 目录序号)，得分降序、同分按 id。多数查询第一批就够：
+    每个目录先取第 n 高的分数作门槛，只为门槛以上的条目建元组；不够时才整体排序往后取。
+    """
+    n = max(limit * 4, BATCH)
+    key = lambda x: (-x[0], x[1])  # noqa: E731
+    top: List[Tuple[float, str, int]] = []
+    for ri, acc in enumerate(accs):
+        t = heapq.nlargest(n, acc.values())[-1] if len(acc) > n else float("-inf")
+        top += [(sc, eid, ri) for eid, sc in acc.items() if sc >= t]
+    top.sort(key=key)
+    yield top[:n]
+    if sum(len(acc) for acc in accs) > n:
+        rest = sorted(((sc, eid, ri) for ri, acc in enumerate(accs) for eid, sc in acc.items()), key=key)[n:]
+        for i in range(0, len(rest), n * 4):
+            yield rest[i:i + n * 4]
+
+
+def search(
+    roots: List[Path],
+    query: str,
+    limit: int = 20,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    tiers: Optional[Set[str]] = None,
+) -> List[Hit]:
+    """
+    冷存全文检索（title / body / tags / source），BM25 排序：
+    - 只读各存储目录的倒排索引（<dir>/_terms），N / avgdl / df 按所有目录合计
+    - since / until：事件时间 [since, until)；tiers：来源等级（非 A/B/C 视为 C）
+    - 等级与（不超过 12 个月的）时间范围先用 r: / m: 键预筛；
+      再按得分从高到低查文档表做精确时间过滤，凑够 limit 条即停；已被 compact 丢弃的事件跳过
+    """
+    keys = ["w:" + t for t in query_terms(query)]
+    if not keys or limit <= 0:
+        return []
+    months = _months(since, until)
+
+    per_root = []
+    n_docs = total = 0
+    df: Counter = Counter()
+    for root in roots:
+        if not root.exists():
+            continue
+        idx = open_terms(root)
+        post = idx.postings(keys)
+        n, length = idx.stats()
+        n_docs += n
+        total += length
+        for k, (ids, _) in post.items():
+            df[k] += len(ids)
+        groups = []
+        if months is not None:
+            groups.append([month_key(m) for m in months])
+        if tiers is not None:
+            groups.append([tier_key(t) for t in tiers])
+        allowed = None
+        for g in groups:
+            ids = set().union(*idx.lookup(g).values())
+            allowed = ids if allowed is None else allowed & ids
+        per_root.append((idx, post, allowed))
+    if not n_docs:
+        return []
+
+    # BM25：idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+    c1, c2 = K1 * (1 - B), K1 * B * n_docs / max(total, 1)
+    accs: List[Dict[str, float]] = []
+    for _, post, allowed in per_root:
+        acc: Dict[str, float] = {}
+        # 最长的倒排表直接建 dict（C 层），其余逐条累加
+        for k, (ids, tfdl) in sorted(post.items(), key=lambda x: -len(x[1][0])):
+            if not ids:
+                continue
+            idf = math.log(1 + (n_docs - df[k] + 0.5) / (df[k] + 0.5))
+            scores = map(_Weights(idf, c1, c2).__getitem__, tfdl)
+            if not acc:
+                acc = dict(zip(ids, scores))
+                continue
+            get = acc.get
+            for eid, w in zip(ids, scores):
+                acc[eid] = get(eid, 0.0) + w
+        if allowed is not None:
+            acc = {eid: acc[eid] for eid in acc.keys() & allowed}
+        accs.append(acc)
+
+    hits: List[Hit] = []
+    for batch in _ranked(accs, limit):
+        docs = [idx.docs(eid for _, eid, r in batch if r == ri) for ri, (idx, _, _) in enumerate(per_root)]
+        for s, eid, ri in batch:
+            d = docs[ri].get(eid)
+            if d is None or not _in_range(d["ts"], since, until):
+                continue
+            hits.append(Hit(score=s, store=per_root[ri][0].root.name, event_id=eid, **d))
+            if len(hits) >= limit:
+                return hits
+    return hits
+
+
+def format_hits(hits: List[Hit]) -> str:
+    if not hits:
+        return "No matches."
+    lines = ["score\tts\ttier\tstore\tsource\tevent_id\ttitle"]
+    for h in hits:
+        lines.append(f"{h.score:.2f}\t{h.ts}\t{h.source_tier}\t{h.store}\t{h.source}\t{h.event_id}\t{h.title}")
+    return "\n".join(lines)
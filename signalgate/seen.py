@@ -0,0 +1,404 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .coldstore import in_bulk, iter_ids, on_flush, release_locks
+from .locks import lock_fd, tmp_path, unlock_fd
+
+SEEN_DIR = "_seen"
+BLOOM_NAME = "bloom.bin"
+LOCK_NAME = ".lock"
+EPOCH_NAME = "epoch"        # forget 重写分片后整文件替换；其他进程持锁时发现变化 => 整体重载
+SHARDS = 256
+BITS_PER_ITEM = 10          # ~1% 误判率（k=7）
+HASHES = 7
+MIN_CAPACITY = 100_000
+SAVE_EVERY = 1000           # 非批量模式：每追加 N 个 id 重写一次 bloom
+
+_MAGIC = b"SGBF1"
+_HEAD = struct.Struct("<QQQ")            # m(bits), k, n
+_OFFS = struct.Struct(f"<{SHARDS}Q")     # 每个分片已计入 bloom 的字节偏移
+
+
+def _digest(event_id: str) -> bytes:
+    return hashlib.blake2b(event_id.encode("utf-8", errors="ignore"), digest_size=16).digest()
+
+
+class _Bloom:
+    def __init__(self, m: int, k: int = HASHES):
+        self.m = max(8, int(m))
+        self.k = int(k)
+        self.bits = bytearray((self.m + 7) // 8)
+
+    def _positions(self, d: bytes) -> Iterable[int]:
+        h1 = int.from_bytes(d[:8], "little")
+        h2 = int.from_bytes(d[8:], "little") | 1
+        m = self.m
+        return ((h1 + i * h2) % m for i in range(self.k))
+
+    def add(self, d: bytes) -> None:
+        bits = self.bits
+        for p in self._positions(d):
+            bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, d: bytes) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(d))
+
+
+class SeenIndex:
+    """
+    已见 event_id 索引（每个存储目录一份，位于 <dir>/_seen/）：
+    - bloom.bin：Bloom filter（常驻内存，新事件绝大多数在这里就判定“未见”）
+    - ids-XX.txt：精确集合，按 id 摘要首字节分 256 片，append-only；
+      只有 bloom 判定“可能见过”时才按需加载对应分片
+    - 缺失时从冷存（热层 + 归档）重建；bloom 落后于分片时从分片尾部追平
+    - 多进程：locked() 内（<dir>/_seen/.lock）的判定会先追平该分片，“检查 + 写入 + 标记”是一步；
+      不持锁的判定只反映本进程打开以来的状态（其他进程新写的 id 可能判为未见，只适合做预筛）
+    - forget：从精确集合中删除（compact 丢弃的事件），之后重新抓取可以再次写入
+    - read_only=True（dry-run）：只读不写，索引缺失时在内存里从冷存构建，不落盘
+    """
+
+    def __init__(self, root: Path, read_only: bool = False):
+        self.root = root
+        self.read_only = read_only
+        self.dir = root / SEEN_DIR
+        self._epoch_file = str(self.dir / EPOCH_NAME)  # 每次写入都要 stat：预先拼好（pathlib 拼接比 stat 本身还贵）
+        self._shard_files = [str(self._shard_path(i)) for i in range(SHARDS)]
+        self._lock = threading.Lock()
+        self._wlock = threading.RLock()  # locked() 的进程内部分
+        self._lock_fd: Optional[int] = None
+        self._held = 0
+        self._epoch: Optional[Tuple[int, int]] = None
+        self._reset()
+        self._open()
+
+    def _reset(self) -> None:
+        self._shards: Dict[int, set] = {}
+        self._sizes: Dict[int, int] = {}  # 分片 -> 已读入 _shards 的字节数
+        self._offsets: List[int] = [0] * SHARDS
+        self._bloom = _Bloom(MIN_CAPACITY * BITS_PER_ITEM)
+        self._n = 0
+        self._unsaved = 0
+
+    # ---- 布局
+    def _shard_path(self, i: int) -> Path:
+        return self.dir / f"ids-{i:02x}.txt"
+
+    def _bloom_path(self) -> Path:
+        return self.dir / BLOOM_NAME
+
+    def _epoch_key(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self._epoch_file)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    # ---- 打开 / 重建
+    def _open(self) -> None:
+        self._epoch = self._epoch_key()
+        if not self.dir.exists():
+            self._rebuild_from_store()
+            return
+        if not self._load_bloom():
+            self._rebuild_bloom()
+            return
+        self._catch_up()
+
+    def _load_bloom(self) -> bool:
+        p = self._bloom_path()
+        try:
+            raw = p.read_bytes()
+        except FileNotFoundError:
+            return False
+        head = len(_MAGIC) + _HEAD.size + _OFFS.size
+        if len(raw) < head or raw[: len(_MAGIC)] != _MAGIC:
+            return False
+        m, k, n = _HEAD.unpack_from(raw, len(_MAGIC))
+        bloom = _Bloom(m, k)
+        if len(raw) - head != len(bloom.bits):
+            return False
+        bloom.bits[:] = raw[head:]
+        self._bloom, self._n = bloom, int(n)
+        self._offsets = list(_OFFS.unpack_from(raw, len(_MAGIC) + _HEAD.size))
+        return True
+
+    def _catch_up(self) -> None:
+        # 其他进程（或未落盘的本进程）追加到分片、但尚未计入 bloom 的 id
+        for i in range(SHARDS):
+            p = self._shard_path(i)
+            try:
+                size = p.stat().st_size
+            except FileNotFoundError:
+                continue
+            if size <= self._offsets[i]:
+                continue
+            with p.open("rb") as f:
+                f.seek(self._offsets[i])
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break
+                    self._bloom.add(_digest(raw[:-1].decode("utf-8")))
+                    self._offsets[i] += len(raw)
+                    self._n += 1
+                    self._unsaved += 1
+        self._maybe_grow()
+
+    def _rebuild_from_store(self) -> None:
+        buckets: Dict[int, set] = {}
+        for eid in iter_ids(self.root):
+            buckets.setdefault(_digest(eid)[0], set()).add(eid)
+        if self.read_only:
+            # 全部分片常驻内存（不会再去读磁盘上的分片）
+            self._shards = {i: buckets.get(i, set()) for i in range(SHARDS)}
+            self._n = sum(len(x) for x in buckets.values())
+            self._bloom = _Bloom(max(MIN_CAPACITY, self._n * 2) * BITS_PER_ITEM)
+            for ids in buckets.values():
+                for eid in ids:
+                    self._bloom.add(_digest(eid))
+            return
+        self.dir.mkdir(parents=True, exist_ok=True)
+        for i, ids in buckets.items():
+            tmp = tmp_path(self._shard_path(i))
+            tmp.write_text("".join(f"{x}\n" for x in ids), encoding="utf-8")
+            os.replace(tmp, self._shard_path(i))
+        self._rebuild_bloom()
+
+    def _rebuild_bloom(self, capacity: int = 0) -> None:
+        total = 0
+        offsets = [0] * SHARDS
+        for i in range(SHARDS):
+            p = self._shard_path(i)
+            if p.exists():
+                offsets[i] = p.stat().st_size
+                with p.open("rb") as f:
+                    total += sum(1 for _ in f)
+        cap = max(MIN_CAPACITY, capacity, total * 2)
+        bloom = _Bloom(cap * BITS_PER_ITEM)
+        for i in range(SHARDS):
+            p = self._shard_path(i)
+            if not p.exists():
+                continue
+            with p.open("rb") as f:
+                f.seek(0)
+                read = 0
+                for raw in f:
+                    if read + len(raw) > offsets[i]:
+                        break
+                    read += len(raw)
+                    bloom.add(_digest(raw[:-1].decode("utf-8")))
+        self._bloom, self._n, self._offsets = bloom, total, offsets
+        self.save()
+
+    def _maybe_grow(self) -> None:
+        if self._n * BITS_PER_ITEM > self._bloom.m:
+            self._rebuild_bloom(capacity=self._n * 4)
+
+    # ---- 精确集合
+    def _shard(self, i: int) -> set:
+        ids = self._shards.get(i)
+        if ids is None:
+            try:
+                raw = self._shard_path(i).read_bytes()
+            except FileNotFoundError:
+                raw = b""
+            end = raw.rfind(b"\n") + 1
+            ids = set(raw[:end].decode("utf-8").split("\n")) - {""}
+            self._shards[i], self._sizes[i] = ids, end
+        return ids
+
+    def _refresh(self, i: int) -> None:
+        # 持锁时追平单个分片：其他进程追加的 id 计入 bloom 与已加载的集合
+        try:
+            size = os.stat(self._shard_files[i]).st_size
+        except FileNotFoundError:
+            return
+        loaded = self._shards.get(i)
+        start = self._offsets[i] if loaded is None else min(self._offsets[i], self._sizes[i])
+        if size <= start:
+            return
+        pos = start
+        with open(self._shard_files[i], "rb") as f:
+            f.seek(start)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                if pos >= self._offsets[i]:
+                    self._bloom.add(_digest(raw[:-1].decode("utf-8")))
+                    self._n += 1
+                    self._unsaved += 1
+                if loaded is not None and pos >= self._sizes[i]:
+                    loaded.add(raw[:-1].decode("utf-8"))
+                pos += len(raw)
+        self._offsets[i] = max(self._offsets[i], pos)
+        if loaded is not None:
+            self._sizes[i] = max(self._sizes[i], pos)
+        self._maybe_grow()
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """
+        跨进程互斥：块内的判定先追平对应分片（其他进程 forget 过 => 整体重载），
+        调用方在块内完成“未见 -> 写入存储 -> add”，并发的写者不会重复写同一个 id。
+        """
+        with self._wlock:
+            if self._held:
+                self._held += 1
+                try:
+                    yield
+                finally:
+                    self._held -= 1
+                return
+            if self._lock_fd is None:
+                self.dir.mkdir(parents=True, exist_ok=True)
+                self._lock_fd = os.open(self.dir / LOCK_NAME, os.O_RDWR | os.O_CREAT, 0o644)
+            if not lock_fd(self._lock_fd, blocking=False):
+                release_locks()  # 等待前先放掉本进程持有的 store 写锁（对方可能持有它们在等本锁）
+                lock_fd(self._lock_fd)
+            try:
+                with self._lock:
+                    if self._epoch_key() != self._epoch:
+                        self._reset()
+                        self._open()
+                self._held = 1
+                yield
+            finally:
+                self._held = 0
+                unlock_fd(self._lock_fd)
+
+    def current(self) -> bool:
+        """
+        本进程视图里“已见”的判定是否仍然成立：只有 forget 能让 id 变回未见，而 forget 会更换 epoch。
+        """
+        return self._epoch_key() == self._epoch
+
+    # ---- API
+    def __contains__(self, event_id: str) -> bool:
+        d = _digest(event_id)
+        with self._lock:
+            if self._held:
+                self._refresh(d[0])
+            if d not in self._bloom:
+                return False
+            return event_id in self._shard(d[0])
+
+    def add(self, event_id: str) -> bool:
+        """
+        标记为已见；返回 True 表示此前未见过（调用方应继续写入）。
+        """
+        if self.read_only:
+            raise RuntimeError("seen index opened read-only")
+        d = _digest(event_id)
+        with self._lock:
+            if d in self._bloom and event_id in self._shard(d[0]):
+                return False
+            line = f"{event_id}\n".encode("utf-8")
+            with self._shard_path(d[0]).open("ab") as f:
+                before = f.tell()
+                f.write(line)
+            # 只有分片此前已完全计入 bloom 才推进偏移；否则留给下次打开时追平
+            if before == self._offsets[d[0]]:
+                self._offsets[d[0]] += len(line)
+            if d[0] in self._shards:
+                self._shards[d[0]].add(event_id)
+                if before == self._sizes[d[0]]:
+                    self._sizes[d[0]] += len(line)
+            self._bloom.add(d)
+            self._n += 1
+            self._unsaved += 1
+            if self._n * BITS_PER_ITEM > self._bloom.m:
+                self._rebuild_bloom(capacity=self._n * 4)
+            elif not in_bulk() and self._unsaved >= SAVE_EVERY:
+                self.save()
+        return True
+
+    def forget(self, ids: Iterable[str]) -> int:
+        """
+        从精确集合中删除（重写涉及的分片 + 重建 bloom + 更换 epoch）；返回删除的 id 数。
+        """
+        by_shard: Dict[int, set] = {}
+        for eid in ids:
+            by_shard.setdefault(_digest(eid)[0], set()).add(eid)
+        removed = 0
+        with self.locked(), self._lock:
+            for i, drop in by_shard.items():
+                self._shards.pop(i, None)
+                cur = self._shard(i)
+                if not cur & drop:
+                    continue
+                keep = cur - drop
+                removed += len(cur) - len(keep)
+                data = "".join(f"{x}\n" for x in keep).encode("utf-8")
+                tmp = tmp_path(self._shard_path(i))
+                tmp.write_bytes(data)
+                os.replace(tmp, self._shard_path(i))
+                self._shards[i], self._sizes[i] = keep, len(data)
+            if removed:
+                self._rebuild_bloom()
+                tmp = tmp_path(self.dir / EPOCH_NAME)
+                tmp.write_text(f"{os.getpid()} {time.time_ns()}\n", encoding="utf-8")
+                os.replace(tmp, self.dir / EPOCH_NAME)
+                self._epoch = self._epoch_key()
+        return removed
+
+    def save(self) -> None:
+        if self.read_only:
+            self._unsaved = 0
+            return
+        tmp = tmp_path(self._bloom_path())
+        with tmp.open("wb") as f:
+            f.write(_MAGIC)
+            f.write(_HEAD.pack(self._bloom.m, self._bloom.k, self._n))
+            f.write(_OFFS.pack(*self._offsets))
+            f.write(self._bloom.bits)
+        os.replace(tmp, self._bloom_path())
+        self._unsaved = 0
+
+    def flush(self) -> None:
+        if self._unsaved:
+            self.save()
+
+    def __len__(self) -> int:
+        return self._n
+
+
+_OPEN: Dict[Path, SeenIndex] = {}
+_OPEN_LOCK = threading.Lock()
+
+
+def open_seen(root: Path) -> SeenIndex:
+    """
+    进程内缓存；首次打开时按需重建 / 追平。
+    """
+    with _OPEN_LOCK:
+        idx = _OPEN.get(root)
+        if idx is None:
+            root.mkdir(parents=True, exist_ok=True)
+            idx = _OPEN[root] = SeenIndex(root)
+        return idx
+
+
+def forget_seen(root: Path, ids: Iterable[str]) -> int:
+    """
+    compact 丢弃事件之后调用：这些 id 不再算“已见”（索引不存在时什么都不做，下次打开从存储重建）。
+    """
+    ids = list(ids)
+    if not ids or not (root / SEEN_DIR).exists():
+        return 0
+    return open_seen(root).forget(ids)
+
+
+def flush_all() -> None:
+    for idx in list(_OPEN.values()):
+        idx.flush()
+
+
+on_flush(flush_all)
@@ -0,0 +1,533 @@
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from bisect import bisect_right
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from .coldstore import in_bulk, iter_events, on_flush
+from .locks import atomic_write_text, file_lock, lock_fd
+from .observation import parse_ts
+
+TERMS_DIR = "_terms"
+META_NAME = "meta.json"
+STATS_NAME = "stats.tsv"
+INDEX_VERSION = 2
+SHARDS = 256
+FLUSH_POSTINGS = 200_000   # 缓冲的倒排条目数上限（超过即落盘，内存有界）
+FLUSH_SECONDS = 30.0       # 非批量模式（watch / 单次 run）下缓冲最久保留的秒数
+STATS_COMPACT = 1024       # stats.tsv 超过该行数时合并为一行
+
+_WORD = re.compile(r"\w+")
+_CJK = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af\uf900-\ufaff]{2,}")
+_TIERS = ("A", "B", "C")
+
+
+def _clean(s: str) -> str:
+    # 键以 \t、\n 分隔：出现在标签里时替换为空格（查询端用同一规则规范化）
+    return s.replace("\t", " ").replace("\n", " ")
+
+
+def _esc(eid: str) -> str:
+    # 倒排条目 = "id[ 词频/长度]"，以 \t 分隔：id 中的分隔符按 % 转义
+    if "%" in eid or " " in eid or "\t" in eid or "\n" in eid:
+        eid = eid.replace("%", "%25").replace(" ", "%20").replace("\t", "%09").replace("\n", "%0A")
+    return eid
+
+
+def _unesc(eid: str) -> str:
+    if "%" in eid:
+        eid = eid.replace("%20", " ").replace("%09", "\t").replace("%0A", "\n").replace("%25", "%")
+    return eid
+
+
+def tag_key(tag) -> str:
+    return "t:" + _clean(str(tag).lower())
+
+
+def tier_key(tier) -> str:
+    t = str(tier or "C").upper()
+    return "r:" + (t if t in _TIERS else "C")
+
+
+def month_key(month: str) -> str:
+    return "m:" + month
+
+
+def words(text: str) -> List[str]:
+    """
+    分词：小写后的 \\w+ 连续片段（中文等无空格文本整段为一个词；impact 按子串匹配词表）。
+    """
+    return _WORD.findall(text.lower())
+
+
+def tokens(text: str) -> List[str]:
+    """
+    索引用：words + 其中 CJK 连续片段的二元组（整段中文是一个词，二元组让检索能命中片段）。
+    """
+    ws = words(text)
+    if _CJK.search(text) is None:
+        return ws
+    out = []
+    for w in ws:
+        out.append(w)
+        for run in _CJK.findall(w):
+            out.extend(b for b in (run[i:i + 2] for i in range(len(run) - 1)) if b != w)
+    return out
+
+
+def query_terms(text: str) -> List[str]:
+    """
+    检索词：普通词原样；含 CJK 片段的词只用片段的二元组（与 tokens 对应）。
+    """
+    out: List[str] = []
+    for w in words(text):
+        runs = _CJK.findall(w)
+        if not runs:
+            out.append(w)
+        for run in runs:
+            out.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return list(dict.fromkeys(out))
+
+
+def event_keys(event) -> Tuple[Set[str], Counter]:
+    """
+    可索引特征：
+    - t:<tag>   规范化标签（与 decide 相同：小写）
+    - r:<tier>  证据等级（与 decide 相同：非 A/B/C 视为 C）
+    - m:<月份>  ts 所在月（YYYY-MM；ts 无法解析时没有）：检索时间范围的预筛
+    - w:<词>    title / body / tags / source 的词（tokens），附词频：检索排序；
+                bets id / name 的子串匹配也经词表解析到这些键（多出的词只会扩大候选）
+    返回 (非词键, 词频)。
+    """
+    keys = {tier_key(event.source_tier)}
+    keys.update(tag_key(t) for t in (event.tags or ()))
+    dt = parse_ts(event.ts)
+    if dt is not None:
+        keys.add(month_key(dt.strftime("%Y-%m")))
+    tags = " ".join(str(t) for t in (event.tags or ()))
+    tf = Counter(tokens(f"{event.title}\n{event.body}\n{tags}\n{event.source}"))
+    return keys, tf
+
+
+def _shard(key: str) -> int:
+    return zlib.crc32(key.encode("utf-8")) & (SHARDS - 1)
+
+
+def _append(p: Path, data: bytes) -> None:
+    # 整块 O_APPEND + flock：多个进程并发追加不会交错
+    fd = os.open(p, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        lock_fd(fd)
+        while data:
+            data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
+
+
+class WordVocab:
+    """
+    w: 词表的内存查找结构（impact 的子串解析用）：全部词以 \n 连接成一个字符串，
+    子串 / 前缀 / 后缀都用 str.find（C 层）定位，再按词的起始偏移二分换算成词；耗时与命中数相关，
+    不是逐词比较。只追加（词表本身只增不减）。
+    """
+
+    def __init__(self) -> None:
+        self.text = "\n"
+        self.starts: List[int] = []  # 每个词在 text 中的起始偏移（递增）
+        self.words: List[str] = []
+        self._set: Set[str] = set()
+
+    def extend(self, ws: Iterable[str]) -> None:
+        # 并发写者可能各自把同一个新键追加一次：重复的跳过
+        ws = [w for w in dict.fromkeys(ws) if w and w not in self._set]
+        if not ws:
+            return
+        pos = len(self.text)
+        for w in ws:
+            self.starts.append(pos)
+            pos += len(w) + 1
+        self.words.extend(ws)
+        self._set.update(ws)
+        self.text += "".join(w + "\n" for w in ws)
+
+    def _word_at(self, j: int) -> int:
+        return bisect_right(self.starts, j) - 1
+
+    def containing(self, s: str) -> Set[str]:
+        out: Set[str] = set()
+        text, starts, n = self.text, self.starts, len(self.starts)
+        j = text.find(s, 1)
+        while j >= 0:
+            i = self._word_at(j)
+            out.add(self.words[i])
+            if i + 1 >= n:
+                break
+            j = text.find(s, starts[i + 1])  # 同一个词只算一次：从下一个词开始找
+        return out
+
+    def startswith(self, s: str) -> Set[str]:
+        out: Set[str] = set()
+        pat = "\n" + s
+        j = self.text.find(pat)
+        while j >= 0:
+            out.add(self.words[self._word_at(j + 1)])
+            j = self.text.find(pat, j + 1)
+        return out
+
+    def endswith(self, s: str) -> Set[str]:
+        out: Set[str] = set()
+        pat = s + "\n"
+        j = self.text.find(pat, 1)
+        while j >= 0:
+            out.add(self.words[self._word_at(j)])
+            j = self.text.find(pat, j + 1)
+        return out
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+
+class TermIndex:
+    """
+    冷存倒排索引（每个存储目录一份，位于 <dir>/_terms/）：
+    - p-XX.tsv：倒排表，按键的 crc32 分 256 片，append-only；一行 = 键 + 若干条目（\\t 分隔）
+      条目：w: 键为 "id dl"（词频 1）或 "id tf:dl"（词频 / 文档长度），其余键为 "id"
+    - v-XX.txt：词表分片（每个键首次出现时追加一行），查询时用于子串解析
+    - d-XX.tsv：文档表，按 id 分片：id / ts / tier / source / title / url（检索结果展示与时间过滤，不必打开存储）；
+      compact 丢弃的事件追加一行只有 id 的墓碑（同一 id 以最后一行为准）
+    - stats.tsv：每次落盘追加一行 "文档数 \\t 总长度"（BM25 的 N / avgdl），行数过多时合并
+    - write_cold_event 增量更新，只进内存缓冲：bulk 结束、缓冲超限、非批量模式下缓冲超过 FLUSH_SECONDS、
+      本进程查询之前、进程退出时按分片一次写入（写入热路径上不逐事件打开分片文件）；
+      其他进程在落盘之前查不到这些事件，进程崩溃则丢失未落盘的条目（删除 _terms/ 即可重建）
+    - 缺失 / 版本不符时从存储目录全量重建
+    - 只追加不删除：已被 compact 丢弃的事件仍可能出现在结果中，由调用方读取时过滤
+    - w: 词表常驻内存（word_vocab），之后每次只读各词表分片新追加的尾部
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.dir = root / TERMS_DIR
+        self._lock = threading.Lock()
+        self._vocab: Dict[int, Set[str]] = {}
+        self._post: Dict[str, List[str]] = {}
+        self._shard_of: Dict[str, int] = {}   # 本进程见过的键 -> 分片（已确认在词表中）
+        self._new_vocab: Dict[int, List[str]] = {}
+        self._docs_buf: Dict[int, List[str]] = {}
+        self._words = WordVocab()
+        self._words_off: List[int] = [0] * SHARDS  # 各词表分片已读入 _words 的字节数
+        self._words_ino: List[int] = [0] * SHARDS  # 以及当时的 inode（重建会删除重写分片）
+        self._words_files = [str(self._vocab_path(i)) for i in range(SHARDS)]
+        self._buffered = 0
+        self._since = 0.0  # 最早一条未落盘缓冲的时间（monotonic）；0 = 无缓冲
+        self._docs = 0
+        self._length = 0
+        self._open()
+
+    # ---- 布局
+    def _post_path(self, i: int) -> Path:
+        return self.dir / f"p-{i:02x}.tsv"
+
+    def _vocab_path(self, i: int) -> Path:
+        return self.dir / f"v-{i:02x}.txt"
+
+    def _doc_path(self, i: int) -> Path:
+        return self.dir / f"d-{i:02x}.tsv"
+
+    # ---- 打开 / 重建
+    def _open(self) -> None:
+        meta = self.dir / META_NAME
+        try:
+            ok = json.loads(meta.read_text(encoding="utf-8")).get("version") == INDEX_VERSION
+        except (OSError, ValueError):
+            ok = False
+        if ok:
+            return
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.dir / ".lock"):
+            try:
+                if json.loads(meta.read_text(encoding="utf-8")).get("version") == INDEX_VERSION:
+                    return  # 其他进程刚重建完
+            except (OSError, ValueError):
+                pass
+            for p in [*self.dir.glob("[pvd]-*"), self.dir / STATS_NAME]:
+                p.unlink(missing_ok=True)
+            for ev in iter_events(self.root):
+                self._add(ev)
+                if self._buffered >= FLUSH_POSTINGS:
+                    self._flush()
+            self._flush()
+            atomic_write_text(meta, json.dumps({"version": INDEX_VERSION}))
+
+    def _vocab_shard(self, i: int) -> Set[str]:
+        v = self._vocab.get(i)
+        if v is None:
+            p = self._vocab_path(i)
+            v = set(p.read_text(encoding="utf-8").split("\n")) - {""} if p.exists() else set()
+            self._vocab[i] = v
+        return v
+
+    # ---- 写
+    def _add(self, event) -> None:
+        if not event.event_id:
+            return
+        eid = _esc(event.event_id)
+        keys, tf = event_keys(event)
+        dl = sum(tf.values())
+        entries = [(k, eid) for k in keys]
+        entries += [("w:" + w, f"{eid} {dl}" if n == 1 else f"{eid} {n}:{dl}") for w, n in tf.items()]
+        post, shard_of = self._post, self._shard_of
+        for k, entry in entries:
+            lst = post.get(k)
+            if lst is None:
+                lst = post[k] = []
+                if k not in shard_of:
+                    i = shard_of[k] = _shard(k)
+                    v = self._vocab_shard(i)
+                    if k not in v:
+                        v.add(k)
+                        self._new_vocab.setdefault(i, []).append(k)
+            lst.append(entry)
+        self._buffered += len(entries)
+        row = (event.ts, tier_key(event.source_tier)[2:], event.source, event.title, event.url)
+        self._docs_buf.setdefault(_shard(eid), []).append("\t".join([eid, *(_clean(str(x or "")) for x in row)]))
+        self._docs += 1
+        self._length += dl
+
+    def _flush(self) -> None:
+        by_shard: Dict[int, List[str]] = {}
+        for k, ids in self._post.items():
+            by_shard.setdefault(self._shard_of[k], []).append("\t".join([k, *ids]) + "\n")
+        for i, lines in by_shard.items():
+            _append(self._post_path(i), "".join(lines).encode("utf-8"))
+        for i, keys in self._new_vocab.items():
+            _append(self._vocab_path(i), "".join(f"{k}\n" for k in keys).encode("utf-8"))
+        for i, rows in self._docs_buf.items():
+            _append(self._doc_path(i), "".join(f"{r}\n" for r in rows).encode("utf-8"))
+        if self._docs:
+            _append(self.dir / STATS_NAME, f"{self._docs}\t{self._length}\n".encode("utf-8"))
+        self._post, self._new_vocab, self._docs_buf, self._buffered = {}, {}, {}, 0
+        self._docs = self._length = 0
+        self._since = 0.0
+
+    def add(self, event) -> None:
+        with self._lock:
+            self._add(event)
+            now = time.monotonic()
+            if not self._since:
+                self._since = now
+            if self._buffered >= FLUSH_POSTINGS or (not in_bulk() and now - self._since >= FLUSH_SECONDS):
+                self._flush()
+
+    def flush(self, older_than: float = 0.0) -> None:
+        """
+        older_than > 0：只在最早的缓冲已超过该秒数时落盘（watch 空闲时调用）。
+        """
+        with self._lock:
+            if self._since and time.monotonic() - self._since >= older_than:
+                self._flush()
+
+    def forget(self, ids: Iterable[str]) -> None:
+        """
+        compact 丢弃事件后调用：文档表追加墓碑，检索不再返回（倒排条目保留，N / avgdl 不回退）。
+        """
+        rows: Dict[int, List[str]] = {}
+        for eid in ids:
+            e = _esc(eid)
+            rows.setdefault(_shard(e), []).append(e)
+        self.flush()
+        for i, es in rows.items():
+            _append(self._doc_path(i), "".join(f"{e}\n" for e in es).encode("utf-8"))
+
+    # ---- 查询
+    def _scan(self, keys: Iterable[str]) -> Iterator[Tuple[str, List[str]]]:
+        # (键, 该行条目)；同一键可能分布在多行。每个涉及的分片只读一遍
+        self.flush()
+        by_shard: Dict[int, Set[str]] = {}
+        for k in keys:
+            by_shard.setdefault(_shard(k), set()).add(k)
+        for i, ks in by_shard.items():
+            p = self._post_path(i)
+            if not p.exists():
+                continue
+            # 整片读入，按 "\n键\t" 查找（C 层搜索，不逐行解析）；未写完的尾行忽略
+            data = b"\n" + p.read_bytes()
+            for k in ks:
+                pat = f"\n{k}\t".encode("utf-8")
+                j = data.find(pat)
+                while j >= 0:
+                    end = data.find(b"\n", j + len(pat))
+                    if end < 0:
+                        break
+                    yield k, data[j + len(pat):end].decode("utf-8").split("\t")
+                    j = data.find(pat, end)
+
+    def lookup(self, keys: Iterable[str]) -> Dict[str, Set[str]]:
+        """
+        键 -> event_id 集合。
+        """
+        keys = set(keys)
+        out: Dict[str, Set[str]] = {k: set() for k in keys}
+        for k, entries in self._scan(keys):
+            if k.startswith("w:"):
+                entries = [e.partition(" ")[0] for e in entries]
+            out[k].update(_unesc(e) for e in entries)
+        return out
+
+    def postings(self, keys: Iterable[str]) -> Dict[str, Tuple[List[str], List[str]]]:
+        """
+        w: 键 -> (event_id 列表, "dl" / "tf:dl" 原始字符串列表)，列式
+        （长倒排表不逐条解析，调用方按取值缓存换算：组合很少）。
+        """
+        keys = set(keys)
+        out: Dict[str, Tuple[List[str], List[str]]] = {k: ([], []) for k in keys}
+        for k, entries in self._scan(keys):
+            ids, tfdl = out[k]
+            joined = " ".join(entries)
+            flat = joined.split(" ")
+            eids = flat[0::2]
+            ids.extend([_unesc(e) for e in eids] if "%" in joined else eids)
+            tfdl.extend(flat[1::2])
+        return out
+
+    def docs(self, ids: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        """
+        event_id -> {ts, source_tier, source, title, url}（只读涉及的文档表分片；墓碑 / 不存在的 id 不返回）。
+        """
+        self.flush()
+        by_shard: Dict[int, Set[str]] = {}
+        for eid in ids:
+            e = _esc(eid)
+            by_shard.setdefault(_shard(e), set()).add(e)
+        out: Dict[str, Dict[str, str]] = {}
+        for i, es in by_shard.items():
+            p = self._doc_path(i)
+            if not p.exists():
+                continue
+            data = b"\n" + p.read_bytes()
+            for e in es:
+                # 同一 id 以最后一行为准："\nid\t..." 为记录，"\nid\n" 为墓碑
+                head = f"\n{e}".encode("utf-8")
+                j = data.rfind(head + b"\t")
+                if j < 0 or data.rfind(head + b"\n") > j:
+                    continue
+                end = data.find(b"\n", j + len(head))
+                parts = data[j + len(head) + 1:end].decode("utf-8").split("\t") if end >= 0 else []
+                if len(parts) == 5:
+                    out[_unesc(e)] = dict(zip(("ts", "source_tier", "source", "title", "url"), parts))
+        return out
+
+    def stats(self) -> Tuple[int, int]:
+        """
+        (文档数, 总长度)。行数过多时在文件锁内原地合并为一行（并发追加者等锁后接着追加）。
+        """
+        self.flush()
+        p = self.dir / STATS_NAME
+        try:
+            fd = os.open(p, os.O_RDWR)
+        except FileNotFoundError:
+            return 0, 0
+        try:
+            lock_fd(fd)
+            with os.fdopen(os.dup(fd), "r+", encoding="utf-8") as f:
+                lines = [l.split("\t") for l in f.read().split("\n") if l]
+                lines = [x for x in lines if len(x) == 2 and x[0].isdigit() and x[1].isdigit()]
+                n = sum(int(x[0]) for x in lines)
+                total = sum(int(x[1]) for x in lines)
+                if len(lines) > STATS_COMPACT:
+                    f.seek(0)
+                    f.truncate()
+                    f.write(f"{n}\t{total}\n")
+        finally:
+            os.close(fd)
+        return n, total
+
+    def word_vocab(self) -> WordVocab:
+        """
+        w: 词表（去掉前缀）；首次调用读全部词表分片，之后只读新追加的行（包括其他进程写入的）。
+        """
+        self.flush()
+        with self._lock:
+            while not self._read_words():  # 其他进程重建了索引：整体重读
+                self._words, self._words_off, self._words_ino = WordVocab(), [0] * SHARDS, [0] * SHARDS
+            return self._words
+
+    def _read_words(self) -> bool:
+        new: List[str] = []
+        for i, f in enumerate(self._words_files):
+            try:
+                st = os.stat(f)
+            except FileNotFoundError:
+                if self._words_off[i]:
+                    return False
+                continue
+            off = self._words_off[i]
+            if off and (st.st_ino != self._words_ino[i] or st.st_size < off):
+                return False
+            self._words_ino[i] = st.st_ino
+            if st.st_size == off:
+                continue
+            with open(f, "rb") as fh:
+                fh.seek(off)
+                data = fh.read(st.st_size - off)
+            end = data.rfind(b"\n") + 1
+            self._words_off[i] = off + end
+            new += [k[2:] for k in data[:end].decode("utf-8").split("\n") if k.startswith("w:")]
+        self._words.extend(new)
+        return True
+
+
+_OPEN: Dict[Path, TermIndex] = {}
+_OPEN_LOCK = threading.Lock()
+
+
+def open_terms(root: Path) -> TermIndex:
+    """
+    进程内缓存；首次打开时按需重建。
+    """
+    with _OPEN_LOCK:
+        idx = _OPEN.get(root)
+        if idx is None:
+            root.mkdir(parents=True, exist_ok=True)
+            idx = _OPEN[root] = TermIndex(root)
+        return idx
+
+
+def forget_events(root: Path, ids: Iterable[str]) -> None:
+    """
+    compact 丢弃事件后调用：索引已存在时追加墓碑；不存在则不建（下次打开时按当前存储重建）。
+    """
+    ids = list(ids)
+    if ids and (root / TERMS_DIR / META_NAME).exists():
+        open_terms(root).forget(ids)
+
+
+def flush_all() -> None:
+    for idx in list(_OPEN.values()):
+        idx.flush()
+
+
+def flush_stale() -> None:
+    """
+    缓冲超过 FLUSH_SECONDS 的索引落盘（长驻进程空闲时调用，其他进程不至于一直查不到）。
+    """
+    for idx in list(_OPEN.values()):
+        idx.flush(older_than=FLUSH_SECONDS)
+
+
+def _flush_at_exit() -> None:
+    # 单次 run / watch 退出时落盘剩余缓冲；目录已被删除（临时目录等）则无处可写，跳过
+    for idx in list(_OPEN.values()):
+        if idx.dir.is_dir():
+            idx.flush()
+
+
+on_flush(flush_all)
+atexit.register(_flush_at_exit)
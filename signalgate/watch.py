@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import fnmatch
+import hashlib
+import os
+import select
+import stat
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from .locks import atomic_write_text, lock_fd
+
+POLL_S = 0.1       # 轮询间隔；inotify 模式下是检查 stop / 到期重试的最长等待
+RACY_S = 1.0       # 目录 mtime 距今太近：同一时间粒度内可能又有新文件，不能凭 mtime 跳过扫描
+RETRY_S = 2.0      # 解析失败且文件还很“新”：可能仍在写，到期后再试一次；仍失败则等它再变化
+COMPACT_MIN = 1024
+
+# <sys/inotify.h>
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_Q_OVERFLOW = 0x00004000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EV = struct.Struct("iIII")
+
+Key = Tuple[int, int]  # (mtime_ns, size)
+
+
+class _Inotify:
+    """
+    ctypes 调 libc 的 inotify（不引入依赖）：只关心写完关闭与移入的文件。
+    不可用（非 Linux / 受限环境）=> 构造时抛 OSError，由调用方退回轮询。
+    """
+
+    def __init__(self, path: Path):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify: not linux")
+        import ctypes
+
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            init1, add_watch = libc.inotify_init1, libc.inotify_add_watch
+        except (OSError, AttributeError) as e:
+            raise OSError(f"inotify: {e}")
+        fd = init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        if add_watch(fd, os.fsencode(str(path)), _IN_CLOSE_WRITE | _IN_MOVED_TO) < 0:
+            err = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(err, "inotify_add_watch")
+        self.fd = fd
+
+    def read(self, timeout: float) -> Optional[List[str]]:
+        """
+        等待至多 timeout 秒，返回有动静的文件名；队列溢出 => None（调用方全量扫描）。
+        """
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        names: List[str] = []
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+            off = 0
+            while off < len(buf):
+                _, mask, _, n = _EV.unpack_from(buf, off)
+                name = buf[off + _EV.size:off + _EV.size + n].rstrip(b"\0")
+                off += _EV.size + n
+                if mask & _IN_Q_OVERFLOW:
+                    return None
+                if name:
+                    names.append(os.fsdecode(name))
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def default_ledger(state_dir: Path, inbox: Path, glob_pattern: str) -> Path:
+    key = f"{inbox.resolve()}|{glob_pattern}".encode("utf-8", errors="ignore")
+    return state_dir / "watch" / f"{hashlib.sha1(key).hexdigest()[:16]}.done"
+
+
+class InboxWatcher:
+    """
+    监视一个 inbox 目录，交出“写完了、还没处理过”的文件（按文件名排序）：
+    - inotify 可用：IN_CLOSE_WRITE / IN_MOVED_TO 即就绪（写者已关闭文件或整文件移入）
+    - 否则轮询：目录 mtime 未变（且不在 RACY_S 窗口内）时只 stat 待定文件；
+      (mtime, size) 连续两次相同才算写完（去抖）
+    - 启动时与 inotify 队列溢出时全量扫描：停机期间到达的文件不会漏
+    - ledger（每行一个已处理文件名）：重启后不重复处理；同一 ledger 只允许一个进程持有。
+      ledger=None（dry-run）只在内存里记
+    """
+
+    def __init__(self, inbox: Path, glob_pattern: str = "*.json", ledger: Optional[Path] = None, poll: bool = False):
+        self.inbox = inbox
+        self.glob = glob_pattern
+        self.done_set: Set[str] = set()
+        self.pending: Dict[str, Key] = {}            # 轮询：上次看到的 (mtime, size)
+        self.bad: Dict[str, Tuple[Key, bool]] = {}   # 解析失败：(当时的 key, 是否已放弃)
+        self.dir_key: Optional[Tuple[int, int]] = None
+        self._lock_fd: Optional[int] = None
+        self._ledger = None
+
+        if ledger is not None:
+            ledger.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(ledger.with_suffix(".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+            if not lock_fd(fd, blocking=False):
+                os.close(fd)
+                raise RuntimeError(f"{inbox} is already being watched (lock {ledger.with_suffix('.lock')})")
+            self._lock_fd = fd
+            self._open_ledger(ledger)
+
+        self.notify: Optional[_Inotify] = None
+        if not poll:
+            try:
+                self.notify = _Inotify(inbox)  # 先建监视再全量扫描：两者之间到达的文件不会漏
+            except OSError:
+                self.notify = None
+        self._rescan = True
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self.notify is not None else "poll"
+
+    def _open_ledger(self, path: Path) -> None:
+        lines = path.read_text(encoding="utf-8").split("\n") if path.exists() else []
+        self.done_set = {x for x in lines if x}
+        # 已不在 inbox 中的文件名（被归档 / 删除）不必再记：条目明显多于现存文件时重写
+        live = {e.name for e in os.scandir(self.inbox)} if self.inbox.is_dir() else set()
+        keep = self.done_set & live
+        if len(self.done_set) > 2 * len(keep) + COMPACT_MIN:
+            atomic_write_text(path, "".join(f"{x}\n" for x in sorted(keep)))
+            self.done_set = keep
+        self._ledger = path.open("a", encoding="utf-8")
+
+    def _wanted(self, name: str) -> bool:
+        return name not in self.done_set and "\n" not in name and fnmatch.fnmatch(name, self.glob)
+
+    def _stat(self, name: str) -> Optional[Key]:
+        try:
+            st = os.stat(self.inbox / name)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _due(self, name: str, key: Key, now_ns: int) -> bool:
+        b = self.bad.get(name)
+        if b is None:
+            return True
+        if b[0] != key:  # 失败之后又被改写：重新来过
+            del self.bad[name]
+            return True
+        return not b[1] and now_ns - key[0] >= RETRY_S * 1e9
+
+    def _scan_names(self) -> List[str]:
+        try:
+            st = os.stat(self.inbox)
+        except FileNotFoundError:
+            return []
+        dkey = (st.st_mtime_ns, st.st_ino)
+        racy = time.time_ns() - st.st_mtime_ns < RACY_S * 1e9
+        if not self._rescan and dkey == self.dir_key and not racy:
+            return list(self.pending) + [n for n, (_, gave_up) in self.bad.items() if not gave_up]
+        self.dir_key = dkey
+        with os.scandir(self.inbox) as it:
+            return [e.name for e in it if self._wanted(e.name)]
+
+    def ready(self, timeout: float = POLL_S) -> List[Tuple[Path, Key]]:
+        """
+        等待至多 timeout 秒，返回就绪的 (路径, (mtime_ns, size))。
+        调用方对每个文件二选一：mark_done（已处理）/ mark_failed（读不出事件）。
+        """
+        now = time.time_ns()
+        out: Dict[str, Key] = {}
+        if self._rescan:
+            # 启动 / 溢出：目录里现有的文件都算写完（inotify 模式）或进入去抖（轮询）
+            names = self._scan_names()
+            self._rescan = False
+            for n in names:
+                key = self._stat(n)
+                if key is None or not self._due(n, key, now):
+                    continue
+                if self.notify is not None:
+                    out[n] = key
+                else:
+                    self.pending[n] = key
+            if out:
+                return self._sorted(out)
+
+        if self.notify is not None:
+            names = self.notify.read(timeout)
+            if names is None:
+                self._rescan = True
+                return self.ready(0)
+            now = time.time_ns()
+            names += [n for n, (_, gave_up) in self.bad.items() if not gave_up]
+            for n in names:
+                if not self._wanted(n):
+                    continue
+                key = self._stat(n)
+                if key is not None and self._due(n, key, now):
+                    out[n] = key
+            return self._sorted(out)
+
+        time.sleep(timeout)
+        now = time.time_ns()
+        for n in self._scan_names():
+            if not self._wanted(n):
+                self.pending.pop(n, None)
+                continue
+            key = self._stat(n)
+            if key is None:
+                self.pending.pop(n, None)
+                continue
+            if self.pending.get(n) != key:
+                self.pending[n] = key  # 还在变：下一轮再看
+                continue
+            del self.pending[n]
+            if self._due(n, key, now):
+                out[n] = key
+        return self._sorted(out)
+
+    def _sorted(self, out: Dict[str, Key]) -> List[Tuple[Path, Key]]:
+        return [(self.inbox / n, out[n]) for n in sorted(out)]
+
+    def mark_done(self, path: Path) -> None:
+        name = path.name
+        self.done_set.add(name)
+        self.pending.pop(name, None)
+        self.bad.pop(name, None)
+        if self._ledger is not None:
+            self._ledger.write(name + "\n")
+            self._ledger.flush()
+
+    def mark_failed(self, path: Path, key: Key) -> bool:
+        """
+        第一次失败且文件还新：到期重试一次（可能是写了一半）；否则放弃，直到文件再被改写。
+        返回是否已放弃。
+        """
+        name = path.name
+        self.pending.pop(name, None)
+        young = time.time_ns() - key[0] < RETRY_S * 1e9
+        prev = self.bad.get(name)
+        gave_up = not young or (prev is not None and prev[0] == key)
+        self.bad[name] = (key, gave_up)
+        return gave_up
+
+    def close(self) -> None:
+        if self.notify is not None:
+            self.notify.close()
+            self.notify = None
+        if self._ledger is not None:
+            self._ledger.close()
+            self._ledger = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def __enter__(self) -> "InboxWatcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()